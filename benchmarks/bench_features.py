@@ -0,0 +1,35 @@
+# ==== benchmarks/bench_features.py ====
+# ต้นทุนต่อ record ของการเตรียม feature: DataFrame + coercion + ColumnTransformer (server/api.py เดิม)
+# เทียบกับ FeatureEncoder (diet_features.py)
+#   python benchmarks/bench_features.py --sizes 1 32 1000
+import argparse
+import pandas as pd
+from common import load_model, synth_records, best_of
+from diet_features import FeatureEncoder
+
+def pandas_path(prep, cat_cols, num_cols, rows):
+    df = pd.DataFrame(rows).reindex(columns=list(prep.feature_names_in_))
+    for c in num_cols:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df[num_cols] = df[num_cols].fillna(0)
+    for c in cat_cols:
+        df[c] = df[c].astype(str)
+    return prep.transform(df)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 32, 1000, 10_000])
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    model, _ = load_model()
+    prep = model.named_steps["prep"]
+    enc = FeatureEncoder.from_prep(prep)
+    print(f"{'rows':>7} {'pandas_us/rec':>14} {'encoder_us/rec':>15} {'speedup':>8}")
+    for n in args.sizes:
+        rows = synth_records(model, n)
+        t_old = best_of(lambda: pandas_path(prep, enc.cat_cols, enc.num_cols, rows), args.repeat)
+        t_new = best_of(lambda: enc.encode(rows), args.repeat)
+        print(f"{n:>7} {t_old / n * 1e6:>14.1f} {t_new / n * 1e6:>15.1f} {t_old / t_new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+# ==== benchmarks/bench_forest.py ====
+# sklearn predict_proba เทียบกับ FlatForest (diet_forest.py) ทั้งแบบรวม prep และเฉพาะส่วนป่า
+#   python benchmarks/bench_forest.py --sizes 1 100 10000
+import argparse
+import numpy as np
+import pandas as pd
+from common import load_model, synth_records, best_of
+from diet_forest import compile_pipeline
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--n-jobs", type=int, default=1, help="n_jobs for the sklearn forest")
+    args = ap.parse_args()
+    model, _ = load_model()
+    model.named_steps["model"].n_jobs = args.n_jobs
+    flat = compile_pipeline(model)
+    rf = model.named_steps["model"]
+    print(f"trees={flat.forest.n_trees} nodes={len(flat.forest.feature)} max_depth={flat.forest.max_depth}")
+    print(f"{'rows':>8} {'sk_pipe_s':>10} {'flat_pipe_s':>11} {'sk_rf_s':>10} {'flat_rf_s':>10} {'max_diff':>10}")
+    for n in args.sizes:
+        X = pd.DataFrame(synth_records(model, n))
+        Xt = np.asarray(model.named_steps["prep"].transform(X))
+        diff = np.abs(flat.predict_proba(X) - model.predict_proba(X)).max()
+        print(f"{n:>8} {best_of(lambda: model.predict_proba(X), args.repeat):>10.4f} "
+              f"{best_of(lambda: flat.predict_proba(X), args.repeat):>11.4f} "
+              f"{best_of(lambda: rf.predict_proba(Xt), args.repeat):>10.4f} "
+              f"{best_of(lambda: flat.forest.predict_proba(Xt), args.repeat):>10.4f} {diff:>10.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# ==== benchmarks/bench_formats.py ====
+# throughput ของ /api/predict ตามรูปแบบ body/คำตอบ (in-process ผ่าน TestClient):
+#   json-records   {"records": [...]} + format=records   (แบบเดิม)
+#   json-columns   {"columns": {...}} + format=compact
+#   arrow          Arrow IPC stream ทั้งขาเข้า/ขาออก
+#   parquet        Parquet ทั้งขาเข้า/ขาออก
+# เวลาที่วัดรวมการเตรียม body จาก DataFrame ฝั่ง client และแปลงคำตอบกลับเป็นตาราง (เหมือนงาน bulk scoring จริง)
+#   python benchmarks/bench_formats.py --sizes 1000 10000 100000
+import os, sys, json, argparse, tempfile
+from pathlib import Path
+from common import ROOT, MODEL_PATH, LE_PATH, load_model, synth_records, best_of
+
+def cases(pa, pq):
+    def arrow_body(df):
+        sink = pa.BufferOutputStream()
+        t = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.ipc.new_stream(sink, t.schema) as w:
+            w.write_table(t)
+        return sink.getvalue().to_pybytes()
+
+    def parquet_body(df):
+        sink = pa.BufferOutputStream()
+        pq.write_table(pa.Table.from_pandas(df, preserve_index=False), sink)
+        return sink.getvalue().to_pybytes()
+
+    import pandas as pd
+    return {
+        "json-records": ("records", "application/json", "application/json",
+                         lambda df: json.dumps({"records": df.to_dict(orient="records")}).encode(),
+                         lambda b: pd.DataFrame([r["probabilities"] for r in json.loads(b)["results"]])),
+        "json-columns": ("compact", "application/json", "application/json",
+                         lambda df: json.dumps({"columns": df.to_dict(orient="list")}).encode(),
+                         lambda b: pd.DataFrame(json.loads(b)["proba"])),
+        "arrow": ("records", "application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.stream",
+                  arrow_body, lambda b: pa.ipc.open_stream(pa.BufferReader(b)).read_all().to_pandas()),
+        "parquet": ("records", "application/vnd.apache.parquet", "application/vnd.apache.parquet",
+                    parquet_body, lambda b: pq.read_table(pa.BufferReader(b)).to_pandas()),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--out", type=Path, help="write results as JSON")
+    args = ap.parse_args()
+
+    import pandas as pd
+    import pyarrow as pa, pyarrow.parquet as pq
+    from starlette.testclient import TestClient
+    from diet_registry import ModelRegistry
+    try:
+        import orjson  # noqa: F401
+        print("ℹ️ orjson: on")
+    except ImportError:
+        print("ℹ️ orjson: off (pip install orjson)")
+
+    model, _ = load_model()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ModelRegistry(Path(tmp, "registry")).publish("bench", MODEL_PATH, LE_PATH, activate=True)
+        os.environ.update({"DIET_MODEL_REGISTRY": str(Path(tmp, "registry")), "DIET_STORE": "sqlite",
+                           "DIET_DB": str(Path(tmp, "bench.db"))})
+        sys.path.insert(0, str(ROOT))
+        from diet_api import app
+        with TestClient(app) as client:
+            print(f"{'rows':>8} {'format':>13} {'seconds':>9} {'rows/s':>10} {'req_kb':>9} {'resp_kb':>9} {'speedup':>8}")
+            for n in args.sizes:
+                df = pd.DataFrame(synth_records(model, n))
+                base = None
+                for name, (fmt, ctype, accept, encode, decode) in cases(pa, pq).items():
+                    sizes = {}
+                    def run():
+                        body = encode(df)
+                        r = client.post(f"/api/predict?format={fmt}", content=body,
+                                        headers={"Content-Type": ctype, "Accept": accept})
+                        r.raise_for_status()
+                        out = decode(r.content)
+                        assert len(out) == n
+                        sizes.update(req=len(body), resp=len(r.content))
+                    t = best_of(run, args.repeat)
+                    base = base or t
+                    r = {"rows": n, "format": name, "seconds": t, "rows_per_s": n / t,
+                         "request_bytes": sizes["req"], "response_bytes": sizes["resp"]}
+                    results.append(r)
+                    print(f"{n:>8} {name:>13} {t:>9.3f} {n / t:>10.0f} {sizes['req'] / 1024:>9.1f} "
+                          f"{sizes['resp'] / 1024:>9.1f} {base / t:>7.2f}x")
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"💾 Saved: {args.out}")
+
+if __name__ == "__main__":
+    main()
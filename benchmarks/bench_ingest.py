@@ -0,0 +1,74 @@
+# ==== benchmarks/bench_ingest.py ====
+# เวลาโหลด + หน่วยความจำสูงสุดของชุดข้อมูลฝึก: CSV (python engine แบบเดิม / sniff + C engine) เทียบ Parquet / Arrow
+# ที่ขนาด 1x, 10x, 100x ของข้อมูลจริง (ต่อแถวซ้ำ) — แต่ละการโหลดรันใน process ใหม่เพื่อให้ ru_maxrss เป็นของมันล้วน ๆ
+#   python benchmarks/bench_ingest.py --data dataset.csv --scales 1 10 100
+#   python benchmarks/bench_ingest.py --base-rows 2000          (ไม่มี CSV → สังเคราะห์จาก schema ของโมเดลใน server/)
+import sys, json, argparse, subprocess, tempfile
+from pathlib import Path
+from common import ROOT
+
+CHILD = r"""
+import sys, time, json, resource
+sys.path.insert(0, %(root)r)
+import pandas as pd
+from diet_ingest import load_dataset
+base = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+if %(mode)r == "csv-python":
+    df = pd.read_csv(%(path)r, sep=None, engine="python")
+else:
+    df = load_dataset(%(path)r)
+t = time.perf_counter() - t0
+print(json.dumps({"load_s": t, "rows": len(df), "frame_mb": df.memory_usage(deep=True).sum() / 1e6,
+                  "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0,
+                  "import_mb": base / 1024.0}))
+"""
+
+def synth_dataset(n: int):
+    import numpy as np
+    import pandas as pd
+    from common import load_model, synth_records
+    model, le = load_model()
+    df = pd.DataFrame(synth_records(model, n))
+    df["Diet_Recommendation"] = np.random.default_rng(0).choice(np.asarray(le.classes_, dtype=object), n)
+    return df
+
+def measure(path: Path, mode: str):
+    code = CHILD % {"root": str(ROOT), "path": str(path), "mode": mode}
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def main():
+    import pandas as pd
+    from diet_ingest import ingest, read_dataset
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--data", type=Path, help="source CSV (default: synthetic rows)")
+    ap.add_argument("--base-rows", type=int, default=2000)
+    ap.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    ap.add_argument("--formats", nargs="+", default=["parquet", "arrow"])
+    ap.add_argument("--out", type=Path, help="write results as JSON")
+    args = ap.parse_args()
+
+    base = read_dataset(args.data) if args.data else synth_dataset(args.base_rows)
+    results = []
+    print(f"{'scale':>5} {'rows':>9} {'source':>11} {'file_mb':>8} {'load_s':>8} {'frame_mb':>9} {'peak_mb':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for k in args.scales:
+            csv_path = Path(tmp, f"data_x{k}.csv")
+            pd.concat([base] * k, ignore_index=True).to_csv(csv_path, index=False)
+            targets = [("csv-python", csv_path), ("csv", csv_path)]
+            for fmt in args.formats:
+                dst = Path(tmp, f"data_x{k}.{fmt}")
+                ingest(csv_path, dst)
+                targets.append((fmt, dst))
+            for mode, path in targets:
+                r = {"scale": k, "source": mode, "file_mb": path.stat().st_size / 1e6, **measure(path, mode)}
+                results.append(r)
+                print(f"{k:>5} {r['rows']:>9} {mode:>11} {r['file_mb']:>8.2f} {r['load_s']:>8.3f} "
+                      f"{r['frame_mb']:>9.1f} {r['peak_mb']:>8.1f}")
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+        print(f"💾 Saved: {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# ==== benchmarks/bench_predict.py ====
+# เทียบเส้นทางทำนายแบบเดิม (predict + predict_proba + dict ซ้อนทุกแถว) กับ diet_inference
+#   python benchmarks/bench_predict.py --sizes 1 100 10000 100000
+import argparse
+import pandas as pd
+from common import load_model, synth_records, best_of
+import diet_inference as inference
+
+def old_path(model, le, df):
+    pred_num = model.predict(df)
+    pred_lbl = le.inverse_transform(pred_num)
+    proba = model.predict_proba(df)
+    results = []
+    for i in range(len(df)):
+        results.append({"prediction": pred_lbl[i],
+                        "probabilities": {str(c): float(proba[i, j]) for j, c in enumerate(le.classes_)}})
+    return {"count": len(results), "results": results}
+
+def new_path(model, le, df, fmt):
+    idx, proba = inference.predict_proba(model, df)
+    return inference.format_results(idx, proba, inference.class_names(le), fmt)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000, 100_000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+    model, le = load_model()
+    print(f"{'rows':>8} {'old_s':>10} {'records_s':>10} {'compact_s':>10} {'speedup':>8}")
+    for n in args.sizes:
+        df = pd.DataFrame(synth_records(model, n))
+        t_old = best_of(lambda: old_path(model, le, df), args.repeat)
+        t_rec = best_of(lambda: new_path(model, le, df, "records"), args.repeat)
+        t_cmp = best_of(lambda: new_path(model, le, df, "compact"), args.repeat)
+        print(f"{n:>8} {t_old:>10.4f} {t_rec:>10.4f} {t_cmp:>10.4f} {t_old / t_cmp:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+# ==== benchmarks/bench_serving.py ====
+# benchmark ของทั้งสองแอป (diet_api.py ที่ /api/* และ server/api.py) + สคริปต์ฝึก
+# โหมด inprocess = TestClient ใน process ลูก (ไม่มี network) / uvicorn = เปิด server จริงบน localhost แล้วยิง HTTP
+# วัด latency p50/p95/p99, throughput และ peak RSS (ของ process ที่รันแอป) แล้วเขียนผลเป็น JSON ไว้เทียบข้าม commit
+#   python benchmarks/bench_serving.py --out bench.json
+#   python benchmarks/bench_serving.py --apps api --modes uvicorn --requests 2000 --concurrency 16 --batch 500
+#   python benchmarks/bench_serving.py --train --out bench.json --compare bench_prev.json
+# ใช้โมเดลใน server/ ผ่านทะเบียนชั่วคราว (DIET_MODEL_REGISTRY) และ user store แบบ sqlite ชั่วคราว — ไม่แตะไฟล์ใน repo
+# ตัวแปร DIET_* อื่นที่ตั้งไว้ (เช่น DIET_ENGINE=flat, DIET_MICROBATCH=1) ส่งต่อให้แอปตามปกติ
+import sys, os, json, math, time, uuid, socket, platform, argparse, threading, subprocess, tempfile
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from common import ROOT, MODEL_PATH, LE_PATH
+
+APPS = {
+    # ชื่อ: (cwd, module:app, prefix)
+    "api": (ROOT, "diet_api:app", "/api"),
+    "server": (ROOT / "server", "api:app", ""),
+}
+SERVER_REQUIRED = {"gender": "Male", "age": 30, "height_cm": 170, "weight_kg": 65}
+
+# ---------- client ----------
+class HttpClient:
+    """http.client แยก connection ต่อ thread (keep-alive) — ไม่ต้องพึ่ง requests/httpx"""
+
+    def __init__(self, port: int):
+        self.port = port
+        self._local = threading.local()
+
+    def _conn(self):
+        c = getattr(self._local, "conn", None)
+        if c is None:
+            c = self._local.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=120)
+        return c
+
+    def call(self, method, path, json_body=None, csv=None, headers=None) -> int:
+        headers = dict(headers or {})
+        body = None
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers["Content-Type"] = "application/json"
+        elif csv is not None:
+            boundary = uuid.uuid4().hex
+            body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"data.csv\"\r\n"
+                    f"Content-Type: text/csv\r\n\r\n").encode() + csv + f"\r\n--{boundary}--\r\n".encode()
+            headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+        c = self._conn()
+        try:
+            c.request(method, path, body=body, headers=headers)
+            r = c.getresponse()
+            r.read()
+            return r.status
+        except (OSError, http.client.HTTPException):
+            c.close()
+            self._local.conn = None
+            raise
+
+class InProcessClient:
+    def __init__(self, client):
+        self.client = client
+
+    def call(self, method, path, json_body=None, csv=None, headers=None) -> int:
+        files = {"file": ("data.csv", csv, "text/csv")} if csv is not None else None
+        return self.client.request(method, path, json=json_body, files=files, headers=headers).status_code
+
+# ---------- scenarios ----------
+def percentile(sorted_ms, q: float) -> float:
+    if not sorted_ms: return float("nan")
+    return sorted_ms[min(len(sorted_ms) - 1, max(0, math.ceil(q * len(sorted_ms)) - 1))]
+
+def drive(fn, n: int, concurrency: int, warmup: int):
+    """เรียก fn() n ครั้งด้วย concurrency thread → (latencies_ms เรียงแล้ว, errors, wall_s)"""
+    for _ in range(warmup):
+        fn()
+    lat, errors, lock = [], [0], threading.Lock()
+    def one(_):
+        t0 = time.perf_counter()
+        try:
+            ok = fn() < 400
+        except Exception:
+            ok = False
+        dt = (time.perf_counter() - t0) * 1000.0
+        with lock:
+            lat.append(dt)
+            if not ok: errors[0] += 1
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as ex:
+        list(ex.map(one, range(n)))
+    return sorted(lat), errors[0], time.perf_counter() - t0
+
+def scenarios(app: str, client, records, batch: int):
+    prefix = APPS[app][2]
+    out = {}
+    if app == "server":
+        rec = {**SERVER_REQUIRED, **records[0]}
+        out["predict-one"] = (1, lambda: client.call("POST", "/predict-one", {"data": rec}))
+        return out
+    rows = records[:batch]
+    import pandas as pd
+    csv = pd.DataFrame(rows).to_csv(index=False).encode()
+    out["predict-one"] = (1, lambda: client.call("POST", f"{prefix}/predict-one", {"data": records[0]}))
+    out["predict"] = (len(rows), lambda: client.call("POST", f"{prefix}/predict", {"records": rows}))
+    out["predict-compact"] = (len(rows), lambda: client.call("POST", f"{prefix}/predict?format=compact",
+                                                              {"records": rows}))
+    out["predict-csv"] = (len(rows), lambda: client.call("POST", f"{prefix}/predict-csv", csv=csv))
+    # login/profile ใช้ user ที่สมัครไว้ก่อน (store ชั่วคราว)
+    phone = f"09{uuid.uuid4().int % 10**8:08d}"
+    client.call("POST", f"{prefix}/register", {"firstName": "Bench", "lastName": "User", "phone": phone,
+                                               "dob": {"day": "1", "month": "1", "year": "1990"},
+                                               "agree": True, "marketingOptIn": False})
+    out["login"] = (1, lambda: client.call("POST", f"{prefix}/login", {"phone": phone}))
+    token = {}
+    def profile():
+        if "t" not in token:
+            token["t"] = _login_token(client, prefix, phone)
+        return client.call("GET", f"{prefix}/profile", headers={"Authorization": f"Bearer {token['t']}"})
+    out["profile"] = (1, profile)
+    return out
+
+def _login_token(client, prefix, phone) -> str:
+    if isinstance(client, InProcessClient):
+        return client.client.post(f"{prefix}/login", json={"phone": phone}).json()["token"]
+    c = http.client.HTTPConnection("127.0.0.1", client.port, timeout=30)
+    c.request("POST", f"{prefix}/login", body=json.dumps({"phone": phone}), headers={"Content-Type": "application/json"})
+    return json.loads(c.getresponse().read())["token"]
+
+def run_scenarios(app, client, records, args, mode, rss_fn):
+    results = []
+    for name, (rows, fn) in scenarios(app, client, records, args.batch).items():
+        if args.scenarios and name not in args.scenarios: continue
+        lat, errors, wall = drive(fn, args.requests, args.concurrency, args.warmup)
+        r = {"app": app, "mode": mode, "scenario": name, "requests": len(lat), "concurrency": args.concurrency,
+             "rows_per_request": rows, "errors": errors,
+             "p50_ms": percentile(lat, 0.50), "p95_ms": percentile(lat, 0.95), "p99_ms": percentile(lat, 0.99),
+             "mean_ms": sum(lat) / len(lat) if lat else float("nan"),
+             "throughput_rps": len(lat) / wall if wall > 0 else float("nan"),
+             "rows_per_s": len(lat) * rows / wall if wall > 0 else float("nan"),
+             "peak_rss_mb": rss_fn()}
+        print(f"{app:>6} {mode:>9} {name:>16} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['throughput_rps']:>9.1f} {r['peak_rss_mb']:>8.1f} {errors:>6}", flush=True)
+        results.append(r)
+    return results
+
+# ---------- modes ----------
+def _self_rss_mb() -> float:
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def _proc_hwm_mb(pid: int) -> float:
+    try:
+        for line in open(f"/proc/{pid}/status"):
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return float("nan")
+
+def child_inprocess(args):
+    """รันใน process ลูก: import แอปแล้วยิงผ่าน TestClient → peak RSS เป็นของแอป + client เท่านั้น"""
+    from starlette.testclient import TestClient
+    cwd, target, _ = APPS[args.app]
+    os.chdir(cwd)
+    sys.path.insert(0, str(cwd))
+    module, attr = target.split(":")
+    app = getattr(__import__(module), attr)
+    records = json.loads(Path(args.records).read_text())
+    with TestClient(app) as tc:
+        results = run_scenarios(args.app, InProcessClient(tc), records, args, "inprocess", _self_rss_mb)
+    Path(args.result).write_text(json.dumps(results))
+
+def run_inprocess(app, args, env, tmp, records_path):
+    result = Path(tmp, f"result_{app}.json")
+    cmd = [sys.executable, __file__, "--child", "--app", app, "--records", str(records_path), "--result", str(result),
+           "--requests", str(args.requests), "--concurrency", str(args.concurrency), "--warmup", str(args.warmup),
+           "--batch", str(args.batch)] + (["--scenarios", *args.scenarios] if args.scenarios else [])
+    subprocess.run(cmd, env=env, check=True)
+    return json.loads(result.read_text())
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def run_uvicorn(app, args, env, records):
+    cwd, target, prefix = APPS[app]
+    port = _free_port()
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", target, "--host", "127.0.0.1", "--port", str(port),
+                             "--log-level", "warning"], cwd=cwd, env=env)
+    try:
+        deadline = time.time() + args.startup_timeout
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn ({app}) exited with {proc.returncode}")
+            try:
+                c = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+                c.request("GET", f"{prefix}/ready")
+                if c.getresponse().status == 200: break
+            except OSError:
+                pass
+            if time.time() > deadline:
+                raise RuntimeError(f"uvicorn ({app}) not ready after {args.startup_timeout}s")
+            time.sleep(0.2)
+        return run_scenarios(app, HttpClient(port), records, args, "uvicorn", lambda: _proc_hwm_mb(proc.pid))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+def run_training(args, env, tmp, records):
+    """เวลา + peak RSS ของ `train` (search เล็ก ๆ) และ `evaluate --holdout` บนข้อมูลสังเคราะห์"""
+    import numpy as np
+    import pandas as pd
+    from common import load_model
+    _, le = load_model()
+    df = pd.DataFrame((records * (args.train_rows // len(records) + 1))[:args.train_rows])
+    df["Diet_Recommendation"] = np.random.default_rng(0).choice(np.asarray(le.classes_, dtype=object), len(df))
+    data = Path(tmp, "train.csv")
+    df.to_csv(data, index=False)
+    script = str(ROOT / "diet_model_rf_weka_summary_full.py")
+    out_dir = Path(tmp, "train_out")
+    steps = {
+        "train": ["train", "--data", str(data), "--out-dir", str(out_dir), "--n-iter", str(args.train_n_iter),
+                  "--no-eval", "--checkpoint", str(Path(tmp, "ckpt.jsonl"))],
+        "evaluate": ["evaluate", "--data", str(data), "--model-dir", str(out_dir), "--holdout"],
+    }
+    results = []
+    for name, argv in steps.items():
+        t0 = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, script, *argv], cwd=tmp, env=env, stdout=subprocess.DEVNULL)
+        _, status, usage = os.wait4(proc.pid, 0)
+        wall = time.perf_counter() - t0
+        r = {"app": "training", "mode": "cli", "scenario": name, "rows": len(df), "wall_s": wall,
+             "peak_rss_mb": usage.ru_maxrss / 1024.0, "exit_code": os.waitstatus_to_exitcode(status)}
+        print(f"{'train':>6} {'cli':>9} {name:>16} {wall:>8.2f}s {'':>18} {'':>9} {r['peak_rss_mb']:>8.1f} "
+              f"{r['exit_code']:>6}", flush=True)
+        results.append(r)
+    return results
+
+def compare(prev_path: Path, results):
+    """เทียบกับผลรอบก่อน: อัตราส่วน p95 และ throughput ต่อ (app, mode, scenario)"""
+    prev = {(r["app"], r["mode"], r["scenario"]): r for r in json.loads(prev_path.read_text())["results"]}
+    print(f"\n{'app':>6} {'mode':>9} {'scenario':>16} {'p95 new/old':>12} {'rps new/old':>12}")
+    for r in results:
+        p = prev.get((r["app"], r["mode"], r["scenario"]))
+        if not p or "p95_ms" not in r: continue
+        print(f"{r['app']:>6} {r['mode']:>9} {r['scenario']:>16} {r['p95_ms'] / p['p95_ms']:>11.2f}x "
+              f"{r['throughput_rps'] / p['throughput_rps']:>11.2f}x")
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--apps", nargs="+", choices=list(APPS), default=list(APPS))
+    ap.add_argument("--modes", nargs="+", choices=["inprocess", "uvicorn"], default=["inprocess", "uvicorn"])
+    ap.add_argument("--scenarios", nargs="+", help="subset (predict-one predict predict-compact predict-csv login profile)")
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--warmup", type=int, default=20)
+    ap.add_argument("--batch", type=int, default=100, help="rows per /predict and /predict-csv request")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--train", action="store_true", help="also time the training CLI on synthetic data")
+    ap.add_argument("--train-rows", type=int, default=5000)
+    ap.add_argument("--train-n-iter", type=int, default=2)
+    ap.add_argument("--startup-timeout", type=float, default=120)
+    ap.add_argument("--out", type=Path, help="write results as JSON")
+    ap.add_argument("--compare", type=Path, help="previous --out file to compare against")
+    # ภายใน: process ลูกของโหมด inprocess
+    ap.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--app", help=argparse.SUPPRESS)
+    ap.add_argument("--records", help=argparse.SUPPRESS)
+    ap.add_argument("--result", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return child_inprocess(args)
+
+    from common import load_model, synth_records
+    from diet_registry import ModelRegistry
+    model, _ = load_model()
+    records = synth_records(model, max(args.batch, 1), args.seed)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        ModelRegistry(Path(tmp, "registry")).publish("bench", MODEL_PATH, LE_PATH, activate=True)
+        env = {**os.environ, "DIET_MODEL_REGISTRY": str(Path(tmp, "registry")),
+               "DIET_STORE": "sqlite", "DIET_DB": str(Path(tmp, "bench.db")), "PYTHONUNBUFFERED": "1"}
+        records_path = Path(tmp, "records.json")
+        records_path.write_text(json.dumps(records))
+        print(f"{'app':>6} {'mode':>9} {'scenario':>16} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} "
+              f"{'req/s':>9} {'rss_mb':>8} {'errors':>6}")
+        for app in args.apps:
+            for mode in args.modes:
+                results += run_inprocess(app, args, env, tmp, records_path) if mode == "inprocess" \
+                    else run_uvicorn(app, args, env, records)
+        if args.train:
+            results += run_training(args, env, tmp, records)
+
+    report = {"meta": {"commit": _git_commit(), "timestamp": int(time.time()), "python": platform.python_version(),
+                       "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                       "env": {k: v for k, v in os.environ.items() if k.startswith("DIET_")},
+                       "args": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()
+                                if k not in ("child", "app", "records", "result")}},
+              "results": results}
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n💾 Saved: {args.out}")
+    if args.compare:
+        compare(args.compare, results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# ==== benchmarks/bench_startup.py ====
+# cold start + หน่วยความจำต่อ worker เมื่อรัน N process พร้อมกัน (จำลอง uvicorn --workers N)
+# เทียบ joblib.load ของ Pipeline (ต้นไม้ของ sklearn ถูก copy เข้าหน่วยความจำของแต่ละ process เสมอ)
+# กับ FlatPipeline ที่เปิดป่าแบบ .npy + mmap (DIET_ENGINE=flat DIET_FLAT_FOREST=dir DIET_MODEL_MMAP=1)
+#   python benchmarks/bench_startup.py --model server/diet_recommendation_rf_model.joblib --workers 1 4 8
+# RSS นับหน้าที่แชร์ซ้ำในทุก process; PSS หารหน้าที่แชร์ตามจำนวน process จึงสะท้อนต้นทุนจริงต่อ worker
+import sys, json, argparse, subprocess, tempfile
+from pathlib import Path
+from common import ROOT, MODEL_PATH
+
+CHILD = r"""
+import sys, time, json, gc
+sys.path.insert(0, %(root)r)
+t0 = time.perf_counter()
+import joblib
+from diet_loader import warmup_rows
+model = joblib.load(%(model)r)
+if %(forest)r:
+    from diet_forest import compile_pipeline
+    model = compile_pipeline(model, %(forest)r, mmap=True)   # Pipeline เดิม (และต้นไม้ส่วนตัว) ถูกทิ้ง
+    gc.collect()
+t1 = time.perf_counter()
+rows = warmup_rows(model, 32)
+if rows:
+    import pandas as pd
+    model.predict_proba(pd.DataFrame(rows))
+t2 = time.perf_counter()
+print(json.dumps({"load_s": t1 - t0, "warmup_s": t2 - t1}), flush=True)
+sys.stdin.readline()   # รอจนทุก worker โหลดเสร็จ แล้วค่อยวัดหน่วยความจำพร้อมกัน
+mem = {}
+for path, keys in (("/proc/self/status", ("VmRSS",)), ("/proc/self/smaps_rollup", ("Pss",))):
+    try:
+        for line in open(path):
+            k = line.split(":")[0]
+            if k in keys: mem[k] = int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+print(json.dumps(mem), flush=True)
+"""
+
+def run(model: Path, n: int, forest):
+    code = CHILD % {"root": str(ROOT), "model": str(model), "forest": str(forest) if forest else ""}
+    procs = [subprocess.Popen([sys.executable, "-c", code], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(n)]
+    starts = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.stdin.write("\n"); p.stdin.flush()
+    mems = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs: p.wait()
+    avg = lambda xs: sum(xs) / len(xs) if xs else float("nan")
+    return {"workers": n, "mode": "flat-mmap" if forest else "joblib",
+            "load_s": avg([s["load_s"] for s in starts]), "warmup_s": avg([s["warmup_s"] for s in starts]),
+            "rss_mb": avg([m.get("VmRSS", float("nan")) for m in mems]),
+            "pss_mb": avg([m.get("Pss", float("nan")) for m in mems])}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model", type=Path, default=MODEL_PATH)
+    ap.add_argument("--forest", type=Path, help="forest dir from `diet_forest.py export` (default: export to a temp dir)")
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = ap.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        forest = args.forest
+        if forest is None:
+            import joblib
+            sys.path.insert(0, str(ROOT))
+            from diet_forest import compile_pipeline
+            forest = Path(tmp) / "forest"
+            compile_pipeline(joblib.load(args.model)).forest.save(forest)
+        print(f"{'workers':>7} {'mode':>9} {'load_s':>8} {'warmup_s':>9} {'rss_mb':>8} {'pss_mb':>8}")
+        for n in args.workers:
+            for f in (None, forest):
+                r = run(args.model, n, f)
+                print(f"{n:>7} {r['mode']:>9} {r['load_s']:>8.3f} {r['warmup_s']:>9.3f} "
+                      f"{r['rss_mb']:>8.1f} {r['pss_mb']:>8.1f}")
+
+if __name__ == "__main__":
+    main()
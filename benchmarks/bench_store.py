@@ -0,0 +1,98 @@
+# ==== benchmarks/bench_store.py ====
+# เทียบ latency ของ login (หา user ตาม phone) + profile (token → phone → user)
+# ระหว่าง full-scan CSV แบบเดิม, CsvStore (hash index) และ SqliteStore
+# --burst: register พร้อมกันหลาย thread (มี phone ซ้ำปน) → จำนวน register/s และตรวจว่า phone ไม่ซ้ำในไฟล์
+#   python benchmarks/bench_store.py --rows 10000 100000 1000000
+#   python benchmarks/bench_store.py --rows --burst 5000 --threads 32
+import sys, csv, time, uuid, random, argparse, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from diet_store import USER_FIELDS, SESSION_FIELDS, CsvStore, SqliteStore
+
+def make_files(d: Path, n: int):
+    phones = [f"08{i:08d}" for i in range(n)]
+    tokens = [uuid.uuid4().hex for _ in range(n)]
+    with (d / "users.csv").open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=USER_FIELDS); w.writeheader()
+        for p in phones:
+            w.writerow({"phone": p, "firstName": "A", "lastName": "B", "dob_day": "1", "dob_month": "1",
+                        "dob_year": "2000", "agree": "true", "marketingOptIn": "false", "createdAt": 0})
+    with (d / "sessions.csv").open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=SESSION_FIELDS); w.writeheader()
+        for t, p in zip(tokens, phones):
+            w.writerow({"token": t, "phone": p, "createdAt": 0})
+    return phones, tokens
+
+def scan(path: Path, key: str, value: str):
+    # เส้นทางเดิมใน diet_api.py ก่อนมี store
+    with path.open("r", newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get(key) == value:
+                return row
+
+def timeit(fn, samples):
+    t0 = time.perf_counter()
+    for s in samples: fn(s)
+    return (time.perf_counter() - t0) / len(samples) * 1e6  # µs / call
+
+def burst(store, n: int, threads: int):
+    """n register จาก threads thread; phone ซ้ำกันครึ่งหนึ่ง → (register/s, จำนวนที่รับ)"""
+    rows = [{"phone": f"09{i % (n // 2 or 1):08d}", "firstName": "A", "createdAt": 0} for i in range(n)]
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(threads) as ex:
+        accepted = sum(ex.map(store.add_user, rows))
+    return n / (time.perf_counter() - t0), accepted
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="*", default=[10_000, 100_000, 1_000_000])
+    ap.add_argument("--burst", type=int, default=0, help="concurrent registrations to time (0 = skip)")
+    ap.add_argument("--threads", type=int, default=32)
+    ap.add_argument("--lookups", type=int, default=1000)
+    ap.add_argument("--scan-lookups", type=int, default=5, help="full scan is slow; sample fewer")
+    args = ap.parse_args()
+    print(f"{'rows':>9} {'backend':<12} {'startup_s':>10} {'login_us':>12} {'profile_us':>12}")
+    for n in args.rows:
+        with tempfile.TemporaryDirectory() as td:
+            d = Path(td)
+            phones, tokens = make_files(d, n)
+            idx = [random.randrange(n) for _ in range(args.lookups)]
+
+            few = idx[:args.scan_lookups]
+            login = timeit(lambda i: scan(d / "users.csv", "phone", phones[i]), few)
+            profile = timeit(lambda i: scan(d / "users.csv", "phone",
+                                            scan(d / "sessions.csv", "token", tokens[i])["phone"]), few)
+            print(f"{n:>9} {'csv-scan':<12} {0:>10.3f} {login:>12.1f} {profile:>12.1f}")
+
+            t0 = time.perf_counter(); s = CsvStore(d / "users.csv", d / "sessions.csv"); t1 = time.perf_counter()
+            login = timeit(lambda i: s.get_user(phones[i]), idx)
+            profile = timeit(lambda i: s.get_user(s.get_session(tokens[i])["phone"]), idx)
+            print(f"{n:>9} {'csv-index':<12} {t1 - t0:>10.3f} {login:>12.1f} {profile:>12.1f}")
+
+            t0 = time.perf_counter()
+            s = SqliteStore(d / "bench.db"); s.import_csv(d / "users.csv", d / "sessions.csv")
+            t1 = time.perf_counter()
+            login = timeit(lambda i: s.get_user(phones[i]), idx)
+            profile = timeit(lambda i: s.get_user(s.get_session(tokens[i])["phone"]), idx)
+            print(f"{n:>9} {'sqlite':<12} {t1 - t0:>10.3f} {login:>12.1f} {profile:>12.1f}")
+
+    if args.burst:
+        print(f"\n{'burst':>9} {'backend':<12} {'reg_per_s':>10} {'accepted':>9} {'unique_ok':>9}")
+        for name, make in (("csv-fsync", lambda d: CsvStore(d / "u.csv", d / "s.csv", fsync=True)),
+                           ("csv-nofsync", lambda d: CsvStore(d / "u.csv", d / "s.csv", fsync=False)),
+                           ("sqlite", lambda d: SqliteStore(d / "b.db"))):
+            with tempfile.TemporaryDirectory() as td:
+                st = make(Path(td))
+                rate, accepted = burst(st, args.burst, args.threads)
+                st.close()
+                if isinstance(st, CsvStore):
+                    phones = [r["phone"] for r in csv.DictReader(open(Path(td) / "u.csv", newline="", encoding="utf-8"))]
+                    ok = len(phones) == len(set(phones)) == accepted
+                else:
+                    ok = accepted == args.burst // 2
+                print(f"{args.burst:>9} {name:<12} {rate:>10.0f} {accepted:>9} {str(ok):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# ==== benchmarks/common.py ====
+# ของใช้ร่วมของ benchmark: โหลดโมเดลจาก server/ และสร้างข้อมูลสังเคราะห์ตาม schema ของ ColumnTransformer
+import sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+MODEL_PATH = ROOT / "server" / "diet_recommendation_rf_model.joblib"
+LE_PATH = ROOT / "server" / "label_encoder.joblib"
+
+def load_model(model_path: Path = MODEL_PATH, le_path: Path = LE_PATH):
+    import joblib
+    return joblib.load(model_path), joblib.load(le_path)
+
+def schema(model):
+    """(expected_cols, cat_cols, num_cols, categories, means, scales) จากขั้น prep ที่ fit แล้ว"""
+    prep = model.named_steps["prep"]
+    cat_cols, num_cols, cats, mean, scale = [], [], [], [], []
+    for name, trans, cols in prep.transformers_:
+        if name == "cat":
+            cat_cols, cats = list(cols), [list(c) for c in trans.categories_]
+        elif name == "num":
+            num_cols, mean, scale = list(cols), list(trans.mean_), list(trans.scale_)
+    return list(prep.feature_names_in_), cat_cols, num_cols, cats, mean, scale
+
+def synth_records(model, n: int, seed: int = 0):
+    """สุ่ม record ที่หน้าตาเหมือน input จริง (หมวดหมู่จาก categories_, ตัวเลขรอบ mean ± scale)"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    _, cat_cols, num_cols, cats, mean, scale = schema(model)
+    cols = {c: rng.choice(np.asarray(v, dtype=object), n) for c, v in zip(cat_cols, cats)}
+    for c, m, s in zip(num_cols, mean, scale):
+        cols[c] = np.round(rng.normal(m, s, n), 1)
+    keys = list(cols)
+    return [dict(zip(keys, row)) for row in zip(*(cols[k].tolist() for k in keys))]
+
+# ตัวเลือกในฟอร์มของ bloomdiet.js (ค่าเริ่มต้นของ disease/allergies คือ "None")
+FRONTEND_OPTIONS = {"gender": ["Male", "Female"],
+                    "disease": ["None", "Diabetes", "Hypertension", "Heart", "Obesity"],
+                    "allergies": ["None", "Gluten", "Dairy", "Nuts", "Seafood", "Eggs"]}
+
+def frontend_records(n: int, seed: int = 0):
+    """สุ่ม body ของ /predict-one แบบที่ bloomdiet.js ส่ง: ตัวเลือกของฟอร์ม, อายุ/ส่วนสูง/น้ำหนักเป็นจำนวนเต็ม
+    (ฟอร์มรับอายุ 1–120), bmi = Number(toFixed(2)) และ exercise_hours"""
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    cols = {k: rng.choice(np.asarray(v, dtype=object), n) for k, v in FRONTEND_OPTIONS.items()}
+    age = np.clip(np.rint(rng.normal(40, 15, n)), 1, 120).astype(int)
+    height = np.clip(np.rint(rng.normal(165, 10, n)), 100, 250).astype(int)
+    weight = np.clip(np.rint(rng.normal(68, 15, n)), 20, 300).astype(int)
+    hours = rng.integers(0, 15, n)
+    return [{"gender": g, "age": int(a), "height_cm": int(h), "weight_kg": int(w), "bmi": round(w / (h / 100) ** 2, 2),
+             "disease": d, "allergies": al, "exercise_hours": int(x)}
+            for g, a, h, w, d, al, x in zip(cols["gender"], age, height, weight, cols["disease"], cols["allergies"], hours)]
+
+def best_of(fn, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter(); fn(); best = min(best, time.perf_counter() - t0)
+    return best
@@ -1,25 +1,53 @@
 # === diet_api.py ===
-from fastapi import FastAPI, UploadFile, File, HTTPException, Header, Depends, Request
-from fastapi.responses import Response, HTMLResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, Depends, Request, Query
+from fastapi.responses import Response, HTMLResponse, StreamingResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, EmailStr
-import joblib, pandas as pd, io, csv, uuid, time
+import pandas as pd, asyncio, json, os, time, shutil, tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
 from typing import Dict, Any, List, Optional
 from pathlib import Path
+from diet_store import open_store, SessionManager
+import diet_inference as inference
+import diet_formats as formats
+from diet_batcher import MicroBatcher
+from diet_executor import pool_from_env, workers_from_env
+from diet_loader import runtime_from_env
+from diet_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics_from_env
 
 # ------------------------------- Paths / storage
 BASE_DIR = Path(__file__).resolve().parent
 FRONTEND_DIR = BASE_DIR / "Front end"   # <<< ชื่อโฟลเดอร์ต้องตรงนี้
-USERS_CSV = BASE_DIR / "users.csv"
-SESSIONS_CSV = BASE_DIR / "sessions.csv"
 
 # ------------------------------- Load model + label encoder
-model = joblib.load(BASE_DIR / "diet_recommendation_rf_model.joblib")
-label_encoder = joblib.load(BASE_DIR / "label_encoder.joblib")
+# โหลดผ่าน ModelRuntime (ดู diet_loader.py: mmap / lazy / warm-up); งานทำนายทั้งหมดวิ่งใน pool ของตัวเอง
+# (ดู diet_executor.py) ไม่แย่ง threadpool กับ login/profile
+MODEL_PATH = BASE_DIR / "diet_recommendation_rf_model.joblib"
+rt = runtime_from_env(MODEL_PATH, BASE_DIR / "label_encoder.joblib", pool_from_env)
+
+async def _loaded():
+    # ตอน lazy-load ห้ามบล็อก event loop ระหว่างรอโหลด
+    return rt.current or await run_in_threadpool(rt.ensure)
+
+@asynccontextmanager
+async def _lease():
+    # ถือเวอร์ชันไว้ระหว่างใช้ pool → reload จะปิด pool เก่าหลัง request นี้ปล่อยแล้วเท่านั้น
+    await _loaded()
+    with rt.lease() as m:
+        yield m
 
 # ------------------------------- App
 app = FastAPI(title="Booming Diet API", version="1.0")
 
+# Prometheus metrics (diet_metrics.py): latency ต่อ route + เวลาแต่ละขั้นของการทำนาย → GET /metrics
+metrics = metrics_from_env()
+app.middleware("http")(metrics.middleware)
+metrics.gauge("diet_model_ready", "1 when the model is loaded and warmed up.", lambda: rt.ready)
+metrics.gauge("diet_model_reloads", "Model swaps since start.", lambda: rt.reloads)
+
 # กัน Failed to fetch (Private Network Access)
 @app.middleware("http")
 async def add_pna_header(request: Request, call_next):
@@ -30,46 +58,48 @@ async def add_pna_header(request: Request, call_next):
     response.headers["Access-Control-Allow-Private-Network"] = "true"
     return response
 
-# ------------------------------- CSV utils
-USER_FIELDS = [
-    "phone", "firstName", "lastName", "email", "address",
-    "dob_day", "dob_month", "dob_year", "agree", "marketingOptIn", "createdAt"
-]
-SESSION_FIELDS = ["token", "phone", "createdAt"]
-
-def ensure_csv(path: Path, headers: List[str]):
-    if not path.exists():
-        path.write_text(",".join(headers) + "\n", encoding="utf-8")
+# ------------------------------- User / session store
+# DIET_STORE=csv (ค่าเริ่มต้น, index ในหน่วยความจำ) หรือ sqlite (DIET_DB=path)
+# csv: เขียนผ่าน writer thread เดียว (group commit) + flock ข้าม process → ใช้กับ uvicorn --workers N ได้
+#   DIET_STORE_FSYNC=0 ปิด fsync / DIET_STORE_BATCH=N แถวสูงสุดต่อ commit / DIET_STORE_WAIT_MS=ms รอรวม batch
+STORE_KIND = os.getenv("DIET_STORE", "csv")
+store = open_store(STORE_KIND, BASE_DIR, Path(os.environ["DIET_DB"]) if os.getenv("DIET_DB") else None,
+                   **({"fsync": os.getenv("DIET_STORE_FSYNC", "1") == "1",
+                       "max_batch": int(os.getenv("DIET_STORE_BATCH", "256")),
+                       "max_wait_ms": float(os.getenv("DIET_STORE_WAIT_MS", "0"))} if STORE_KIND == "csv" else {}))
+# อายุ session (วินาที, 0 = ไม่หมดอายุ) / ขนาด cache token / รอบ compaction ของ sessions
+sessions = SessionManager(store,
+                          ttl=int(os.getenv("DIET_SESSION_TTL", str(30 * 24 * 3600))),
+                          cache_size=int(os.getenv("DIET_SESSION_CACHE", "10000")))
+SESSION_COMPACT_INTERVAL = float(os.getenv("DIET_SESSION_COMPACT_INTERVAL", "3600"))
 
 def read_user_by_phone(phone: str) -> Optional[Dict[str, str]]:
-    if not USERS_CSV.exists(): return None
-    with USERS_CSV.open("r", newline="", encoding="utf-8") as f:
-        for row in csv.DictReader(f):
-            if row.get("phone") == phone:
-                return row
-    return None
-
-def write_user(row: Dict[str, Any]):
-    ensure_csv(USERS_CSV, USER_FIELDS)
-    with USERS_CSV.open("a", newline="", encoding="utf-8") as f:
-        csv.DictWriter(f, fieldnames=USER_FIELDS).writerow(row)
+    return store.get_user(phone)
+
+def write_user(row: Dict[str, Any]) -> bool:
+    # False = phone ซ้ำ (ตรวจแบบ atomic ใน store)
+    return store.add_user(row)
 
 def create_session(phone: str) -> str:
-    ensure_csv(SESSIONS_CSV, SESSION_FIELDS)
-    token = uuid.uuid4().hex
-    with SESSIONS_CSV.open("a", newline="", encoding="utf-8") as f:
-        csv.DictWriter(f, fieldnames=SESSION_FIELDS).writerow(
-            {"token": token, "phone": phone, "createdAt": int(time.time())}
-        )
-    return token
+    return sessions.create(phone)
 
 def get_phone_from_token(token: str) -> Optional[str]:
-    if not SESSIONS_CSV.exists(): return None
-    with SESSIONS_CSV.open("r", newline="", encoding="utf-8") as f:
-        for row in csv.DictReader(f):
-            if row.get("token") == token:
-                return row.get("phone")
-    return None
+    return sessions.resolve(token)
+
+@app.on_event("startup")
+def _startup():
+    sessions.compact()
+    sessions.start_compactor(SESSION_COMPACT_INTERVAL)
+    if rt.lazy:
+        rt.start_background_load()
+    rt.start_watcher(float(os.getenv("DIET_MODEL_WATCH", "0")))
+
+@app.on_event("shutdown")
+def _shutdown():
+    sessions.stop()
+    store.close()
+    rt.shutdown()
+    batch_io.shutdown(wait=False)
 
 # ------------------------------- Schemas
 class LoginBody(BaseModel):
@@ -93,9 +123,23 @@ class Records(BaseModel):
     records: List[Dict[str, Any]]
 
 # ------------------------------- API (prefix /api/*)
+# liveness: ตอบเสมอ (ไม่รอโมเดล)
 @app.get("/api/health")
 def health():
-    return {"status": "ok", "classes": list(label_encoder.classes_), "n_classes": len(label_encoder.classes_)}
+    cur = rt.current
+    pool = cur.pool if cur else None
+    return {"status": "ok", "classes": cur.classes if cur else None, "n_classes": len(cur.classes) if cur else None,
+            "model": rt.stats(),
+            "executor": {"kind": pool.kind, "workers": pool.workers, "n_jobs": pool.n_jobs, "engine": pool.engine}
+            if pool else None,
+            "sessions": sessions.stats(), "store": store.stats(), "microbatch": batcher.stats() if batcher else None}
+
+# readiness: 503 จนกว่าโมเดลจะโหลด + warm-up เสร็จ
+@app.get("/api/ready")
+def ready():
+    if not rt.ready:
+        return JSONResponse({"ready": False, **rt.stats()}, status_code=503)
+    return {"ready": True, **rt.stats()}
 
 @app.post("/api/register")
 def api_register(payload: RegisterBody):
@@ -103,7 +147,8 @@ def api_register(payload: RegisterBody):
         raise HTTPException(status_code=400, detail="You must accept Terms & Privacy.")
     if read_user_by_phone(payload.phone):
         raise HTTPException(status_code=409, detail="Phone already registered.")
-    write_user({
+    # เช็คด้านบนเป็นแค่ทางลัด; ตัวตัดสินจริงคือ write_user (กัน register พร้อมกันหลาย request/worker)
+    if not write_user({
         "phone": payload.phone,
         "firstName": payload.firstName,
         "lastName": payload.lastName,
@@ -113,7 +158,8 @@ def api_register(payload: RegisterBody):
         "agree": str(payload.agree).lower(),
         "marketingOptIn": str(payload.marketingOptIn).lower(),
         "createdAt": int(time.time()),
-    })
+    }):
+        raise HTTPException(status_code=409, detail="Phone already registered.")
     return {"success": True, "message": "registered"}
 
 @app.post("/api/login")
@@ -146,39 +192,183 @@ def api_profile(phone: str = Depends(_auth)):
         "dob": {"day": user.get("dob_day"), "month": user.get("dob_month"), "year": user.get("dob_year")},
     }
 
+# DIET_MICROBATCH=1: รวม /api/predict-one ที่เข้ามาพร้อมกันเป็น batch เดียว
+# ทุก endpoint ทำนายผ่าน inference.predict: ตรวจฟิลด์บังคับ + เติม BMI + reindex/แปลงชนิดตาม schema ทั้ง batch
+def _stage(route: str):
+    return lambda name: metrics.stage(route, name)
+
+def _input_error(e: inference.InputError) -> HTTPException:
+    return HTTPException(status_code=422, detail={"message": str(e), "rows": e.errors, "n_bad": e.n_bad})
+
+def _predict_rows(rows: List[Dict[str, Any]]):
+    with rt.lease() as m:
+        metrics.rows("/api/predict-one", len(rows))
+        idx, proba = inference.predict(m, rows, stage=_stage("/api/predict-one"))
+    with metrics.stage("/api/predict-one", "postprocess"):
+        return inference.result_rows(idx, proba, m.classes, m.version)
+
+batcher = MicroBatcher(_predict_rows,
+                       max_batch=int(os.getenv("DIET_MICROBATCH_MAX_BATCH", "32")),
+                       max_wait_ms=float(os.getenv("DIET_MICROBATCH_MAX_WAIT_MS", "5")),
+                       concurrency=workers_from_env()) \
+    if os.getenv("DIET_MICROBATCH", "0") == "1" else None
+
 @app.post("/api/predict-one")
-def predict_one(record: Record):
-    df = pd.DataFrame([record.data])
-    pred_num = model.predict(df)[0]
-    pred_lbl = label_encoder.inverse_transform([pred_num])[0]
-    proba = model.predict_proba(df)[0]
-    return {"prediction": pred_lbl,
-            "probabilities": {str(c): float(proba[i]) for i, c in enumerate(label_encoder.classes_)}}
-
-@app.post("/api/predict")
-def predict_many(records: Records):
-    df = pd.DataFrame(records.records)
-    pred_num = model.predict(df)
-    pred_lbl = label_encoder.inverse_transform(pred_num)
-    proba = model.predict_proba(df)
-    results = []
-    for i in range(len(df)):
-        results.append({"prediction": pred_lbl[i],
-                        "probabilities": {str(c): float(proba[i, j]) for j, c in enumerate(label_encoder.classes_)}})
-    return {"count": len(results), "results": results}
+async def predict_one(record: Record):
+    try:
+        if batcher is not None:
+            return await batcher.submit(record.data)
+        async with _lease() as m:
+            metrics.rows("/api/predict-one", 1)
+            idx, proba = await inference.apredict(m, [record.data], stage=_stage("/api/predict-one"))
+    except inference.InputError as e:
+        raise _input_error(e)
+    with metrics.stage("/api/predict-one", "postprocess"):
+        return inference.result_rows(idx, proba, m.classes, m.version)[0]
+
+# parse/preprocess/encode ของ /api/predict และ /api/predict-csv วิ่งใน executor เฉพาะนี้ ส่วนโมเดลรอผ่าน pool.arun
+# → handler เป็น async ทั้งหมด ไม่ถือ thread ของ Starlette threadpool ไว้ระหว่างทำนาย (login/profile ไม่ต้องรอคิว)
+batch_io = ThreadPoolExecutor(int(os.getenv("DIET_BATCH_IO_WORKERS", "4")), thread_name_prefix="batch-io")
+
+async def _in_batch_io(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(batch_io, partial(fn, *args, **kwargs))
+
+# format=records (ค่าเดิม: dict ต่อแถว) หรือ compact: {"classes", "labels", "proba"}
+def _check_format(fmt: str):
+    if fmt not in inference.RESULT_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of {list(inference.RESULT_FORMATS)}")
+
+# n_jobs: จำนวน thread ที่ป่าใช้ได้สำหรับ request นี้ (ไม่ส่ง = DIET_INFER_N_JOBS, สูงสุด DIET_INFER_MAX_N_JOBS)
+# body ตาม Content-Type: JSON {"records": [...]} (เดิม) / {"columns": {...}} / Arrow IPC / Parquet (ดู diet_formats.py)
+# คำตอบตาม Accept: JSON (format=records|compact, ใช้ orjson ถ้ามี) / Arrow IPC / Parquet
+# ไม่ผ่าน pydantic ทีละแถว — ตรวจ schema/ฟิลด์บังคับทั้ง batch ใน inference.predict แทน
+PREDICT_BODY = {"requestBody": {"required": True, "content": {
+    formats.JSON: {"schema": {"oneOf": [Records.schema(),
+                                        {"type": "object", "properties": {"columns": {"type": "object"}}}]}},
+    **{mt: {"schema": {"type": "string", "format": "binary"}} for mt in formats.BINARY_TYPES}}}}
+
+@app.post("/api/predict", openapi_extra=PREDICT_BODY)
+async def predict_many(request: Request, format: str = Query("records"), n_jobs: Optional[int] = Query(None, gt=0)):
+    _check_format(format)
+    try:
+        media = formats.negotiate(request.headers.get("accept"))   # ก่อนทำนาย: 406 ไม่ต้องเสียเวลารันโมเดล
+    except formats.NotAcceptable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    body = await request.body()
+    try:
+        with metrics.stage("/api/predict", "parse"):
+            X = await _in_batch_io(formats.decode_body, body, request.headers.get("content-type"))
+        metrics.rows("/api/predict", len(X))
+        async with _lease() as m:
+            idx, proba = await inference.apredict(m, X, n_jobs, stage=_stage("/api/predict"), executor=batch_io)
+    except formats.UnsupportedFormat as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except formats.BadBody as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except inference.InputError as e:
+        raise _input_error(e)
+    with metrics.stage("/api/predict", "postprocess"):
+        try:
+            content, media_type = await _in_batch_io(formats.encode_results, idx, proba, m.classes, media, format, m.version)
+        except formats.UnsupportedFormat as e:
+            raise HTTPException(status_code=406, detail=str(e))
+    return Response(content, media_type=media_type, headers={"X-Model-Version": m.version})
+
+# stream=ndjson|csv: อ่านไฟล์ทีละ chunksize แถว ทำนาย แล้วส่งผลทยอยออกไป (หน่วยความจำไม่โตตามขนาดไฟล์)
+CSV_CHUNKSIZE = int(os.getenv("DIET_CSV_CHUNKSIZE", "10000"))
+
+def _stream_error(fmt: str, message: str, rows=None) -> str:
+    # header ส่งไปแล้ว เปลี่ยน status ไม่ได้ → แจ้ง error เป็นบรรทัดสุดท้ายแล้วหยุด
+    if fmt == "ndjson":
+        return json.dumps({"error": message, **({"rows": rows} if rows is not None else {})}, ensure_ascii=False) + "\n"
+    return f"# error: {message}\n"
+
+async def _stream_predictions(announced, src, chunksize: int, fmt: str, n_jobs: Optional[int]):
+    # lease ถูกจองตอน generator เริ่มทำงานเท่านั้น: ถ้า client ตัดก่อน chunk แรก / response ไม่ถูกอ่านเลย
+    # ก็ไม่มีอะไรค้าง (pool เก่าปิดได้หลัง reload). ใช้เวอร์ชันเดียวกับ X-Model-Version ถ้ายังใช้ได้
+    m = announced.try_acquire() or rt.acquire()
+    try:
+        reader, i = None, 0
+        while True:
+            try:
+                if reader is None:
+                    reader = await _in_batch_io(pd.read_csv, src, chunksize=chunksize)
+                chunk = await _in_batch_io(next, reader, None)
+            except (pd.errors.EmptyDataError, pd.errors.ParserError) as e:
+                yield _stream_error(fmt, f"invalid CSV: {e}")
+                return
+            if chunk is None: break
+            metrics.rows("/api/predict-csv", len(chunk))
+            try:
+                idx, proba = await inference.apredict(m, chunk, n_jobs, stage=_stage("/api/predict-csv"),
+                                                      executor=batch_io)
+            except inference.InputError as e:
+                off = i * chunksize
+                yield _stream_error(fmt, str(e), [{**r, "row": r["row"] + off} for r in e.errors])
+                return
+            with metrics.stage("/api/predict-csv", "postprocess"):
+                out = await _in_batch_io(inference.stream_chunk, idx, proba, m.classes, fmt, i == 0)
+            yield out
+            i += 1
+    finally:
+        src.close()
+        m.release()
 
 @app.post("/api/predict-csv")
-def predict_csv(file: UploadFile = File(...)):
-    content = file.file.read()
-    df = pd.read_csv(io.BytesIO(content))
-    pred_num = model.predict(df)
-    pred_lbl = label_encoder.inverse_transform(pred_num)
-    proba = model.predict_proba(df)
-    results = []
-    for i in range(len(df)):
-        results.append({"prediction": pred_lbl[i],
-                        "probabilities": {str(c): float(proba[i, j]) for j, c in enumerate(label_encoder.classes_)}})
-    return {"count": len(results), "results": results}
+async def predict_csv(file: UploadFile = File(...), format: str = Query("records"),
+                stream: Optional[str] = Query(None), chunksize: int = Query(CSV_CHUNKSIZE, gt=0),
+                n_jobs: Optional[int] = Query(None, gt=0)):
+    if stream is not None:
+        if stream not in inference.STREAM_FORMATS:
+            raise HTTPException(status_code=422, detail=f"stream must be one of {list(inference.STREAM_FORMATS)}")
+        # ย้าย upload ไปไฟล์ชั่วคราวของเราเอง (copy ทีละ 1MB) เพราะ UploadFile อาจถูกปิดก่อน stream จบ
+        src = tempfile.TemporaryFile()
+        await _in_batch_io(shutil.copyfileobj, file.file, src, 1 << 20)
+        if src.tell() == 0:
+            src.close()
+            raise HTTPException(status_code=400, detail="empty CSV upload")
+        src.seek(0)
+        m = await _loaded()
+        # ไม่จอง lease ที่นี่ (ดู _stream_predictions); TemporaryFile ไม่มีชื่อบนดิสก์ ถ้า generator ไม่เคยเริ่ม
+        # fd ถูกปิดเมื่อ response ถูกทิ้ง
+        return StreamingResponse(_stream_predictions(m, src, chunksize, stream, n_jobs),
+                                 media_type=inference.STREAM_FORMATS[stream],
+                                 headers={"X-Model-Version": m.version})
+    _check_format(format)
+    with metrics.stage("/api/predict-csv", "parse"):
+        try:
+            df = await _in_batch_io(pd.read_csv, file.file)
+        except (pd.errors.EmptyDataError, pd.errors.ParserError) as e:
+            raise HTTPException(status_code=400, detail=f"invalid CSV: {e}")
+    metrics.rows("/api/predict-csv", len(df))
+    try:
+        async with _lease() as m:
+            idx, proba = await inference.apredict(m, df, n_jobs, stage=_stage("/api/predict-csv"), executor=batch_io)
+    except inference.InputError as e:
+        raise _input_error(e)
+    with metrics.stage("/api/predict-csv", "postprocess"):
+        content = await _in_batch_io(lambda: formats.dumps(inference.format_results(idx, proba, m.classes, format, m.version)))
+    return Response(content, media_type=formats.JSON)
+
+# ------------------------------- Admin
+# สลับโมเดลโดยไม่ restart: POST /api/admin/reload?version=<ชื่อในทะเบียน> พร้อม header X-Admin-Token
+# (ปิดไว้ถ้าไม่ได้ตั้ง DIET_ADMIN_TOKEN)
+def _admin(x_admin_token: Optional[str] = Header(None)):
+    expected = os.getenv("DIET_ADMIN_TOKEN")
+    if not expected or x_admin_token != expected:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+
+@app.post("/api/admin/reload", dependencies=[Depends(_admin)])
+def admin_reload(version: Optional[str] = Query(None), force: bool = Query(False)):
+    try:
+        m = rt.reload(version, force)
+    except (KeyError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "model_version": m.version, **rt.stats()}
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
 
 # ------------------------------- Serve Frontend
 # เสิร์ฟไฟล์ static ถ้ามี (รูป/JS/CSS) เรียกด้วย /static/...
@@ -0,0 +1,104 @@
+# ==== diet_batcher.py ====
+# รวม request ทำนายทีละรายการที่เข้ามาพร้อม ๆ กันเป็น batch เดียว (รอไม่เกิน max_wait_ms หรือครบ max_batch)
+# แล้วเรียกโมเดลครั้งเดียว — ค่า overhead ต่อครั้งของ Pipeline ถูกหารด้วยขนาด batch
+# ส่งได้หลาย batch พร้อมกันไม่เกิน concurrency (ควรเท่าจำนวน worker ของ inference pool) ระหว่างนั้นรวม batch ถัดไปต่อ
+import asyncio, time
+from typing import Any, Callable, Dict, List, Optional
+
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+class MicroBatcher:
+    """fn(items) -> results (ยาวเท่ากัน, เรียกแบบ sync ใน executor); ใช้ผ่าน `await batcher.submit(item)`"""
+
+    def __init__(self, fn: Callable[[List[Any]], List[Any]], max_batch: int = 32, max_wait_ms: float = 5.0,
+                 executor=None, concurrency: int = 1):
+        self.fn = fn
+        self.concurrency = max(1, concurrency)
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight = set()
+        self.batches = 0
+        self.items = 0
+        self.batch_hist = {**{b: 0 for b in BATCH_BUCKETS}, "+Inf": 0}
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    async def submit(self, item: Any) -> Any:
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        fut = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, fut, time.perf_counter()))
+        return await fut
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.concurrency)
+        while True:
+            # รอช่องว่างก่อนค่อยเริ่มรวม batch: ตอนโหลดเต็ม request จะกองในคิว → batch ถัดไปใหญ่ขึ้นเอง
+            await slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0: break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._record(batch)
+            task = loop.create_task(self._dispatch(batch, slots))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch, slots: asyncio.Semaphore):
+        items = [b[0] for b in batch]
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(self.executor, self._call, items)
+        except Exception as e:
+            results = [e] * len(items)
+        finally:
+            slots.release()
+        for (_, fut, _), r in zip(batch, results):
+            if fut.done(): continue   # client ยกเลิกไปแล้ว
+            if isinstance(r, Exception): fut.set_exception(r)
+            else: fut.set_result(r)
+
+    def _call(self, items: List[Any]) -> List[Any]:
+        try:
+            return self.fn(items)
+        except Exception:
+            if len(items) == 1: raise
+        # batch พังเพราะรายการใดรายการหนึ่ง → ทำทีละรายการ ให้ error ตกกับ request ต้นเหตุเท่านั้น
+        out = []
+        for it in items:
+            try:
+                out.append(self.fn([it])[0])
+            except Exception as e:
+                out.append(e)
+        return out
+
+    def _record(self, batch):
+        now = time.perf_counter()
+        n = len(batch)
+        self.batches += 1
+        self.items += n
+        self.batch_hist[next((b for b in BATCH_BUCKETS if n <= b), "+Inf")] += 1
+        for _, _, t in batch:
+            w = now - t
+            self.queue_wait_total += w
+            self.queue_wait_max = max(self.queue_wait_max, w)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch": self.max_batch, "max_wait_ms": self.max_wait * 1000.0,
+            "concurrency": self.concurrency, "inflight": len(self._inflight),
+            "batches": self.batches, "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "batch_size_hist": {f"le_{b}": c for b, c in self.batch_hist.items()},
+            "avg_queue_ms": self.queue_wait_total / self.items * 1000.0 if self.items else 0.0,
+            "max_queue_ms": self.queue_wait_max * 1000.0,
+        }
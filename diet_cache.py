@@ -0,0 +1,87 @@
+# ==== diet_cache.py ====
+# LRU cache ของผลทำนาย โดยใช้ feature ที่ normalize แล้วเป็น key (หลังคำนวณ BMI + coercion แบบ server/api.py)
+# ล้างทั้งหมดอัตโนมัติเมื่อไฟล์โมเดลถูกแก้ (mtime/size เปลี่ยน)
+import os, sys, threading, time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from diet_features import to_float, to_str
+
+def _sizeof(obj) -> int:
+    # ขนาดโดยประมาณของ key / ผลลัพธ์ (tuple, dict, list, str, float) แบบ recursive
+    n = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        n += sum(_sizeof(k) + _sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (tuple, list)):
+        n += sum(_sizeof(v) for v in obj)
+    return n
+
+class PredictionCache:
+    def __init__(self, cat_cols: List[str], num_cols: List[str], maxsize: int = 10000,
+                 model_path: Optional[Path] = None, check_interval: float = 1.0):
+        self.cat_cols, self.num_cols = list(cat_cols), list(num_cols)
+        self.maxsize = maxsize
+        self.model_path = Path(model_path) if model_path else None
+        self.check_interval = check_interval
+        self._data: "OrderedDict[Tuple, Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp = self._model_stamp()
+        self._checked = time.monotonic()
+        self.hits = self.misses = self.invalidations = self.bytes = 0
+
+    def _model_stamp(self):
+        if self.model_path is None: return None
+        try:
+            st = os.stat(self.model_path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def _check_model(self):
+        # stat ไฟล์โมเดลไม่เกินหนึ่งครั้งต่อ check_interval วินาที
+        now = time.monotonic()
+        if now - self._checked < self.check_interval: return
+        self._checked = now
+        stamp = self._model_stamp()
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self.clear()
+            self.invalidations += 1
+
+    def key(self, d: Dict[str, Any]) -> Tuple:
+        return tuple(to_str(d.get(c)) for c in self.cat_cols) + tuple(to_float(d.get(c)) for c in self.num_cols)
+
+    def get(self, key: Tuple):
+        self._check_model()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def put(self, key: Tuple, value: Any):
+        if self.maxsize <= 0: return
+        size = _sizeof(key) + _sizeof(value)
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None: self.bytes -= old[1]
+            self._data[key] = (value, size)
+            self.bytes += size
+            while len(self._data) > self.maxsize:
+                _, (_, s) = self._data.popitem(last=False)
+                self.bytes -= s
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {"entries": len(self._data), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "approx_bytes": self.bytes,
+                "invalidations": self.invalidations}
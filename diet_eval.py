@@ -0,0 +1,159 @@
+# ==== diet_eval.py ====
+# สรุปผลแบบ WEKA (per-class, confusion matrix, kappa, MAE/RMSE/RAE/RRSE) ด้วยตัวสะสมที่อัปเดตทีละ chunk
+# เก็บแค่ confusion matrix (K×K) + ผลรวมของ error → ประเมินชุดทดสอบหลักล้านแถวได้ด้วยหน่วยความจำคงที่
+# error คิดจากความน่าจะเป็นของคลาสจริง p_t ไม่ต้องสร้าง one-hot:
+#   Σ_j |y_j - p_j|   = Σ|p| - p_t + |1 - p_t|
+#   Σ_j (y_j - p_j)^2 = Σp² - p_t² + (1 - p_t)²
+# baseline (prior จากสัดส่วนคลาสในชุดประเมิน) คำนวณจากจำนวนต่อคลาสตอนท้ายได้เลย
+import os
+from pathlib import Path
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+def label_index(classes, labels) -> np.ndarray:
+    """label → index ใน classes (vectorized); คลาสที่ไม่รู้จัก/ค่าว่าง = -1"""
+    return pd.Index(list(classes)).get_indexer(pd.Index(np.asarray(labels, dtype=object)))
+
+def aligned_proba(model, X, n_classes: int) -> np.ndarray:
+    """predict_proba ที่คอลัมน์เรียงตาม index ของ LabelEncoder (โมเดลอาจไม่เคยเห็นบางคลาสตอน fit)"""
+    proba = np.asarray(model.predict_proba(X), dtype=np.float64)
+    cols = np.asarray(model.classes_, dtype=np.intp)
+    if proba.shape[1] == n_classes and np.array_equal(cols, np.arange(n_classes)):
+        return proba
+    out = np.zeros((proba.shape[0], n_classes), dtype=np.float64)
+    out[:, cols] = proba
+    return out
+
+class WekaAccumulator:
+    def __init__(self, classes):
+        self.classes = [str(c) for c in classes]
+        k = len(self.classes)
+        self.cm = np.zeros((k, k), dtype=np.int64)
+        self.abs_sum = 0.0
+        self.sq_sum = 0.0
+        self.ignored = 0
+
+    @property
+    def n(self) -> int:
+        return int(self.cm.sum())
+
+    def update(self, y_true_idx, proba, y_pred_idx=None):
+        """y_true_idx: index ของคลาสจริง (-1 = ignore), proba: [N, K] เรียงตาม classes"""
+        y = np.asarray(y_true_idx, dtype=np.intp)
+        proba = np.asarray(proba, dtype=np.float64)
+        keep = y >= 0
+        if not keep.all():
+            self.ignored += int((~keep).sum())
+            y, proba = y[keep], proba[keep]
+            if y_pred_idx is not None: y_pred_idx = np.asarray(y_pred_idx)[keep]
+        if len(y) == 0: return self
+        pred = proba.argmax(axis=1) if y_pred_idx is None else np.asarray(y_pred_idx, dtype=np.intp)
+        k = len(self.classes)
+        self.cm += np.bincount(y * k + pred, minlength=k * k).reshape(k, k)
+        p_t = proba[np.arange(len(y)), y]
+        self.abs_sum += float((np.abs(proba).sum(axis=1) - p_t + np.abs(1.0 - p_t)).sum())
+        self.sq_sum += float((np.einsum("ij,ij->i", proba, proba) - p_t ** 2 + (1.0 - p_t) ** 2).sum())
+        return self
+
+    def merge(self, other: "WekaAccumulator") -> "WekaAccumulator":
+        self.cm += other.cm
+        self.abs_sum += other.abs_sum
+        self.sq_sum += other.sq_sum
+        self.ignored += other.ignored
+        return self
+
+    def metrics(self) -> Dict:
+        n = self.n
+        if n == 0:
+            raise ValueError("ไม่มี instance สำหรับประเมินหลัง ignore class unknown instances")
+        cm = self.cm.astype(np.float64)
+        tp, support, predicted = np.diag(cm), cm.sum(axis=1), cm.sum(axis=0)
+        prec = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+        rec = np.divide(tp, support, out=np.zeros_like(tp), where=support > 0)
+        f1 = np.divide(2 * prec * rec, prec + rec, out=np.zeros_like(tp), where=(prec + rec) > 0)
+        correct = int(tp.sum())
+        # kappa เหมือน cohen_kappa_score: 1 - off-diagonal ที่เห็นจริง / off-diagonal ที่คาดไว้
+        expected = np.outer(support, predicted) / n
+        off_exp = expected.sum() - np.trace(expected)
+        kappa = 1.0 - (n - correct) / off_exp if off_exp > 0 else float("nan")
+        # baseline: ทำนายด้วย prior q ทุกแถว → error ต่อแถวขึ้นกับ q_t อย่างเดียว
+        q = support / n
+        abs_base = float((support * (1.0 - q + np.abs(1.0 - q))).sum())
+        sq_base = float((support * ((q ** 2).sum() - q ** 2 + (1.0 - q) ** 2)).sum())
+        mae, rmse = self.abs_sum / (2.0 * n), np.sqrt(self.sq_sum / (2.0 * n))
+        mae_base, rmse_base = abs_base / (2.0 * n), np.sqrt(sq_base / (2.0 * n))
+        return {
+            "n": n, "correct": correct, "incorrect": n - correct, "accuracy": correct / n,
+            "precision": prec, "recall": rec, "f1": f1, "support": support.astype(int),
+            "kappa": kappa, "mae": mae, "rmse": rmse,
+            "rae": (mae / mae_base) * 100.0 if mae_base > 0 else float("inf"),
+            "rrse": (rmse / rmse_base) * 100.0 if rmse_base > 0 else float("inf"),
+        }
+
+def evaluate_chunks(model, le, chunks: Iterable) -> WekaAccumulator:
+    """chunks = (X, y_label) ทีละส่วน → ทำนาย 1 ครั้งต่อ chunk แล้วทิ้ง; ใช้หน่วยความจำเท่ากับ chunk เดียว"""
+    acc = WekaAccumulator(le.classes_)
+    k = len(le.classes_)
+    for X, y in chunks:
+        acc.update(label_index(le.classes_, y), aligned_proba(model, X, k))
+    return acc
+
+def write_report(acc: WekaAccumulator, title="WEKA-STYLE EVALUATION", save_dir="eval_output_rf"):
+    os.makedirs(save_dir, exist_ok=True)
+    txt_path = Path(save_dir, "summary.txt")
+    percls_csv = Path(save_dir, "detailed_accuracy_by_class.csv")
+    cm_csv = Path(save_dir, "confusion_matrix.csv")
+    m = acc.metrics()
+    classes = acc.classes
+
+    lines = []
+    add = lines.append
+    add(f"\n========== {title} ==========\n")
+    add(f"Total number of instances (after ignore): {m['n']}")
+
+    # 1) Detailed accuracy by class
+    per_class_df = pd.DataFrame({
+        "Class": classes, "Precision": m["precision"], "Recall": m["recall"], "F1-Score": m["f1"],
+        "Support": m["support"]
+    })
+    add("\n📊 Detailed Accuracy By Class")
+    add(per_class_df.to_string(index=False))
+
+    # 2) Confusion matrix
+    cm_df = pd.DataFrame(acc.cm, index=[f"true_{c}" for c in classes],
+                            columns=[f"pred_{c}" for c in classes])
+    add("\n🧩 Confusion Matrix (rows=true, cols=predicted)")
+    add(cm_df.to_string())
+
+    # 3) Correct/Incorrect/Total
+    add(f"\n✅ Correctly classified instances:   {m['correct']} / {m['n']}  ({m['accuracy']*100:.2f}%)")
+    add(f"❌ Incorrectly classified instances: {m['incorrect']} / {m['n']}  ({(1-m['accuracy'])*100:.2f}%)")
+    add(f"📦 Total number of instances:        {m['n']}")
+    add(f"🔎 (ignore class unknown instances เปิดใช้งานแล้ว: ข้าม {acc.ignored} แถว)")
+
+    # 4) Kappa
+    add(f"\n🤝 Kappa statistic: {m['kappa']:.6f}")
+
+    # 5) MAE/RMSE (probability-based)
+    add(f"\n📐 Mean absolute error (MAE): {m['mae']:.6f}")
+    add(f"📐 Root mean squared error (RMSE): {m['rmse']:.6f}")
+
+    # 6) RAE/RRSE เทียบ baseline (prior distribution)
+    add(f"📏 Relative absolute error (RAE): {m['rae']:.2f}%")
+    add(f"📏 Root relative squared error (RRSE): {m['rrse']:.2f}%")
+
+    print("\n".join(lines))
+    with open(txt_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    per_class_df.to_csv(percls_csv, index=False, encoding="utf-8-sig")
+    cm_df.to_csv(cm_csv, encoding="utf-8-sig")
+    print(f"\n💾 Saved report: {txt_path}")
+    print(f"💾 Saved per-class metrics: {percls_csv}")
+    print(f"💾 Saved confusion matrix: {cm_csv}")
+    return {
+        "per_class": per_class_df, "confusion_matrix": cm_df,
+        "correct": m["correct"], "incorrect": m["incorrect"], "total": m["n"],
+        "kappa": m["kappa"], "mae": m["mae"], "rmse": m["rmse"], "rae_pct": m["rae"], "rrse_pct": m["rrse"]
+    }
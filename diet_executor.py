@@ -0,0 +1,121 @@
+# ==== diet_executor.py ====
+# pool สำหรับงานทำนายโดยเฉพาะ แยกจาก threadpool ของ Starlette (ที่ใช้ทำ login/profile/CSV I/O)
+#   DIET_INFER_EXECUTOR=thread|process   ชนิดของ pool (process = โหลดโมเดลหนึ่งชุดต่อ worker ผ่าน initializer)
+#   DIET_INFER_WORKERS=N                 จำนวน worker (= จำนวนงานทำนายที่รันพร้อมกันได้สูงสุด)
+#   DIET_INFER_N_JOBS=k                  จำนวน thread ที่ป่าหนึ่งครั้งใช้ได้ (ค่าเริ่มต้น 1 แทน n_jobs=-1 ตอนฝึก)
+#   DIET_ENGINE=sklearn|flat             flat = เดินป่าด้วย FlatForest (diet_forest.py), DIET_FLAT_FOREST=dir ถ้า export ไว้
+#                                        (+ DIET_MODEL_MMAP=1 → อาร์เรย์ของป่า mmap แชร์ข้าม worker/process)
+#   DIET_FAST_PREP=1                     แปลง dict → เมทริกซ์ด้วย FeatureEncoder (diet_features.py) แทน ColumnTransformer
+import asyncio, os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import joblib
+import pandas as pd
+from joblib import parallel_backend
+
+import diet_inference as inference
+from diet_forest import FlatPipeline, compile_pipeline
+from diet_features import fast_pipeline
+
+_model = None   # โมเดลของ process worker (โหลดเองใน initializer); pool แบบ thread ส่งโมเดลของตัวเองเข้าไปแทน
+
+def unpin_n_jobs(model):
+    """ตั้ง n_jobs ของป่าเป็น None เพื่อให้จำนวน thread ถูกกำหนดต่อ request ผ่าน parallel_backend"""
+    est = model.steps[-1][1] if hasattr(model, "steps") else model
+    if hasattr(est, "n_jobs"):
+        est.n_jobs = None
+    return model
+
+def with_engine(model, engine: str = "sklearn", forest_path: Optional[str] = None, fast_prep: bool = False,
+                mmap: bool = False):
+    if engine == "flat":
+        if not isinstance(model, FlatPipeline):
+            model = compile_pipeline(model, forest_path, mmap)
+    elif engine == "sklearn":
+        model = unpin_n_jobs(model)
+    else:
+        raise ValueError(f"unknown engine: {engine!r} (ใช้ 'sklearn' หรือ 'flat')")
+    if fast_prep:
+        model = fast_pipeline(model) or model
+    return model
+
+def _init_worker(model_path: str, engine: str, forest_path: Optional[str], fast_prep: bool, mmap: bool):
+    global _model
+    # ป่าของ sklearn ที่ unpickle ในแต่ละ worker เป็นหน่วยความจำส่วนตัวเสมอ → ถ้าใช้ flat + mmap จะถูกทิ้งหลัง compile
+    _model = with_engine(joblib.load(model_path), engine, forest_path, fast_prep, mmap)
+
+def _predict_with(model, X, n_jobs: int):
+    if not isinstance(X, pd.DataFrame) and not getattr(model, "accepts_records", False):
+        X = pd.DataFrame(X)
+    # backend ของ joblib เป็น thread-local → n_jobs ต่อ request ไม่ชนกันระหว่าง thread
+    with parallel_backend("threading", n_jobs=n_jobs):
+        return inference.predict_proba(model, X)
+
+def _predict_proba(X, n_jobs: int):
+    return _predict_with(_model, X, n_jobs)
+
+class InferencePool:
+    def __init__(self, model, kind: str = "thread", workers: Optional[int] = None, n_jobs: int = 1,
+                 max_n_jobs: Optional[int] = None, model_path: Optional[Path] = None,
+                 engine: str = "sklearn", forest_path: Optional[str] = None, fast_prep: bool = False,
+                 mmap: bool = False):
+        self.kind = kind
+        self.engine = engine
+        self.workers = workers or max(1, (os.cpu_count() or 1) // max(1, n_jobs))
+        self.n_jobs = n_jobs
+        self.max_n_jobs = max_n_jobs or (os.cpu_count() or 1)
+        # แต่ละ pool ถือโมเดลของตัวเอง → สลับเวอร์ชันได้โดย request ที่ค้างอยู่ยังใช้ pool/โมเดลเดิมจนจบ
+        # shared_model: FlatPipeline ที่ป่าเป็น memmap (ใช้แทน Pipeline ของ sklearn ได้ทั้ง process → ทิ้งต้นไม้ส่วนตัว)
+        self.shared_model = None
+        if engine == "flat" and mmap and forest_path and Path(forest_path).is_dir():
+            self.shared_model = model = compile_pipeline(model, forest_path, mmap=True)
+        self.model = with_engine(model, engine, forest_path, fast_prep, mmap)
+        # True เมื่อส่ง list ของ dict เข้ามาได้เลยโดยไม่ต้องสร้าง DataFrame ก่อน
+        self.accepts_records = getattr(self.model, "accepts_records", False)
+        if kind == "thread":
+            self.executor = ThreadPoolExecutor(self.workers, thread_name_prefix="inference")
+        elif kind == "process":
+            if model_path is None:
+                raise ValueError("process executor ต้องระบุ model_path ให้ worker โหลดเอง")
+            self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                                initargs=(str(model_path), engine, forest_path, fast_prep, mmap))
+        else:
+            raise ValueError(f"unknown executor: {kind!r} (ใช้ 'thread' หรือ 'process')")
+
+    def _jobs(self, n_jobs: Optional[int]) -> int:
+        return max(1, min(n_jobs or self.n_jobs, self.max_n_jobs))
+
+    def _task(self, X, n_jobs: Optional[int]):
+        if self.kind == "process":
+            return (_predict_proba, X, self._jobs(n_jobs))
+        return (_predict_with, self.model, X, self._jobs(n_jobs))
+
+    def run(self, X, n_jobs: Optional[int] = None):
+        """เรียกจาก thread อื่น (sync) → (labels_idx, proba)"""
+        return self.executor.submit(*self._task(X, n_jobs)).result()
+
+    async def arun(self, X, n_jobs: Optional[int] = None):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, *self._task(X, n_jobs))
+
+    def shutdown(self, wait: bool = False):
+        self.executor.shutdown(wait=wait)
+
+def workers_from_env() -> int:
+    """จำนวน worker ที่ pool_from_env จะใช้ (ค่าเดียวกับ default ของ InferencePool)"""
+    if os.getenv("DIET_INFER_WORKERS"):
+        return int(os.environ["DIET_INFER_WORKERS"])
+    return max(1, (os.cpu_count() or 1) // max(1, int(os.getenv("DIET_INFER_N_JOBS", "1"))))
+
+def pool_from_env(model, model_path: Path, mmap: bool = False) -> InferencePool:
+    return InferencePool(model,
+                         kind=os.getenv("DIET_INFER_EXECUTOR", "thread"),
+                         workers=workers_from_env(),
+                         n_jobs=int(os.getenv("DIET_INFER_N_JOBS", "1")),
+                         max_n_jobs=int(os.environ["DIET_INFER_MAX_N_JOBS"]) if os.getenv("DIET_INFER_MAX_N_JOBS") else None,
+                         model_path=model_path,
+                         engine=os.getenv("DIET_ENGINE", "sklearn"),
+                         forest_path=os.getenv("DIET_FLAT_FOREST"),
+                         fast_prep=os.getenv("DIET_FAST_PREP", "0") == "1",
+                         mmap=mmap)
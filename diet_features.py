@@ -0,0 +1,137 @@
+# ==== diet_features.py ====
+# แปลง dict / list ของ dict เป็นเมทริกซ์ feature ตรง ๆ ด้วยค่าที่ดึงจาก ColumnTransformer ที่ fit แล้ว
+# (map หมวดหมู่ → index ของคอลัมน์ one-hot, mean/scale ของ StandardScaler) — ไม่ต้องสร้าง DataFrame ต่อ request
+#   python diet_features.py verify --model server/diet_recommendation_rf_model.joblib
+import argparse, math
+import numpy as np
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+def to_float(v) -> float:
+    # เหมือน pd.to_numeric(errors="coerce").fillna(0)
+    if v is None or isinstance(v, bool): return float(v or 0)
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(f) else f
+
+def to_str(v) -> str:
+    # เหมือน astype(str): ค่าว่าง/NaN กลายเป็น "nan"
+    if v is None or (isinstance(v, float) and math.isnan(v)): return "nan"
+    return str(v)
+
+class FeatureEncoder:
+    def __init__(self, cat_cols: List[str], cat_maps: List[Dict[str, int]], cat_offset: int,
+                 num_cols: List[str], mean, scale, num_offset: int, n_features: int):
+        self.cat_cols, self.cat_maps, self.cat_offset = cat_cols, cat_maps, cat_offset
+        self.num_cols, self.num_offset = num_cols, num_offset
+        self.mean = np.zeros(len(num_cols)) if mean is None else np.asarray(mean, dtype=np.float64)
+        self.scale = np.ones(len(num_cols)) if scale is None else np.asarray(scale, dtype=np.float64)
+        self.n_features = n_features
+
+    @classmethod
+    def from_prep(cls, prep) -> "FeatureEncoder":
+        """รองรับ ColumnTransformer ที่มีแค่ ("cat", OneHotEncoder) + ("num", StandardScaler), remainder="drop"
+        แบบอื่นจะ raise ValueError → ผู้เรียกควรใช้ prep.transform ตามเดิม"""
+        cat_cols, cat_maps, num_cols, mean, scale = [], [], [], None, None
+        cat_offset = num_offset = offset = 0
+        for name, trans, cols in prep.transformers_:
+            if isinstance(trans, str):
+                if trans == "drop": continue
+                raise ValueError(f"unsupported transformer for fast path: {name}={trans}")
+            kind = type(trans).__name__
+            if kind == "OneHotEncoder":
+                if getattr(trans, "drop_idx_", None) is not None or getattr(trans, "infrequent_categories_", None):
+                    raise ValueError("OneHotEncoder with drop/infrequent categories is not supported")
+                cat_cols, cat_offset = list(cols), offset
+                pos = offset
+                for cats in trans.categories_:
+                    cat_maps.append({to_str(c): pos + i for i, c in enumerate(cats)})
+                    pos += len(cats)
+                offset = pos
+            elif kind == "StandardScaler":
+                num_cols, num_offset = list(cols), offset
+                mean = trans.mean_ if trans.with_mean else None
+                scale = trans.scale_ if trans.with_std else None
+                offset += len(cols)
+            else:
+                raise ValueError(f"unsupported transformer for fast path: {name}={kind}")
+        return cls(cat_cols, cat_maps, cat_offset, num_cols, mean, scale, num_offset, offset)
+
+    def _column(self, X, c) -> List[Any]:
+        if isinstance(X, list):
+            return [r.get(c) for r in X]
+        return X[c].tolist() if c in X.columns else [None] * len(X)
+
+    def encode(self, X) -> np.ndarray:
+        """X = list ของ dict หรือ DataFrame → ndarray (n, n_features) เหมือน prep.transform"""
+        if isinstance(X, dict): X = [X]
+        n = len(X)
+        out = np.zeros((n, self.n_features), dtype=np.float64)
+        rows = np.arange(n)
+        for c, m in zip(self.cat_cols, self.cat_maps):
+            idx = np.fromiter((m.get(to_str(v), -1) for v in self._column(X, c)), dtype=np.intp, count=n)
+            hit = idx >= 0                       # หมวดที่ไม่รู้จัก → ศูนย์ทั้งแถว (handle_unknown="ignore")
+            out[rows[hit], idx[hit]] = 1.0
+        if self.num_cols:
+            num = np.array([[to_float(v) for v in self._column(X, c)] for c in self.num_cols], dtype=np.float64).T
+            out[:, self.num_offset:self.num_offset + len(self.num_cols)] = (num - self.mean) / self.scale
+        return out
+
+class FastPipeline:
+    """encoder → ป่า (RandomForest ของ sklearn หรือ FlatForest) รับ list ของ dict ได้ตรง ๆ"""
+    accepts_records = True
+
+    def __init__(self, encoder: FeatureEncoder, forest):
+        self.encoder = encoder
+        self.forest = forest
+        self.classes_ = forest.classes_
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self.forest.predict_proba(self.encoder.encode(X))
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def fast_pipeline(model) -> Optional[FastPipeline]:
+    """Pipeline(prep → model) หรือ FlatPipeline → FastPipeline; คืน None ถ้า prep ไม่รองรับ"""
+    steps = dict(getattr(model, "named_steps", {}))
+    prep = getattr(model, "prep", steps.get("prep"))
+    forest = getattr(model, "forest", steps.get("model"))
+    if prep is None or forest is None: return None
+    try:
+        return FastPipeline(FeatureEncoder.from_prep(prep), forest)
+    except ValueError as e:
+        print(f"[WARN] fast preprocessing disabled: {e}")
+        return None
+
+if __name__ == "__main__":
+    import joblib, sys
+    import pandas as pd
+    ap = argparse.ArgumentParser(description="check FeatureEncoder against the fitted ColumnTransformer")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    v = sub.add_parser("verify")
+    v.add_argument("--model", type=Path, required=True)
+    v.add_argument("--rows", type=int, default=5000)
+    v.add_argument("--tol", type=float, default=1e-9)
+    args = ap.parse_args()
+
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "benchmarks"))
+    from common import synth_records
+    model = joblib.load(args.model)
+    prep = model.named_steps["prep"]
+    enc = FeatureEncoder.from_prep(prep)
+    rows = synth_records(model, args.rows)
+    rows[0] = {}                                          # ค่าว่างทั้งแถว
+    if len(rows) > 1: rows[1] = {**rows[1], **{c: "__unknown__" for c in enc.cat_cols}}
+    df = pd.DataFrame(rows).reindex(columns=list(prep.feature_names_in_))
+    df[enc.num_cols] = df[enc.num_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+    df[enc.cat_cols] = df[enc.cat_cols].astype(str)
+    ref = np.asarray(prep.transform(df), dtype=np.float64)
+    for name, X in (("records", rows), ("frame", df)):
+        diff = np.abs(enc.encode(X) - ref).max()
+        print(f"max |encoder({name}) - prep.transform| = {diff:.3e} over {len(rows)} rows")
+        if diff > args.tol:
+            raise SystemExit(f"❌ ต่างเกิน tolerance {args.tol}")
+    print("✅ ตรงกับ ColumnTransformer")
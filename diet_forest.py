@@ -0,0 +1,149 @@
+# ==== diet_forest.py ====
+# แปลง RandomForest ที่ fit แล้วเป็นอาร์เรย์ NumPy ต่อเนื่อง (feature / threshold / ลูกซ้าย-ขวา / ค่าใบ)
+# แล้วเดินทุกต้นพร้อมกันทีละระดับความลึก — ไม่มีการ dispatch ต่อต้นแบบ sklearn
+#   python diet_forest.py export --model server/diet_recommendation_rf_model.joblib --out server/forest
+# export เป็นโฟลเดอร์ของไฟล์ .npy (+ meta.json) → load(mmap=True) เปิดด้วย np.load(mmap_mode="r")
+# หลาย worker/process จึงอ่านอาร์เรย์ชุดเดียวกันผ่าน page cache (ต่างจาก joblib ที่ Tree.__setstate__ copy ทุกต้น)
+#   python diet_forest.py verify --model server/diet_recommendation_rf_model.joblib
+import argparse, json
+import numpy as np
+from pathlib import Path
+
+class FlatForest:
+    """ป่าแบบแบน: node ทุกต้นต่อกันในอาร์เรย์เดียว, roots[t] = index ของรากต้นที่ t
+    ใบชี้กลับหาตัวเอง (left = right = ตัวเอง) จึงเดินครบ max_depth รอบได้โดยไม่ต้องเช็คว่าเป็นใบ"""
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold, dtype=np.float64)
+        self.left = np.ascontiguousarray(left, dtype=np.intp)
+        self.right = np.ascontiguousarray(right, dtype=np.intp)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+
+    @classmethod
+    def from_estimator(cls, forest):
+        feats, thrs, lefts, rights, vals, roots = [], [], [], [], [], []
+        offset, depth = 0, 0
+        for est in forest.estimators_:
+            t = est.tree_
+            n = t.node_count
+            idx = np.arange(n)
+            leaf = t.children_left < 0
+            feats.append(np.where(leaf, 0, t.feature))
+            thrs.append(np.where(leaf, 0.0, t.threshold))
+            lefts.append(np.where(leaf, idx, t.children_left) + offset)
+            rights.append(np.where(leaf, idx, t.children_right) + offset)
+            v = t.value[:, 0, :].astype(np.float64)
+            s = v.sum(axis=1, keepdims=True)
+            vals.append(np.divide(v, s, out=np.zeros_like(v), where=s > 0))   # เหมือน DecisionTree.predict_proba
+            roots.append(offset)
+            offset += n
+            depth = max(depth, t.max_depth)
+        return cls(np.concatenate(feats), np.concatenate(thrs), np.concatenate(lefts), np.concatenate(rights),
+                   np.concatenate(vals), np.asarray(roots), depth, forest.classes_)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def predict_proba(self, X, block_size: int = 0) -> np.ndarray:
+        # sklearn เทียบ X แบบ float32 กับ threshold float64 → ทำแบบเดียวกันเพื่อให้ผลตรงกันเป๊ะ
+        X = np.asarray(X, dtype=np.float32)
+        n = X.shape[0]
+        out = np.empty((n, self.value.shape[1]), dtype=np.float64)
+        block = block_size or max(1, (1 << 22) // max(1, self.n_trees))   # ~4M node index ต่อรอบ
+        for s in range(0, n, block):
+            xb = X[s:s + block]
+            rows = np.arange(len(xb))[:, None]
+            node = np.broadcast_to(self.roots, (len(xb), self.n_trees)).copy()
+            for _ in range(self.max_depth):
+                go_left = xb[rows, self.feature[node]] <= self.threshold[node]
+                node = np.where(go_left, self.left[node], self.right[node])
+            out[s:s + block] = self.value[node].sum(axis=1) / self.n_trees
+        return out
+
+    ARRAYS = ("feature", "threshold", "left", "right", "value", "roots")
+
+    def save(self, path):
+        """โฟลเดอร์ path/: <array>.npy ชนิดเดียวกับที่ __init__ ใช้ (โหลดแบบ mmap แล้วไม่ต้อง copy) + meta.json"""
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        np.save(path / "classes.npy", self.classes_, allow_pickle=False)
+        (path / "meta.json").write_text(json.dumps({"max_depth": self.max_depth, "n_trees": self.n_trees}))
+
+    @classmethod
+    def load(cls, path, mmap: bool = False):
+        """โฟลเดอร์จาก save() (mmap=True → อาร์เรย์เป็น read-only memmap ที่แชร์ข้าม process) หรือ .npz แบบเก่า"""
+        path = Path(path)
+        if path.is_dir():
+            mode = "r" if mmap else None
+            arrays = [np.load(path / f"{name}.npy", mmap_mode=mode, allow_pickle=False) for name in cls.ARRAYS]
+            meta = json.loads((path / "meta.json").read_text())
+            return cls(*arrays, meta["max_depth"], np.load(path / "classes.npy", allow_pickle=False))
+        z = np.load(path, allow_pickle=False)
+        return cls(z["feature"], z["threshold"], z["left"], z["right"], z["value"], z["roots"],
+                   int(z["max_depth"]), z["classes"])
+
+class FlatPipeline:
+    """ใช้แทน Pipeline(prep → RandomForest): ขั้น prep ยังเป็นของ sklearn, ส่วนป่าใช้ FlatForest"""
+
+    def __init__(self, prep, forest: FlatForest):
+        self.prep = prep
+        self.forest = forest
+        self.classes_ = forest.classes_
+        self.named_steps = {"prep": prep, "model": forest}   # ให้ model_schema/warmup_rows ใช้ได้เหมือน Pipeline
+
+    def predict_proba(self, X) -> np.ndarray:
+        Xt = self.prep.transform(X) if self.prep is not None else X
+        if hasattr(Xt, "toarray"): Xt = Xt.toarray()
+        return self.forest.predict_proba(Xt)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+def compile_pipeline(model, forest_path=None, mmap: bool = False) -> FlatPipeline:
+    """Pipeline ที่ fit แล้ว → FlatPipeline (ใช้ป่าที่ export ไว้ถ้ามี ไม่งั้นแปลงใหม่ตอนโหลด)"""
+    steps = dict(getattr(model, "named_steps", {}))
+    rf = steps.get("model", model)
+    forest = FlatForest.load(forest_path, mmap) if forest_path and Path(forest_path).exists() \
+        else FlatForest.from_estimator(rf)
+    return FlatPipeline(steps.get("prep"), forest)
+
+if __name__ == "__main__":
+    import joblib, pandas as pd
+    ap = argparse.ArgumentParser(description="flatten / verify the random forest inside a fitted pipeline")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    e = sub.add_parser("export", help="write the flattened forest as a directory of .npy files (mmap-able)")
+    e.add_argument("--model", type=Path, required=True)
+    e.add_argument("--out", type=Path, required=True)
+    v = sub.add_parser("verify", help="check probabilities against sklearn predict_proba")
+    v.add_argument("--model", type=Path, required=True)
+    v.add_argument("--data", type=Path, help="CSV of input rows (default: synthetic rows from the schema)")
+    v.add_argument("--rows", type=int, default=5000)
+    v.add_argument("--tol", type=float, default=1e-9)
+    args = ap.parse_args()
+
+    model = joblib.load(args.model)
+    flat = compile_pipeline(model)
+    if args.cmd == "export":
+        flat.forest.save(args.out)
+        print(f"💾 Saved: {args.out} (trees={flat.forest.n_trees}, nodes={len(flat.forest.feature)}, "
+              f"max_depth={flat.forest.max_depth})")
+    else:
+        if args.data:
+            X = pd.read_csv(args.data, nrows=args.rows)
+        else:
+            import sys
+            sys.path.insert(0, str(Path(__file__).resolve().parent / "benchmarks"))
+            from common import synth_records
+            X = pd.DataFrame(synth_records(model, args.rows))
+        diff = np.abs(flat.predict_proba(X) - model.predict_proba(X)).max()
+        print(f"max |flat - sklearn| = {diff:.3e} over {len(X)} rows")
+        if diff > args.tol:
+            raise SystemExit(f"❌ ต่างเกิน tolerance {args.tol}")
+        print("✅ ตรงกับ sklearn")
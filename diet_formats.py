@@ -0,0 +1,142 @@
+# ==== diet_formats.py ====
+# request/response แบบคอลัมน์สำหรับงานทำนายจำนวนมาก (content negotiation ด้วย Content-Type / Accept)
+#   application/json                        {"records": [...]} (แบบเดิม) หรือ {"columns": {"age": [...], ...}}
+#   application/vnd.apache.arrow.stream     Arrow IPC stream     ┐
+#   application/vnd.apache.arrow.file       Arrow IPC file       ├ ต้องมี pyarrow (ไม่มี → 415)
+#   application/vnd.apache.parquet          Parquet              ┘
+# คำตอบแบบ Arrow/Parquet: คอลัมน์ prediction (dictionary-encoded) + ความน่าจะเป็นหนึ่งคอลัมน์ต่อคลาส,
+# model_version อยู่ใน schema metadata — ไม่มี object Python ต่อแถวทั้งขาเข้าและขาออก
+# JSON ใช้ orjson ถ้าติดตั้งไว้ (เร็วกว่า json มาตรฐานหลายเท่าสำหรับ dict/list ขนาดใหญ่)
+import json
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+ARROW_FILE = "application/vnd.apache.arrow.file"
+PARQUET = "application/vnd.apache.parquet"
+ALIASES = {"application/x-parquet": PARQUET, "application/parquet": PARQUET,
+           "application/vnd.apache.arrow": ARROW_FILE}
+BINARY_TYPES = (ARROW_STREAM, ARROW_FILE, PARQUET)
+
+class UnsupportedFormat(ValueError):
+    """media type ที่ไม่รองรับ (หรือไม่มี pyarrow) → 415"""
+
+class BadBody(ValueError):
+    """body อ่านไม่ได้ / รูปแบบผิด → 400"""
+
+class NotAcceptable(ValueError):
+    """Accept ไม่มี media type ที่ตอบได้ (และไม่มี */*) → 406"""
+
+def _media_type(header: Optional[str]) -> str:
+    mt = (header or "").split(";", 1)[0].strip().lower()
+    return ALIASES.get(mt, mt)
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        return pa
+    except ImportError:
+        raise UnsupportedFormat("Arrow/Parquet ต้องติดตั้ง pyarrow บน server")
+
+# ---------- JSON ----------
+def loads(body: bytes):
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# ---------- request ----------
+def decode_body(body: bytes, content_type: Optional[str]) -> Union[List[Dict[str, Any]], pd.DataFrame]:
+    """body → list ของ dict (JSON records) หรือ DataFrame (columns / Arrow / Parquet)"""
+    mt = _media_type(content_type)
+    if mt in ("", JSON) or mt.endswith("+json"):
+        try:
+            obj = loads(body)
+        except ValueError as e:
+            raise BadBody(f"invalid JSON: {e}")
+        if isinstance(obj, list):
+            return obj
+        if isinstance(obj, dict) and isinstance(obj.get("records"), list):
+            return obj["records"]
+        if isinstance(obj, dict) and isinstance(obj.get("columns"), dict):
+            try:
+                return pd.DataFrame(obj["columns"])
+            except ValueError as e:
+                raise BadBody(f"columns: {e}")
+        raise BadBody('JSON body must be {"records": [...]}, {"columns": {...}} or a list of objects')
+    if mt not in BINARY_TYPES:
+        raise UnsupportedFormat(f"unsupported Content-Type: {mt!r} (ใช้ {JSON}, {', '.join(BINARY_TYPES)})")
+    pa = _pyarrow()
+    try:
+        if mt == PARQUET:
+            import pyarrow.parquet as pq
+            table = pq.read_table(pa.BufferReader(body))
+        elif mt == ARROW_STREAM:
+            table = pa.ipc.open_stream(pa.BufferReader(body)).read_all()
+        else:
+            table = pa.ipc.open_file(pa.BufferReader(body)).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise BadBody(f"cannot read {mt}: {e}")
+    return table.to_pandas()
+
+# ---------- response ----------
+def negotiate(accept: Optional[str]) -> str:
+    """media type ที่ q สูงสุดใน Accept ที่ตอบได้ (เท่ากัน = ตามลำดับ); ไม่ส่ง Accept / */* / application/* → JSON
+    ไม่มีตัวไหนตอบได้ → NotAcceptable"""
+    if not (accept or "").strip():
+        return JSON
+    prefs = []
+    for i, part in enumerate(accept.split(",")):
+        mt, *params = [x.strip() for x in part.split(";")]
+        mt = ALIASES.get(mt.lower(), mt.lower())
+        q = 1.0
+        for p in params:
+            if p.lower().startswith("q="):
+                try:
+                    q = float(p[2:])
+                except ValueError:
+                    q = 0.0
+        if q <= 0: continue
+        if mt in ("*/*", "application/*") or mt.endswith("+json"):
+            mt = JSON
+        if mt in BINARY_TYPES or mt == JSON:
+            prefs.append((-q, i, mt))
+    if not prefs:
+        raise NotAcceptable(f"cannot produce any of: {accept} (ใช้ {JSON}, {', '.join(BINARY_TYPES)})")
+    return min(prefs)[2]
+
+def result_table(labels_idx, proba, classes, version: Optional[str] = None):
+    pa = _pyarrow()
+    cols = {"prediction": pa.DictionaryArray.from_arrays(pa.array(np.asarray(labels_idx, dtype=np.int32)),
+                                                         pa.array(list(classes), type=pa.string()))}
+    for j, c in enumerate(classes):
+        cols[str(c)] = pa.array(np.ascontiguousarray(proba[:, j]))
+    return pa.table(cols, metadata={"model_version": version or ""})
+
+def encode_results(labels_idx, proba, classes, media_type: str, fmt: str = "records",
+                   version: Optional[str] = None) -> Tuple[bytes, str]:
+    """(body, media_type) ตามที่ negotiate ได้; JSON ใช้ format_results (records / compact) เหมือนเดิม"""
+    if media_type == JSON:
+        from diet_inference import format_results
+        return dumps(format_results(labels_idx, proba, classes, fmt, version)), JSON
+    pa = _pyarrow()
+    table = result_table(labels_idx, proba, classes, version)
+    sink = pa.BufferOutputStream()
+    if media_type == PARQUET:
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink)
+    else:
+        writer = pa.ipc.new_stream if media_type == ARROW_STREAM else pa.ipc.new_file
+        with writer(sink, table.schema) as w:
+            w.write_table(table)
+    return sink.getvalue().to_pybytes(), media_type
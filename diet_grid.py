@@ -0,0 +1,364 @@
+# ==== diet_grid.py ====
+# ตารางผลทำนายที่คำนวณไว้ล่วงหน้าบน grid ของ input (หมวดหมู่ทุกค่าจาก OneHotEncoder × ตัวเลขที่ quantize ตาม spec)
+# หน้าเว็บ (bloomdiet.js) ส่ง gender/age/height_cm/weight_kg/bmi/allergies (+ disease/exercise_hours ที่ไม่ตรงชื่อ
+# คอลัมน์ของโมเดลที่ ship จึงถูกทิ้ง) ตัวเลขเป็นจำนวนเต็มเกือบทั้งหมด
+# → request ส่วนใหญ่ตกบนจุดของ grid และตอบได้ด้วยการคำนวณ index แล้วอ่านแถวเดียวจากอาร์เรย์ (O(1))
+#   python diet_grid.py build  --model server/diet_recommendation_rf_model.joblib --out server/diet_grid.npy
+#   (ค่าเริ่มต้น = --num age=15:80:1 height_cm=140:200:1 weight_kg=40:120:1 --cat gender allergies --const-rest 0
+#    → โมเดลที่ ship ได้ 3 × 4 × 66 × 61 × 81 ≈ 3.9M จุด, ~23 MB แบบ uint16)
+# ชื่อใน --num/--cat/--const เทียบกับ schema ของโมเดลแบบไม่สนตัวพิมพ์ (age → Age ของโมเดลที่ ship)
+# คอลัมน์ที่ไม่ใช่แกนเป็นค่าคงที่ (แกนขนาด 1 ที่อยู่ใน key: request ที่ค่าไม่ตรง = miss):
+#   หมวดหมู่ → ค่าของฟิลด์ที่ไม่ส่ง ("nan") เว้นแต่ --const Col=value
+#   ตัวเลข   → --const-rest (ค่าเริ่มต้น 0 = ค่าที่ฟิลด์ที่ไม่ส่งถูกแปลงเป็น) เว้นแต่ --const Col=value
+# OneHotEncoder(handle_unknown="ignore") เข้ารหัสค่าที่ไม่รู้จักทุกค่าเป็นศูนย์ล้วนเหมือนกัน → แกนหมวดหมู่มีช่อง "unknown"
+# อีกหนึ่งช่องที่รับทุกค่านอก categories (เช่น allergies "None"/"Dairy" ที่หน้าเว็บส่ง)
+#   python diet_grid.py verify --grid server/diet_grid.npy --model server/diet_recommendation_rf_model.joblib \
+#                              [--data traffic.csv]     (coverage ของ request จริง — ค่าเริ่มต้นสุ่ม body แบบ bloomdiet.js
+#                                                        — + drift เทียบโมเดล)
+# เก็บเป็นคู่ไฟล์: <out>.npy (ตาราง [N, K], memory-map ได้) + <out>.json (แกนของ grid, classes, fingerprint ของโมเดล)
+# bmi: ถ้าโมเดลใช้ bmi และมี height_cm/weight_kg เป็นแกน จะเป็นค่าที่คำนวณจากสองแกนนั้น (ไม่ใช่แกนแยก)
+#   python diet_grid.py build ... --max-cells 50000000   (เกินนี้ไม่สร้าง — ลดช่วง/step หรือใช้ค่าคงที่เพิ่ม)
+import argparse, hashlib, json, math, threading, time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from diet_features import to_float, to_str
+
+DEFAULT_NUM = {"age": (15, 80, 1), "height_cm": (140, 200, 1), "weight_kg": (40, 120, 1)}
+DEFAULT_CAT = ("gender", "allergies")   # หมวดหมู่ที่หน้าเว็บส่งและตรงชื่อคอลัมน์ของโมเดลที่ ship
+UNKNOWN = "__unknown__"                  # ค่าที่ใช้แทนช่อง unknown ตอน build (encoder ignore → เข้ารหัสเป็นศูนย์ล้วน)
+BMI_FIELDS = ("bmi", "height_cm", "weight_kg")
+DTYPES = {"uint16": 65535.0, "float32": None}
+MAX_CELLS = 50_000_000
+
+def model_fingerprint(model) -> str:
+    """hash ของค่าที่ fit แล้ว (สถิติของ prep + ป่าในรูป FlatForest) — ตารางใช้ได้กับโมเดลตัวนี้เท่านั้น
+    Pipeline ของ sklearn กับ FlatPipeline ที่ mmap (DIET_MODEL_MMAP) ของโมเดลเดียวกันได้ค่าเดียวกัน"""
+    from diet_forest import FlatForest
+    h = hashlib.sha1()
+    steps = dict(getattr(model, "named_steps", {}))
+    prep, rf = steps.get("prep"), steps.get("model", model)
+    for _, trans, cols in getattr(prep, "transformers_", []):
+        h.update(repr(list(cols)).encode())
+        fitted = list(getattr(trans, "categories_", [])) + [getattr(trans, k) for k in ("mean_", "scale_") if hasattr(trans, k)]
+        for a in fitted:
+            h.update(np.asarray(a).astype(str).tobytes())
+    forest = rf if isinstance(rf, FlatForest) else FlatForest.from_estimator(rf)
+    for a in (forest.feature, forest.threshold, forest.left, forest.value):
+        h.update(np.ascontiguousarray(a).tobytes())
+    return h.hexdigest()
+
+def _bmi(h_cm: float, w_kg: float) -> float:
+    # สูตรเดียวกับ diet_inference.prepare_records
+    h = float(h_cm) / 100.0
+    return round(float(w_kg) / (h * h), 2)
+
+def _resolve(spec: Optional[Dict[str, Any]], names: Dict[str, str], what: str) -> Dict[str, Any]:
+    # key ของ spec (ชื่อแบบหน้าเว็บหรือแบบ schema) → ชื่อคอลัมน์ของโมเดล
+    out = {}
+    for k, v in (spec or {}).items():
+        c = names.get(str(k).lower())
+        if c is None:
+            raise ValueError(f"{what} {k!r}: ไม่ใช่คอลัมน์ของโมเดล (มี {', '.join(names.values())})")
+        out[c] = v
+    return out
+
+class PredictionGrid:
+    def __init__(self, axes: List[Dict[str, Any]], table: np.ndarray, model_classes, fingerprint: str,
+                 scale: Optional[float], derive_bmi: Optional[Sequence[str]], columns: List[str]):
+        self.axes = axes
+        self.table = table
+        self.model_classes = np.asarray(model_classes)
+        self.fingerprint = fingerprint
+        self.scale = scale
+        # (bmi, height, weight) ตามชื่อใน schema หรือ None; ตารางรุ่นเก่าเก็บเป็น true = ชื่อตัวเล็ก
+        self.derive_bmi = list(BMI_FIELDS) if derive_bmi is True else (list(derive_bmi) if derive_bmi else None)
+        self.columns = columns
+        self.sizes = [a["n"] for a in axes]
+        self.strides = [int(np.prod(self.sizes[i + 1:], dtype=np.int64)) for i in range(len(axes))]
+        self._cat_pos = {a["name"]: {v: i for i, v in enumerate(a["values"])} for a in axes if a["kind"] == "cat"}
+        # แกนที่มีช่อง unknown: ค่าที่ไม่อยู่ใน categories ของ encoder → ช่องนั้น (ตารางรุ่นเก่าไม่มี key นี้)
+        self._known = {a["name"]: set(a["known"]) for a in axes if a.get("unknown") is not None}
+        self._axis = {a["name"]: a for a in axes}
+        if self.derive_bmi:
+            hs, ws = self._num_values(self.derive_bmi[1]), self._num_values(self.derive_bmi[2])
+            self._bmi = np.array([[_bmi(h, w) for w in ws] for h in hs], dtype=np.float64)
+        self.hits = self.misses = self.verified = 0
+        self.max_drift = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def n_cells(self) -> int:
+        return int(np.prod(self.sizes, dtype=np.int64))
+
+    def _num_values(self, name: str) -> np.ndarray:
+        a = self._axis[name]
+        return np.round(a["lo"] + np.arange(a["n"]) * a["step"], 10)
+
+    # ---------- lookup ----------
+    def _num_pos(self, a, v) -> int:
+        x = to_float(v)
+        pos = int(round((x - a["lo"]) / a["step"]))
+        if not 0 <= pos < a["n"]: return -1
+        cell = round(a["lo"] + pos * a["step"], 10)
+        return pos if abs(cell - x) <= 1e-9 * max(1.0, abs(x)) else -1
+
+    def index(self, d: Dict[str, Any]) -> int:
+        """index ของแถวในตาราง หรือ -1 ถ้า d ไม่ตกบนจุดของ grid (ค่าใช้ coercion เดียวกับตอนเข้าโมเดล)"""
+        flat, pos = 0, {}
+        for a, stride in zip(self.axes, self.strides):
+            if a["kind"] == "cat":
+                v = to_str(d.get(a["name"]))
+                p = self._cat_pos[a["name"]].get(v, -1)
+                if p < 0 and a["name"] in self._known and v not in self._known[a["name"]]:
+                    p = a["unknown"]
+            else:
+                p = self._num_pos(a, d.get(a["name"]))
+            if p < 0: return -1
+            pos[a["name"]] = p
+            flat += p * stride
+        if self.derive_bmi:
+            bmi, height, weight = self.derive_bmi
+            if to_float(d.get(bmi)) != self._bmi[pos[height], pos[weight]]:
+                return -1
+        return flat
+
+    def proba(self, i: int) -> np.ndarray:
+        row = np.asarray(self.table[i], dtype=np.float64)
+        return row / self.scale if self.scale else row
+
+    def lookup(self, d: Dict[str, Any]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(labels_idx [1], proba [1, K]) แบบเดียวกับ inference.predict_proba หรือ None ถ้าอยู่นอก grid"""
+        i = self.index(d)
+        with self._lock:
+            if i < 0:
+                self.misses += 1
+                return None
+            self.hits += 1
+        p = self.proba(i)[None, :]
+        return self.model_classes[p.argmax(axis=1)], p
+
+    def record_drift(self, grid_proba: np.ndarray, live_proba: np.ndarray) -> float:
+        drift = float(np.abs(np.asarray(grid_proba) - np.asarray(live_proba)).max())
+        with self._lock:
+            self.verified += 1
+            self.max_drift = max(self.max_drift, drift)
+        return drift
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {"cells": self.n_cells, "axes": {a["name"]: a["n"] for a in self.axes if not a.get("const")},
+                "constants": {a["name"]: a["values"][0] if a["kind"] == "cat" else a["lo"]
+                              for a in self.axes if a.get("const")},
+                "derive_bmi": self.derive_bmi[0] if self.derive_bmi else None,
+                "bytes": int(self.table.nbytes), "dtype": str(self.table.dtype),
+                "hits": self.hits, "misses": self.misses, "coverage": self.hits / lookups if lookups else 0.0,
+                "verified": self.verified, "max_drift": self.max_drift}
+
+    # ---------- build ----------
+    def frame(self, flat: np.ndarray):
+        """DataFrame ของจุด grid ตาม index `flat` ในรูปที่ prep ของโมเดลรับ (คอลัมน์ตาม expected_cols)"""
+        import pandas as pd
+        flat = np.asarray(flat, dtype=np.int64)
+        cols, pos = {}, {}
+        for a, n, stride in zip(self.axes, self.sizes, self.strides):
+            p = (flat // stride) % n
+            pos[a["name"]] = p
+            cols[a["name"]] = np.asarray(a["values"], dtype=object)[p] if a["kind"] == "cat" \
+                else self._num_values(a["name"])[p]
+        if self.derive_bmi:
+            bmi, height, weight = self.derive_bmi
+            cols[bmi] = self._bmi[pos[height], pos[weight]]
+        return pd.DataFrame(cols).reindex(columns=self.columns)
+
+    @classmethod
+    def build(cls, model, num_spec: Dict[str, Tuple[float, float, float]], dtype: str = "uint16",
+              chunk: int = 200_000, cat_spec: Optional[Dict[str, List[str]]] = None,
+              const_spec: Optional[Dict[str, Any]] = None, const_rest: Optional[float] = 0.0,
+              max_cells: int = MAX_CELLS, cat_axes: Optional[Sequence[str]] = None) -> "PredictionGrid":
+        """num_spec: แกนตัวเลข {ชื่อ: (lo, hi, step)}; cat_axes: หมวดหมู่ที่เป็นแกน (None = DEFAULT_CAT ที่โมเดลมี
+        + คอลัมน์ใน cat_spec); cat_spec: {ชื่อ: [ค่า]} จำกัดค่าของแกนหมวดหมู่; const_spec: {ชื่อ: ค่า} ตรึงคอลัมน์ไว้ค่าเดียว;
+        หมวดหมู่ที่เหลือถูกตรึงที่ค่าของฟิลด์ที่ไม่ส่ง, ตัวเลขที่เหลือที่ const_rest (None = ไม่ตรึง → ValueError).
+        ชื่อเทียบกับ schema แบบไม่สนตัวพิมพ์"""
+        from diet_loader import model_schema
+        expected, cat_cols, num_cols = model_schema(model)
+        names = {c.lower(): c for c in (expected or cat_cols + num_cols)}
+        num_spec = _resolve(num_spec, names, "--num")
+        const_spec = _resolve(const_spec, names, "--const")
+        cat_spec = _resolve(cat_spec, names, "cat_spec")
+        if cat_axes is None:
+            cat_axes = [names[f] for f in DEFAULT_CAT if f in names and names[f] not in const_spec] + list(cat_spec)
+        else:
+            cat_axes = list(_resolve(dict.fromkeys(cat_axes), names, "--cat"))
+        not_cat = [c for c in cat_axes if c not in cat_cols]
+        if not_cat:
+            raise ValueError(f"--cat ใช้ได้กับคอลัมน์หมวดหมู่เท่านั้น: {', '.join(not_cat)}")
+        both = sorted((set(num_spec) | set(cat_axes)) & set(const_spec))
+        if both:
+            raise ValueError(f"กำหนดเป็นทั้งแกนและค่าคงที่: {', '.join(both)}")
+        not_num = [c for c in num_spec if c not in num_cols]
+        if not_num:
+            raise ValueError(f"--num ใช้ได้กับคอลัมน์ตัวเลขเท่านั้น: {', '.join(not_num)}")
+        prep = model.named_steps["prep"]
+        cats, ignore = {}, set()
+        for name, trans, cols in prep.transformers_:
+            if hasattr(trans, "categories_"):
+                cats.update({c: [to_str(v) for v in vals] for c, vals in zip(cols, trans.categories_)})
+                if getattr(trans, "handle_unknown", "error") == "ignore":
+                    ignore.update(cols)
+        axes = []
+        for c in cat_cols:
+            if c in cat_axes:
+                values = [to_str(v) for v in cat_spec.get(c, cats[c])]
+                axis = {"name": c, "kind": "cat", "values": values, "n": len(values)}
+                if c in ignore:
+                    axis.update(values=values + [UNKNOWN], n=len(values) + 1, unknown=len(values), known=cats[c])
+                axes.append(axis)
+                continue
+            # ไม่ใช่แกน → ตรึงที่ --const หรือค่าของฟิลด์ที่ไม่ส่ง (to_str(None) = "nan")
+            v = to_str(const_spec[c]) if c in const_spec else to_str(None)
+            axis = {"name": c, "kind": "cat", "values": [v], "n": 1, "const": True}
+            if v not in cats[c]:
+                if c not in ignore:
+                    raise ValueError(f"{c}={v!r}: ไม่ใช่หมวดหมู่ของโมเดล ({', '.join(cats[c])}) และ encoder ไม่รับค่าที่ไม่รู้จัก "
+                                     f"— กำหนด --const {c}=value หรือ --cat {c}")
+                axis.update(unknown=0, known=cats[c])
+            axes.append(axis)
+
+        # bmi ของโมเดลคำนวณจากแกนส่วนสูง/น้ำหนักเหมือน prepare_records — ไม่ต้องเป็นแกนเอง
+        bmi, height, weight = (names.get(f) for f in BMI_FIELDS)
+        derive_bmi = [bmi, height, weight] if bmi in num_cols and bmi not in num_spec and bmi not in const_spec \
+            and height in num_spec and weight in num_spec else None
+        for c in num_cols:
+            if c in num_spec or c in const_spec or (derive_bmi and c == bmi):
+                continue
+            if const_rest is None:
+                rest = [c for c in num_cols if c not in num_spec and c not in const_spec and not (derive_bmi and c == bmi)]
+                raise ValueError(
+                    f"คอลัมน์ตัวเลขไม่มีทั้งช่วงและค่าคงที่: {', '.join(rest)} — กำหนด --num {rest[0]}=lo:hi:step, "
+                    f"--const {rest[0]}=value หรือ --const-rest value (ค่าที่ request ที่ไม่ส่งฟิลด์นี้ถูกแปลงเป็นคือ 0); "
+                    f"ถ้าต้องการตารางที่ไม่ตรึงคอลัมน์เหล่านี้ ต้องฝึกโมเดลใหม่ที่ใช้เฉพาะฟิลด์ที่หน้าเว็บส่ง")
+            const_spec[c] = const_rest
+        for c in num_cols:
+            if c in num_spec:
+                lo, hi, step = (float(x) for x in num_spec[c])
+                axes.append({"name": c, "kind": "num", "lo": lo, "step": step, "n": int(math.floor((hi - lo) / step + 1e-9)) + 1})
+            elif c in const_spec:
+                try:
+                    v = float(const_spec[c])
+                except (TypeError, ValueError):
+                    raise ValueError(f"--const {c}={const_spec[c]!r}: คอลัมน์ตัวเลขต้องเป็นตัวเลข")
+                axes.append({"name": c, "kind": "num", "lo": v, "step": 1.0, "n": 1, "const": True})
+        model_classes = np.asarray(model.classes_)
+        scale = DTYPES[dtype]
+        n_cells = int(np.prod([a["n"] for a in axes], dtype=np.int64))
+        if n_cells > max_cells:
+            raise ValueError(f"grid ใหญ่เกินไป: {n_cells:,} จุด (> {max_cells:,}) แกน "
+                             f"{ {a['name']: a['n'] for a in axes if a['n'] > 1} } — ลดช่วง/step, ลด --cat หรือตรึงคอลัมน์ด้วย --const")
+        table = np.empty((n_cells, len(model_classes)), dtype=np.uint16 if scale else np.float32)
+        grid = cls(axes, table, model_classes, model_fingerprint(model), scale, derive_bmi, expected or
+                   [a["name"] for a in axes] + ([bmi] if derive_bmi else []))
+        for s in range(0, n_cells, chunk):
+            e = min(n_cells, s + chunk)
+            p = np.asarray(model.predict_proba(grid.frame(np.arange(s, e))), dtype=np.float64)
+            table[s:e] = np.rint(p * scale) if scale else p
+        return grid
+
+    # ---------- I/O ----------
+    def save(self, path: Path):
+        path = Path(path)
+        np.save(path, self.table)
+        meta = {"axes": self.axes, "model_classes": self.model_classes.tolist(), "fingerprint": self.fingerprint,
+                "scale": self.scale, "derive_bmi": self.derive_bmi, "columns": self.columns,
+                "created": int(time.time())}
+        path.with_suffix(".json").write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "PredictionGrid":
+        path = Path(path)
+        meta = json.loads(path.with_suffix(".json").read_text(encoding="utf-8"))
+        table = np.load(path, mmap_mode="r" if mmap else None)
+        return cls(meta["axes"], table, meta["model_classes"], meta["fingerprint"], meta["scale"],
+                   meta["derive_bmi"], meta["columns"])
+
+def _parse_num(items: List[str]) -> Dict[str, Tuple[float, float, float]]:
+    out = dict(DEFAULT_NUM)
+    for it in items or []:
+        name, rng = it.split("=", 1)
+        lo, hi, step = (float(x) for x in rng.split(":"))
+        out[name] = (lo, hi, step)
+    return out
+
+def _parse_const(items: List[str]) -> Dict[str, str]:
+    # เก็บเป็นสตริง: build แปลงตามชนิดของคอลัมน์ (หมวดหมู่ "1" ต้องไม่กลายเป็น "1.0")
+    return dict(it.split("=", 1) for it in items or [])
+
+if __name__ == "__main__":
+    import joblib, sys
+    from types import SimpleNamespace
+    import pandas as pd
+    ap = argparse.ArgumentParser(description="precomputed prediction table over a quantized input grid")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--model", type=Path, required=True)
+    b.add_argument("--out", type=Path, required=True, help="table .npy (metadata goes to the matching .json)")
+    b.add_argument("--num", nargs="*", help="numeric axes as name=lo:hi:step (defaults: age, height_cm, weight_kg)")
+    b.add_argument("--cat", nargs="*", help="categorical axes (default: gender allergies); other categoricals are "
+                                            "pinned to the value of an omitted field unless given in --const")
+    b.add_argument("--const", nargs="*", help="columns pinned to one value as name=value (part of the lookup key)")
+    b.add_argument("--const-rest", type=float, default=0.0,
+                   help="pin every other numeric column to this value (default 0 = what a field the client omits becomes)")
+    b.add_argument("--max-cells", type=int, default=MAX_CELLS)
+    b.add_argument("--dtype", choices=list(DTYPES), default="uint16")
+    b.add_argument("--chunk", type=int, default=200_000)
+    v = sub.add_parser("verify")
+    v.add_argument("--grid", type=Path, required=True)
+    v.add_argument("--model", type=Path, required=True)
+    v.add_argument("--data", type=Path, help="CSV of real requests for coverage (default: random bloomdiet.js bodies)")
+    v.add_argument("--rows", type=int, default=5000)
+    v.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    model = joblib.load(args.model)
+    if args.cmd == "build":
+        t0 = time.perf_counter()
+        try:
+            g = PredictionGrid.build(model, _parse_num(args.num), args.dtype, args.chunk,
+                                     const_spec=_parse_const(args.const), const_rest=args.const_rest,
+                                     max_cells=args.max_cells, cat_axes=args.cat)
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+        g.save(args.out)
+        print(f"💾 Saved: {args.out} + {args.out.with_suffix('.json').name} ({g.n_cells} cells, "
+              f"{g.table.nbytes / 1e6:.1f} MB, {time.perf_counter() - t0:.1f}s) axes={g.stats()['axes']} "
+              f"constants={g.stats()['constants']}")
+        sys.exit(0)
+
+    from diet_inference import prepare_records
+    from diet_loader import model_schema
+    g = PredictionGrid.load(args.grid)
+    if g.fingerprint != model_fingerprint(model):
+        raise SystemExit("❌ ตารางนี้สร้างจากโมเดลตัวอื่น (fingerprint ไม่ตรง) — build ใหม่")
+    rng = np.random.default_rng(args.seed)
+
+    # 1) drift: สุ่มจุดบน grid แล้วเทียบกับโมเดลจริง
+    idx = np.sort(rng.choice(g.n_cells, size=min(args.rows, g.n_cells), replace=False))
+    live = np.asarray(model.predict_proba(g.frame(idx)), dtype=np.float64)
+    table = np.asarray(g.table[idx], dtype=np.float64) / (g.scale or 1.0)
+    drift = np.abs(table - live).max()
+    flips = int((table.argmax(axis=1) != live.argmax(axis=1)).sum())
+    print(f"📐 max |grid - model| = {drift:.3e} over {len(idx)} grid points (argmax flips: {flips})")
+
+    # 2) coverage: request จริง (CSV) หรือ body สุ่มแบบที่ bloomdiet.js ส่ง (ตัวเลือก/ช่วงตามฟอร์ม ไม่ใช่ตามแกนของ grid)
+    if args.data:
+        rows = pd.read_csv(args.data).to_dict(orient="records")
+    else:
+        sys.path.insert(0, str(Path(__file__).resolve().parent / "benchmarks"))
+        from common import frontend_records
+        rows = frontend_records(args.rows, args.seed)
+
+    schema = SimpleNamespace(**dict(zip(("expected_cols", "cat_cols", "num_cols"), model_schema(model))))
+    hit = sum(g.index(d) >= 0 for d in prepare_records(rows, schema))
+    print(f"🎯 coverage: {hit}/{len(rows)} = {hit / len(rows) * 100:.1f}% of requests answered from the table")
@@ -0,0 +1,226 @@
+# ==== diet_inference.py ====
+# แกนกลางการทำนาย: เรียก predict_proba ครั้งเดียว แล้วได้ label จาก argmax
+# (RandomForest.predict ภายในก็คือ argmax ของ predict_proba อยู่แล้ว — ไม่ต้องรันป่าทั้งป่าซ้ำ)
+# + เส้นทางเดียวที่ทั้ง diet_api.py และ server/api.py ใช้: predict(m, records) = ตรวจฟิลด์บังคับ → เติม BMI
+#   → reindex ตาม schema + แปลงชนิด (ทั้ง batch ทีเดียว) → pool ของโมเดล
+import asyncio, io, json, math
+from contextlib import nullcontext
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+RESULT_FORMATS = ("records", "compact")
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+REQUIRED_FIELDS = ("gender", "age", "height_cm", "weight_kg")
+POSITIVE_FIELDS = ("height_cm", "weight_kg")   # ใช้หาร BMI → 0 / ติดลบ / ไม่ใช่ตัวเลข ถือว่าขาดเหมือนกัน
+MAX_REPORTED_ERRORS = 20
+
+def class_names(label_encoder) -> List[str]:
+    return [str(c) for c in label_encoder.classes_]
+
+def predict_proba(model, X):
+    """คืน (labels_idx, proba) — labels_idx เป็น index ใน label_encoder.classes_"""
+    proba = np.asarray(model.predict_proba(X), dtype=float)
+    model_classes = getattr(model, "classes_", None)
+    idx = proba.argmax(axis=1)
+    if model_classes is not None:
+        idx = np.asarray(model_classes)[idx]   # y ตอนฝึกคือเลขจาก LabelEncoder
+    return idx, proba
+
+def format_results(labels_idx, proba, classes: Sequence[str], fmt: str = "records",
+                   version: Optional[str] = None) -> Dict[str, Any]:
+    """สร้าง response แบบ column-wise; fmt="compact" ไม่สร้าง dict ต่อแถวเลย; version = เวอร์ชันโมเดลที่ใช้ทำนาย"""
+    labels = np.asarray(classes, dtype=object)[labels_idx].tolist()
+    rows = proba.tolist()
+    if fmt == "compact":
+        return {"count": len(labels), "model_version": version, "classes": list(classes), "labels": labels, "proba": rows}
+    if fmt != "records":
+        raise ValueError(f"unknown format: {fmt!r} (ใช้ {', '.join(RESULT_FORMATS)})")
+    classes = list(classes)
+    return {"count": len(labels), "model_version": version,
+            "results": [{"prediction": l, "probabilities": dict(zip(classes, r))} for l, r in zip(labels, rows)]}
+
+def result_rows(labels_idx, proba, classes: Sequence[str], version: Optional[str] = None) -> List[Dict[str, Any]]:
+    """ผลแบบ {"prediction", "probabilities", "model_version"} ต่อแถว — ใช้กับ predict-one และกระจายผลของ micro-batch"""
+    classes = list(classes)
+    labels = np.asarray(classes, dtype=object)[labels_idx].tolist()
+    return [{"prediction": l, "probabilities": dict(zip(classes, r)), "model_version": version}
+            for l, r in zip(labels, proba.tolist())]
+
+def stream_chunk(labels_idx, proba, classes: Sequence[str], fmt: str, header: bool = False) -> str:
+    """แปลงผลของ chunk หนึ่งเป็นข้อความ NDJSON (หนึ่งบรรทัดต่อแถว) หรือ CSV (prediction + คอลัมน์ความน่าจะเป็น)"""
+    labels = np.asarray(classes, dtype=object)[labels_idx].tolist()
+    if fmt == "ndjson":
+        classes = list(classes)
+        return "".join(json.dumps({"prediction": l, "probabilities": dict(zip(classes, r))}, ensure_ascii=False) + "\n"
+                       for l, r in zip(labels, proba.tolist()))
+    if fmt == "csv":
+        out = pd.DataFrame(proba, columns=list(classes))
+        out.insert(0, "prediction", labels)
+        buf = io.StringIO()
+        out.to_csv(buf, header=header, index=False)
+        return buf.getvalue()
+    raise ValueError(f"unknown stream format: {fmt!r} (ใช้ {', '.join(STREAM_FORMATS)})")
+
+# ---------- เตรียม input (ใช้ร่วมกันทุก endpoint ของทั้งสองแอป) ----------
+class InputError(ValueError):
+    """ขาดฟิลด์บังคับ; errors = [{"row": i, "missing": [...]}] (แสดงไม่เกิน MAX_REPORTED_ERRORS แถว)"""
+
+    def __init__(self, errors: List[Dict[str, Any]], n_bad: int):
+        self.errors, self.n_bad = errors, n_bad
+        first = errors[0]
+        super().__init__(f"missing required fields: {', '.join(first['missing'])}" if n_bad == 1 else
+                         f"{n_bad} rows with missing required fields (first: row {first['row']}: "
+                         f"{', '.join(first['missing'])})")
+
+def schema_names(m) -> Dict[str, str]:
+    """ชื่อคอลัมน์ของโมเดลแบบตัวเล็ก → ชื่อจริง (หน้าเว็บส่ง gender/age/... แต่โมเดลที่ ship ใช้ Gender/Age/...)"""
+    return {c.lower(): c for c in (m.expected_cols or [])}
+
+def required_fields(m) -> List[Tuple[str, str]]:
+    """[(ชื่อที่รายงานใน error, ชื่อคอลัมน์ใน schema)] — บังคับเฉพาะฟิลด์ที่โมเดลใช้จริง (schema ไม่รู้ = บังคับทั้งหมด)"""
+    names = schema_names(m)
+    if not names:
+        return [(f, f) for f in REQUIRED_FIELDS]
+    return [(f, names[f]) for f in REQUIRED_FIELDS if f in names]
+
+def _canonical_record(d: Dict[str, Any], names: Dict[str, str]) -> Dict[str, Any]:
+    # เปลี่ยน key ให้ตรงชื่อใน schema แบบไม่สนตัวพิมพ์; ถ้าส่งมาทั้งสองแบบ ชื่อที่ตรงเป๊ะชนะ
+    if not names: return d
+    out = {}
+    for k, v in d.items():
+        c = names.get(str(k).lower(), k)
+        if c not in out or k == c:
+            out[c] = v
+    return out
+
+def _canonical_frame(df: pd.DataFrame, names: Dict[str, str]) -> pd.DataFrame:
+    cols = set(df.columns)
+    rename = {k: names[str(k).lower()] for k in df.columns
+              if str(k).lower() in names and k != names[str(k).lower()] and names[str(k).lower()] not in cols}
+    return df.rename(columns=rename) if rename else df
+
+def _blank(v) -> bool:
+    # กติกาเดิมของ server/api.py: `not d.get(k)` → None / "" / 0 / 0.0 / False ถือว่าขาด
+    # + NaN ซึ่งคือ None เมื่อมาเป็น DataFrame; สตริง "0" / " " ไม่ว่าง (เหมือนเดิม)
+    if v is None: return True
+    if isinstance(v, float) and math.isnan(v): return True
+    try:
+        return not v
+    except (TypeError, ValueError):   # pd.NA / array
+        return False
+
+def _not_positive(v) -> bool:
+    try:
+        f = float(v)
+    except (TypeError, ValueError):
+        return True
+    return not f > 0   # NaN ด้วย
+
+def _missing(field: str, v) -> bool:
+    return _blank(v) or (field in POSITIVE_FIELDS and _not_positive(v))
+
+def _raise_missing(missing_by_row: Dict[int, List[str]]):
+    if missing_by_row:
+        rows = sorted(missing_by_row)
+        raise InputError([{"row": i, "missing": missing_by_row[i]} for i in rows[:MAX_REPORTED_ERRORS]], len(rows))
+
+def prepare_records(rows: List[Dict[str, Any]], m) -> List[Dict[str, Any]]:
+    """เส้นทาง list ของ dict (pool รับ record ได้ตรง ๆ เช่น DIET_FAST_PREP=1): ตรวจ + เติม bmi แล้วส่งต่อ
+    การ reindex/แปลงชนิดทำใน FeatureEncoder ซึ่งใช้กติกาเดียวกับ prepare_frame"""
+    req = required_fields(m)
+    names = schema_names(m)
+    bmi, height, weight = (names.get(c, c) for c in ("bmi", "height_cm", "weight_kg"))
+    missing, out = {}, []
+    for i, d in enumerate(rows):
+        d = _canonical_record(d, names)
+        miss = [f for f, c in req if _missing(f, d.get(c))]
+        if miss:
+            missing[i] = miss; continue
+        if d.get(bmi) is None and not _blank(d.get(height)) and not _blank(d.get(weight)):
+            try:
+                h = float(d[height]) / 100.0
+                d = {**d, bmi: round(float(d[weight]) / (h * h), 2)}
+            except (TypeError, ValueError, ZeroDivisionError):
+                pass
+        out.append(d)
+    _raise_missing(missing)
+    return out
+
+def prepare_frame(X, m) -> pd.DataFrame:
+    """เส้นทาง DataFrame: ตรวจฟิลด์บังคับ, เติม bmi, reindex ตาม expected_cols แล้วแปลงชนิด — ทั้ง batch แบบ vectorized"""
+    df = X if isinstance(X, pd.DataFrame) else pd.DataFrame(list(X))
+    names = schema_names(m)
+    df = _canonical_frame(df, names)
+    n = len(df)
+    bad = np.zeros(n, dtype=bool)
+    miss_cols = {}
+    for f, c in required_fields(m):
+        if c not in df.columns:
+            miss = np.ones(n, dtype=bool)
+        else:
+            s = df[c]
+            if f in POSITIVE_FIELDS:
+                miss = ~(pd.to_numeric(s, errors="coerce") > 0).to_numpy(dtype=bool)
+            elif pd.api.types.is_numeric_dtype(s):
+                miss = (s.isna() | (s == 0)).to_numpy(dtype=bool)
+            else:
+                miss = s.map(_blank).to_numpy(dtype=bool)
+        if miss.any():
+            miss_cols[f] = miss
+            bad |= miss
+    if bad.any():
+        _raise_missing({int(i): [f for f, mk in miss_cols.items() if mk[i]] for i in np.flatnonzero(bad)})
+
+    # คำนวณ BMI ถ้าไม่ส่งมา (เฉพาะแถวที่ bmi ว่าง)
+    bmi_col, height, weight = (names.get(c, c) for c in ("bmi", "height_cm", "weight_kg"))
+    if height in df.columns and weight in df.columns:
+        h = pd.to_numeric(df[height], errors="coerce").to_numpy(dtype=float) / 100.0
+        w = pd.to_numeric(df[weight], errors="coerce").to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            derived = np.round(w / (h * h), 2)
+        derived[~np.isfinite(derived)] = np.nan
+        bmi = df[bmi_col] if bmi_col in df.columns else pd.Series(np.nan, index=df.index)
+        df = df.assign(**{bmi_col: bmi.where(bmi.notna(), derived)})
+
+    # --- reindex ตามคอลัมน์ที่โมเดลคาดหวัง + แปลงชนิด ---
+    if m.expected_cols:
+        df = df.reindex(columns=m.expected_cols)
+    num_cols = [c for c in m.num_cols if c in df.columns]
+    cat_cols = [c for c in m.cat_cols if c in df.columns]
+    if num_cols:
+        df[num_cols] = df[num_cols].apply(pd.to_numeric, errors="coerce").fillna(0)
+    if cat_cols:
+        df[cat_cols] = df[cat_cols].astype(str)
+    return df
+
+def prepare(X, m):
+    """list ของ dict → records (ถ้า pool รับได้) หรือ DataFrame ที่พร้อมเข้า Pipeline"""
+    if isinstance(X, list) and getattr(m.pool, "accepts_records", False):
+        return prepare_records(X, m)
+    return prepare_frame(X, m)
+
+def _empty(m):
+    # 0 แถว: sklearn ไม่รับ X ว่าง (ValueError) → ตอบผลว่างรูปเดียวกับผลปกติโดยไม่เรียกโมเดล
+    return np.empty(0, dtype=np.intp), np.empty((0, len(m.classes)), dtype=np.float64)
+
+def predict(m, X, n_jobs: Optional[int] = None, stage=None):
+    """ทำนายทั้ง batch → (labels_idx, proba); stage(name) คืน context manager สำหรับจับเวลาแต่ละขั้น (metrics)"""
+    stage = stage or (lambda name: nullcontext())
+    with stage("preprocess"):
+        X = prepare(X, m)
+    if len(X) == 0:
+        return _empty(m)
+    with stage("model"):
+        return m.pool.run(X, n_jobs)
+
+async def apredict(m, X, n_jobs: Optional[int] = None, stage=None, executor=None):
+    """เหมือน predict แต่ไม่บล็อก event loop ระหว่างรอโมเดล; executor= ย้าย preprocess ของ batch ใหญ่ออกจาก loop ด้วย"""
+    stage = stage or (lambda name: nullcontext())
+    with stage("preprocess"):
+        X = prepare(X, m) if executor is None else \
+            await asyncio.get_running_loop().run_in_executor(executor, prepare, X, m)
+    if len(X) == 0:
+        return _empty(m)
+    with stage("model"):
+        return await m.pool.arun(X, n_jobs)
@@ -0,0 +1,190 @@
+# ==== diet_ingest.py ====
+# แปลง CSV ต้นฉบับเป็นไฟล์คอลัมน์ (Parquet / Arrow IPC) ครั้งเดียว: คอลัมน์ข้อความเป็น category,
+# จำนวนเต็มถูก downcast แบบไม่เสียค่า และเก็บ schema ไว้ข้างไฟล์ (<ไฟล์>.schema.json)
+# ตอนฝึก/ประเมินจึงไม่ต้อง sniff + parse CSV และไม่ต้องเดาชนิดคอลัมน์ด้วย select_dtypes ใหม่ทุกรอบ
+#   python diet_ingest.py convert --src dataset.csv --dst data/dataset.parquet
+#   python diet_ingest.py show --src data/dataset.parquet
+# ต้องมี pyarrow สำหรับ .parquet / .arrow (.feather)
+import argparse, csv, json, os, time
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+import pandas as pd
+
+ENCODINGS = ["utf-8-sig", "utf-8", "cp874", "latin-1"]
+SEPARATORS = ",;\t|"
+POSSIBLE_TARGETS = ["Diet_Recommendation", "diet_recommendation", "Target"]
+COLUMNAR_SUFFIXES = {".parquet": "parquet", ".pq": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+
+# ---------- อ่าน CSV: sniff encoding/sep จากตัวอย่างต้นไฟล์ครั้งเดียว แล้วอ่านด้วย C engine ----------
+def sniff_csv(path: Path, sample_bytes: int = 64 * 1024):
+    """คืน (sep, encoding) จาก sample ต้นไฟล์ — แทนการลอง read_csv(engine="python") ทั้งไฟล์สูงสุด 20 รอบ"""
+    with Path(path).open("rb") as f:
+        raw = f.read(sample_bytes)
+    for enc in ENCODINGS:
+        try:
+            text = raw.decode(enc)
+            break
+        except UnicodeDecodeError:
+            # sample อาจตัดกลางตัวอักษรหลายไบต์ → ลองตัดท้ายทิ้งนิดหน่อย
+            try:
+                text = raw[:-3].decode(enc)
+                break
+            except UnicodeDecodeError:
+                continue
+    lines = text.splitlines()
+    sample = "\n".join(lines[:-1] if len(lines) > 1 else lines)   # ตัดบรรทัดสุดท้ายที่อาจไม่ครบ
+    try:
+        sep = csv.Sniffer().sniff(sample, delimiters=SEPARATORS).delimiter
+    except csv.Error:
+        sep = max(SEPARATORS, key=lambda d: lines[0].count(d)) if lines else ","
+    return sep, enc
+
+def read_dataset(path: Path) -> pd.DataFrame:
+    sep, enc = sniff_csv(path)
+    try:
+        df = pd.read_csv(path, sep=sep, encoding=enc)
+    except Exception as e:
+        # sniff พลาด (ไฟล์แปลก ๆ) → ให้ pandas เดา sep เองแบบเดิม
+        print(f"   ⚠️ อ่านด้วย sep={sep!r}, encoding='{enc}' ไม่สำเร็จ ({e}) → ใช้ sep=None")
+        sep = None
+        df = pd.read_csv(path, sep=None, encoding=enc, engine="python")
+    print(f"   → อ่านสำเร็จด้วย sep={repr(sep)}, encoding='{enc}'")
+    return df
+
+# ---------- ชนิดคอลัมน์ ----------
+def find_target(df: pd.DataFrame) -> Optional[str]:
+    return next((c for c in POSSIBLE_TARGETS if c in df.columns), None)
+
+def typed_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """ข้อความ → category, int → int ที่เล็กที่สุดที่พอ; float คงเป็น float64 (ให้ scaler/โมเดลได้ค่าเดิมเป๊ะ)"""
+    out = {}
+    for c in df.columns:
+        s = df[c]
+        # pandas 3 อ่านข้อความเป็น dtype "str" ไม่ใช่ object
+        if s.dtype == object or pd.api.types.is_string_dtype(s) or isinstance(s.dtype, pd.CategoricalDtype):
+            out[c] = s.astype("category")
+        elif pd.api.types.is_integer_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            out[c] = pd.to_numeric(s, downcast="integer")
+        else:
+            out[c] = s
+    return pd.DataFrame(out, index=df.index)
+
+def frame_schema(df: pd.DataFrame, target: Optional[str] = None) -> Dict:
+    cols = []
+    for c in df.columns:
+        s = df[c]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            cols.append({"name": c, "kind": "category", "categories": [str(v) for v in s.cat.categories]})
+        else:
+            cols.append({"name": c, "kind": "numeric", "dtype": str(s.dtype)})
+    return {"target": target, "rows": int(len(df)), "columns": cols}
+
+def schema_path(path: Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".schema.json")
+
+def _format(path: Path) -> str:
+    fmt = COLUMNAR_SUFFIXES.get(Path(path).suffix.lower())
+    if fmt is None:
+        raise ValueError(f"ไม่รู้จักนามสกุล {Path(path).suffix!r} (ใช้ {', '.join(COLUMNAR_SUFFIXES)})")
+    return fmt
+
+# ---------- แปลง CSV → Parquet / Arrow ----------
+def ingest(src: Path, dst: Path) -> Dict:
+    fmt = _format(dst)
+    t0 = time.perf_counter()
+    raw = read_dataset(src)
+    df = typed_frame(raw)
+    schema = {**frame_schema(df, find_target(df)), "format": fmt, "created": int(time.time()),
+              "source": {"path": str(Path(src).resolve()), "bytes": Path(src).stat().st_size,
+                         "mtime": int(Path(src).stat().st_mtime)}}
+    dst = Path(dst)
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(dst.name + ".tmp")
+    if fmt == "parquet":
+        df.to_parquet(tmp, index=False)
+    else:
+        df.reset_index(drop=True).to_feather(tmp)
+    os.replace(tmp, dst)
+    sp = schema_path(dst)
+    sp.write_text(json.dumps(schema, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"💾 Saved: {dst} ({dst.stat().st_size / 1e6:.2f} MB, {len(df)} rows, "
+          f"{raw.memory_usage(deep=True).sum() / 1e6:.1f} → {df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory, "
+          f"{time.perf_counter() - t0:.2f}s) + {sp.name}")
+    return schema
+
+# ---------- โหลด ----------
+def load_schema(path: Path) -> Optional[Dict]:
+    sp = schema_path(path)
+    return json.loads(sp.read_text(encoding="utf-8")) if sp.exists() else None
+
+def _apply_schema(df: pd.DataFrame, schema: Dict, name: str) -> pd.DataFrame:
+    names = [c["name"] for c in schema["columns"]]
+    if list(df.columns) != names:
+        raise ValueError(f"คอลัมน์ใน {name} ไม่ตรงกับ schema: {list(df.columns)} != {names}")
+    for c in schema["columns"]:
+        s = df[c["name"]]
+        if c["kind"] == "category":
+            dtype = pd.CategoricalDtype(c["categories"])
+            if s.dtype != dtype:
+                s = s.astype(str).where(s.notna())
+                # astype(category) จะเปลี่ยนค่าที่ไม่อยู่ใน schema เป็น NaN เงียบ ๆ → ไม่รับ
+                unknown = set(s.dropna()) - set(c["categories"])
+                if unknown:
+                    raise ValueError(f"{name}: คอลัมน์ {c['name']!r} มีค่านอก schema: {sorted(unknown)[:5]}")
+                df[c["name"]] = s.astype(dtype)
+        elif not pd.api.types.is_numeric_dtype(s):
+            raise ValueError(f"{name}: คอลัมน์ {c['name']!r} ต้องเป็นตัวเลข ({c['dtype']}) แต่ได้ {s.dtype}")
+    return df
+
+def load_dataset(path: Path) -> pd.DataFrame:
+    """.csv → sniff + read_csv ตามเดิม; .parquet/.arrow → อ่านไฟล์คอลัมน์ แล้วบังคับ dtype ตาม schema ที่เก็บไว้"""
+    path = Path(path)
+    if path.suffix.lower() not in COLUMNAR_SUFFIXES:
+        return read_dataset(path)
+    df = pd.read_parquet(path) if _format(path) == "parquet" else pd.read_feather(path)
+    schema = load_schema(path)
+    if schema is None:
+        print(f"   ⚠️ ไม่พบ {schema_path(path).name} → ใช้ dtype ตามไฟล์")
+        return df
+    df = _apply_schema(df, schema, path.name)
+    print(f"   → อ่าน {_format(path)} สำเร็จ ({len(df)} rows, schema {schema_path(path).name})")
+    return df
+
+def iter_dataset(path: Path, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    """อ่านทีละ chunk (หน่วยความจำคงที่): CSV ผ่าน read_csv(chunksize), Parquet ทีละ batch, Arrow ทีละ record batch"""
+    path = Path(path)
+    if path.suffix.lower() not in COLUMNAR_SUFFIXES:
+        sep, enc = sniff_csv(path)
+        yield from pd.read_csv(path, sep=sep, encoding=enc, chunksize=chunksize)
+        return
+    schema = load_schema(path)
+    fix = (lambda df: _apply_schema(df, schema, path.name)) if schema else (lambda df: df)
+    if _format(path) == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield fix(batch.to_pandas())
+    else:
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as src:
+            reader = pa.ipc.open_file(src)
+            for i in range(reader.num_record_batches):
+                yield fix(reader.get_batch(i).to_pandas())
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="convert the training CSV to a typed columnar file")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("convert")
+    c.add_argument("--src", type=Path, required=True)
+    c.add_argument("--dst", type=Path, required=True, help=".parquet or .arrow/.feather")
+    s = sub.add_parser("show")
+    s.add_argument("--src", type=Path, required=True)
+    args = ap.parse_args()
+
+    if args.cmd == "convert":
+        ingest(args.src, args.dst)
+    else:
+        df = load_dataset(args.src)
+        print(df.dtypes.to_string())
+        print(f"{len(df)} rows, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB in memory")
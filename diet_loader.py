@@ -0,0 +1,262 @@
+# ==== diet_loader.py ====
+# โหลดโมเดลสำหรับ API: แชร์อาร์เรย์ของป่าข้าม worker ได้ (FlatForest แบบ .npy + mmap),
+# โหลดแบบ lazy ได้ (liveness ตอบทันที, readiness รอจนโหลด + warm-up เสร็จ) และ warm-up ก่อนรับงานจริง
+#   DIET_MODEL_PATH=...      ใช้ไฟล์โมเดลอื่น; label encoder อ่านจาก label_encoder.joblib ในโฟลเดอร์เดียวกัน
+#   DIET_LE_PATH=...         ระบุไฟล์ label encoder เอง (ไม่งั้นตามโฟลเดอร์ของ DIET_MODEL_PATH / ค่าเริ่มต้นของแอป)
+#   DIET_MODEL_MMAP=1        ใช้คู่กับ DIET_ENGINE=flat + DIET_FLAT_FOREST=<dir จาก diet_forest.py export>: เปิดป่าด้วย
+#                            np.load(mmap_mode="r") แล้วทิ้งต้นไม้ของ sklearn (joblib mmap_mode ไม่ช่วย เพราะ
+#                            Tree.__setstate__ copy node/value ของทุกต้นเข้าหน่วยความจำของ process เอง)
+#   DIET_LAZY_LOAD=1         ไม่โหลดตอน import; โหลดใน thread เบื้องหลังตอน startup (หรือตอน request แรก)
+#   DIET_WARMUP_ROWS=N       จำนวนแถวสังเคราะห์สำหรับ warm-up (0 = ปิด)
+#   DIET_MODEL_REGISTRY=dir  ใช้เวอร์ชันที่ ACTIVE ในทะเบียน (ดู diet_registry.py) แทนไฟล์เดี่ยว
+#   DIET_MODEL_WATCH=sec     เช็คทุก sec วินาทีว่าเวอร์ชัน/ไฟล์เปลี่ยนไหม แล้วสลับโมเดลให้เองโดยไม่ต้อง restart
+#   DIET_MODEL_VARIANT=name  ใช้ <model>.<name>.joblib ข้างไฟล์โมเดล (เช่น compact จาก `train --compress`); ไม่มีไฟล์ = ตัวเต็ม
+import os, threading, time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+import diet_inference as inference
+from diet_registry import ModelRegistry
+
+def load_artifact(path: Path):
+    return joblib.load(path)
+
+def variant_path(model_path: Path, variant: Optional[str]) -> Path:
+    """<name>.joblib → <name>.<variant>.joblib ถ้ามีไฟล์นั้นอยู่ ไม่งั้นคืนไฟล์เดิม"""
+    if not variant: return model_path
+    p = model_path.with_name(f"{model_path.stem}.{variant}{model_path.suffix}")
+    return p if p.exists() else model_path
+
+def model_schema(model):
+    """(expected_cols, cat_cols, num_cols) จากขั้น prep ของ Pipeline ที่ fit แล้ว"""
+    prep = getattr(model, "named_steps", {}).get("prep", None)
+    expected_cols = list(getattr(prep, "feature_names_in_", [])) if prep is not None else []
+    cat_cols, num_cols = [], []
+    if prep is not None and getattr(prep, "transformers", None):
+        for name, trans, cols in prep.transformers:
+            if name == "cat":
+                cat_cols = list(cols)
+            elif name == "num":
+                num_cols = list(cols)
+    return expected_cols, cat_cols, num_cols
+
+def warmup_rows(model, n: int) -> List[Dict[str, Any]]:
+    """แถวตัวอย่างที่ผ่าน prep ได้: หมวดหมู่ที่รู้จัก (วนตาม categories_) และค่าเฉลี่ยของตัวเลข"""
+    prep = getattr(model, "named_steps", {}).get("prep", None)
+    if prep is None or not hasattr(prep, "transformers_"): return []
+    cats, means = {}, {}
+    for name, trans, cols in prep.transformers_:
+        if hasattr(trans, "categories_"):
+            cats.update({c: list(v) for c, v in zip(cols, trans.categories_)})
+        elif hasattr(trans, "mean_"):
+            means.update({c: float(m) for c, m in zip(cols, trans.mean_)})
+    return [{**{c: v[i % len(v)] for c, v in cats.items()}, **means} for i in range(n)]
+
+class LoadedModel:
+    def __init__(self, version: str, model, label_encoder, pool, classes, load_s: float):
+        self.version = version
+        self.model = model
+        self.label_encoder = label_encoder
+        self.pool = pool
+        self.classes = classes
+        self.expected_cols, self.cat_cols, self.num_cols = model_schema(model)
+        self.load_s = load_s
+        self.warmup_s = 0.0
+        # request ที่ถือเวอร์ชันนี้อยู่ (acquire/release); pool ถูกปิดเมื่อถูกสลับออกแล้ว และไม่มีใครถืออยู่
+        self._refs = 0
+        self._retired = False
+        self._ref_lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return self._refs
+
+    def acquire(self) -> "LoadedModel":
+        with self._ref_lock:
+            self._refs += 1
+        return self
+
+    def try_acquire(self) -> Optional["LoadedModel"]:
+        """acquire ถ้า pool ยังใช้ได้ (ยังไม่ถูกสลับออก หรือยังมี request ถืออยู่) ไม่งั้น None"""
+        with self._ref_lock:
+            if self._retired and self._refs == 0:
+                return None
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._ref_lock:
+            self._refs -= 1
+            drained = self._retired and self._refs == 0
+        if drained:
+            self.pool.shutdown()
+
+    def retire(self):
+        """ถูกสลับออกแล้ว: ปิด pool ทันทีถ้าไม่มี request ถืออยู่ ไม่งั้นรอ release ตัวสุดท้าย"""
+        with self._ref_lock:
+            self._retired = True
+            drained = self._refs == 0
+        if drained:
+            self.pool.shutdown()
+
+class ModelRuntime:
+    """ถือโมเดลที่ใช้งานอยู่ + pool ของมัน; ensure() โหลดครั้งแรกแบบ thread-safe,
+    reload() โหลด + warm-up เวอร์ชันใหม่ให้เสร็จก่อน แล้วค่อยสลับ (request ที่ถือเวอร์ชันเก่าอยู่ทำต่อจนจบ)"""
+
+    def __init__(self, model_path: Path, le_path: Path, pool_factory, mmap: bool = False,
+                 lazy: bool = False, warmup: int = 0, registry: Optional[ModelRegistry] = None,
+                 variant: Optional[str] = None):
+        self.model_path, self.le_path = Path(model_path), Path(le_path)
+        self.variant = variant
+        self.pool_factory = pool_factory
+        self.mmap, self.lazy, self.warmup = mmap, lazy, warmup
+        self.registry = registry
+        self.current: Optional[LoadedModel] = None
+        self.error: Optional[str] = None
+        self.listeners = []   # fn(LoadedModel) เรียกหลังสลับเวอร์ชัน (เช่นล้าง cache)
+        self.reloads = 0
+        self._lock = threading.Lock()        # โหลด/reload ทีละครั้ง (ถือไว้นานระหว่างโหลด)
+        self._swap_lock = threading.Lock()   # สลับ current + acquire (สั้น ๆ ไม่รอการโหลด)
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        if not lazy:
+            self.ensure()
+
+    @property
+    def ready(self) -> bool:
+        return self.current is not None
+
+    def _resolve(self, version: Optional[str] = None) -> Tuple[str, Path, Path]:
+        """(version, model_path, le_path): `version` หรือเวอร์ชันที่ ACTIVE ในทะเบียน หรือไฟล์เดี่ยว (version = ชื่อไฟล์@mtime)
+        ถ้าใช้ variant ได้ version จะต่อท้ายด้วย +<variant> (cache/grid ของตัวเต็มจะไม่ถูกใช้ปน)"""
+        if self.registry is not None:
+            v = version or self.registry.active()
+            if v:
+                mp, lp = self.registry.paths(v)
+                vp = variant_path(mp, self.variant)
+                return (f"{v}+{self.variant}" if vp != mp else v), vp, lp
+        mp = variant_path(self.model_path, self.variant)
+        return f"{mp.name}@{int(mp.stat().st_mtime)}", mp, self.le_path
+
+    def _load(self, version: str, model_path: Path, le_path: Path) -> LoadedModel:
+        t0 = time.perf_counter()
+        model = load_artifact(model_path)
+        le = joblib.load(le_path)
+        pool = self.pool_factory(model, model_path, self.mmap)
+        if getattr(pool, "shared_model", None) is not None:
+            model = pool.shared_model   # ป่าแบบ memmap แทน Pipeline ของ sklearn → ต้นไม้ส่วนตัวถูกเก็บกวาด
+        loaded = LoadedModel(version, model, le, pool, inference.class_names(le), time.perf_counter() - t0)
+        rows = warmup_rows(model, self.warmup)
+        if rows:
+            t0 = time.perf_counter()
+            pool.run(rows)
+            loaded.warmup_s = time.perf_counter() - t0
+        return loaded
+
+    def ensure(self) -> LoadedModel:
+        cur = self.current
+        if cur is not None: return cur
+        with self._lock:
+            if self.current is None:
+                try:
+                    self.current = self._load(*self._resolve())
+                    self.error = None
+                except Exception as e:
+                    self.error = str(e)
+                    raise RuntimeError(f"โหลดโมเดลไม่สำเร็จ: {e}")
+            return self.current
+
+    def acquire(self) -> LoadedModel:
+        """เวอร์ชันปัจจุบันแบบนับ reference — ต้อง release() เมื่อใช้ pool เสร็จ (หรือใช้ lease())"""
+        self.ensure()
+        with self._swap_lock:
+            return self.current.acquire()
+
+    @contextmanager
+    def lease(self):
+        m = self.acquire()
+        try:
+            yield m
+        finally:
+            m.release()
+
+    def reload(self, version: Optional[str] = None, force: bool = False) -> LoadedModel:
+        """สลับไปใช้ `version` (ต้องมี registry) หรือเวอร์ชันที่ ACTIVE/ไฟล์ปัจจุบัน; โหลดไม่สำเร็จ = ใช้ตัวเดิมต่อ
+        ACTIVE ในทะเบียนถูกเปลี่ยนหลังโหลด + warm-up สำเร็จแล้วเท่านั้น"""
+        if version is not None and self.registry is None:
+            raise RuntimeError("ต้องตั้ง DIET_MODEL_REGISTRY ก่อนจึงเลือกเวอร์ชันได้")
+        with self._lock:
+            target = self._resolve(version)
+            old = self.current
+            if old is not None and old.version == target[0] and not force:
+                if version is not None: self.registry.activate(version)
+                return old
+            try:
+                new = self._load(*target)
+                if version is not None:
+                    self.registry.activate(version)
+            except Exception as e:
+                self.error = str(e)
+                raise RuntimeError(f"โหลดโมเดลเวอร์ชัน {target[0]} ไม่สำเร็จ: {e}")
+            with self._swap_lock:
+                self.current, self.error = new, None
+            self.reloads += 1
+        if old is not None:
+            # pool เก่าปิดเมื่อ request ที่ยังถือเวอร์ชันเก่า (รวม stream ที่ส่งไม่จบ) release ครบ
+            old.retire()
+        for fn in self.listeners:
+            fn(new)
+        return new
+
+    def start_watcher(self, interval: float):
+        """เช็ค ACTIVE ของทะเบียน (หรือ mtime ของไฟล์โมเดล) ทุก interval วินาที แล้ว reload เมื่อเปลี่ยน"""
+        if interval <= 0 or self._watcher: return
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    if self.current is not None and self._resolve()[0] != self.current.version:
+                        print(f"[INFO] model changed → reloading ({self.reload().version})")
+                except Exception as e:
+                    print(f"[WARN] model reload failed: {e}")
+        self._watcher = threading.Thread(target=loop, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def start_background_load(self):
+        if self.ready: return
+        def run():
+            try:
+                self.ensure()
+            except RuntimeError as e:
+                print(f"[ERROR] {e}")
+        threading.Thread(target=run, name="model-loader", daemon=True).start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self.current is not None:
+            self.current.pool.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        cur = self.current
+        return {"ready": cur is not None, "version": cur.version if cur else None,
+                "path": str(self.model_path), "registry": str(self.registry.root) if self.registry else None,
+                "variant": self.variant, "mmap": self.mmap, "lazy": self.lazy, "reloads": self.reloads,
+                "in_flight": cur.in_flight if cur else 0,
+                "load_s": cur.load_s if cur else None, "warmup_s": cur.warmup_s if cur else None,
+                "error": self.error}
+
+def runtime_from_env(default_model: Path, le_path: Path, pool_factory) -> ModelRuntime:
+    registry = ModelRegistry(Path(os.environ["DIET_MODEL_REGISTRY"])) if os.getenv("DIET_MODEL_REGISTRY") else None
+    model_path = Path(os.getenv("DIET_MODEL_PATH", str(default_model)))
+    # encoder ต้องมาคู่กับโมเดล: ย้ายโมเดลไปโฟลเดอร์อื่น = ใช้ encoder ของโฟลเดอร์นั้น (ไม่มีไฟล์ → โหลดไม่สำเร็จ ไม่ใช่ใช้ตัวเดิม)
+    if os.getenv("DIET_LE_PATH"):
+        le_path = Path(os.environ["DIET_LE_PATH"])
+    elif os.getenv("DIET_MODEL_PATH"):
+        le_path = model_path.parent / Path(le_path).name
+    return ModelRuntime(model_path, le_path, pool_factory,
+                        mmap=os.getenv("DIET_MODEL_MMAP", "0") == "1",
+                        lazy=os.getenv("DIET_LAZY_LOAD", "0") == "1",
+                        warmup=int(os.getenv("DIET_WARMUP_ROWS", "32")),
+                        registry=registry, variant=os.getenv("DIET_MODEL_VARIANT") or None)
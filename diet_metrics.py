@@ -0,0 +1,141 @@
+# ==== diet_metrics.py ====
+# metric แบบ Prometheus (text exposition format 0.0.4) เขียนเอง ไม่ต้องพึ่ง prometheus_client
+#   - diet_http_requests_total / diet_http_request_duration_seconds   ต่อ method + route (path template ไม่ใช่ URL จริง)
+#   - diet_predict_stage_seconds{route, stage}   preprocess / model / postprocess ภายใน handler ทำนาย
+#   - diet_predict_batch_rows{route}             จำนวนแถวต่อการเรียกโมเดลหนึ่งครั้ง (รวม micro-batch)
+# pydantic parsing + JSON serialization อยู่นอก handler → ดูได้จาก request duration ลบผลรวมของ stage
+#   DIET_METRICS=0   ปิดการเก็บ (endpoint /metrics ยังตอบ แต่ไม่มีค่าใหม่)
+import bisect, os, threading, time
+from typing import Callable, Dict, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROWS_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384, 65536)
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _labels(names, values, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    return repr(float(v)) if v == v else "NaN"
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), v: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + v
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"] + \
+               [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}   # labels → [counts ต่อ bucket (+Inf ท้ายสุด), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, v: float):
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            s[0][i] += 1
+            s[1] += v
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), total)) for k, (c, total) in self._series.items())
+        out = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for k, (counts, total) in items:
+            acc = 0
+            for b, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le = 'le="+Inf"' if b == float("inf") else f'le="{_num(b)}"'
+                out.append(f"{self.name}_bucket{_labels(self.labelnames, k, le)} {acc}")
+            out.append(f"{self.name}_sum{_labels(self.labelnames, k)} {_num(total)}")
+            out.append(f"{self.name}_count{_labels(self.labelnames, k)} {acc}")
+        return out
+
+class _Stage:
+    __slots__ = ("hist", "labels", "t0")
+
+    def __init__(self, hist: Histogram, labels: tuple):
+        self.hist, self.labels = hist, labels
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe(self.labels, time.perf_counter() - self.t0)
+        return False
+
+class _NoStage:
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NO_STAGE = _NoStage()
+
+class Metrics:
+    def __init__(self, enabled: bool = True, prefix: str = "diet"):
+        self.enabled = enabled
+        self.requests = Counter(f"{prefix}_http_requests_total", "HTTP requests by route and status.",
+                                ("method", "route", "status"))
+        self.latency = Histogram(f"{prefix}_http_request_duration_seconds", "HTTP request latency by route.",
+                                 ("method", "route"))
+        self.stages = Histogram(f"{prefix}_predict_stage_seconds", "Time spent per inference stage.",
+                                ("route", "stage"))
+        self.batch_rows = Histogram(f"{prefix}_predict_batch_rows", "Rows per model call.", ("route",), ROWS_BUCKETS)
+        self.gauges: List[Tuple[str, str, Callable[[], float]]] = []
+
+    def stage(self, route: str, stage: str):
+        """with metrics.stage("/api/predict", "model"): ...  (ใช้ข้าม await ได้ เพราะจับแค่เวลา)"""
+        return _Stage(self.stages, (route, stage)) if self.enabled else _NO_STAGE
+
+    def rows(self, route: str, n: int):
+        if self.enabled: self.batch_rows.observe((route,), n)
+
+    def gauge(self, name: str, help: str, fn: Callable[[], float]):
+        """ค่าที่อ่านตอน scrape (เช่นสถานะโมเดล, สถิติ cache) — fn ต้องเร็วและไม่ raise"""
+        self.gauges.append((name, help, fn))
+
+    async def middleware(self, request, call_next):
+        if not self.enabled:
+            return await call_next(request)
+        t0 = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            # route = path template ของ FastAPI (กัน label ระเบิดจาก URL/query จริง)
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            self.latency.observe((request.method, route), time.perf_counter() - t0)
+            self.requests.inc((request.method, route, str(status)))
+
+    def render(self) -> str:
+        lines = self.requests.render() + self.latency.render() + self.stages.render() + self.batch_rows.render()
+        for name, help, fn in self.gauges:
+            try:
+                v = float(fn())
+            except Exception:
+                continue
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {_num(v)}"]
+        return "\n".join(lines) + "\n"
+
+def metrics_from_env() -> Metrics:
+    return Metrics(enabled=os.getenv("DIET_METRICS", "1") != "0")
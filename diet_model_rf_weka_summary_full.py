@@ -1,20 +1,35 @@
 # ==== diet_model_rf_weka_summary_full.py ====
+# ฝึก / ประเมิน / export โมเดลแนะนำอาหาร (Random Forest) — import ได้โดยไม่รันอะไร, ใช้ผ่าน CLI:
+#   python diet_model_rf_weka_summary_full.py train    --data dataset.csv --out-dir artifacts --seed 42 --n-iter 12
+#     (--search random ต่อจาก <out-dir>/search_checkpoint.jsonl เองถ้ามี; --no-resume เริ่มค้นใหม่)
+#   python diet_model_rf_weka_summary_full.py evaluate --data dataset.csv --model-dir artifacts
+#   --data รับ .parquet / .arrow ที่แปลงด้วย diet_ingest.py ได้ด้วย (โหลดเร็วกว่า + ใช้หน่วยความจำน้อยกว่า)
+#   python diet_model_rf_weka_summary_full.py compress --data dataset.csv --model-dir artifacts --trees 25 50 100 --depths 10 14
+#   python diet_model_rf_weka_summary_full.py export   --model-dir artifacts --registry models --version v2 --activate
+import argparse
 import pandas as pd
 import numpy as np
 from pathlib import Path
-from sklearn.model_selection import train_test_split, StratifiedKFold, RandomizedSearchCV
+from sklearn.model_selection import (
+    train_test_split, StratifiedKFold, RandomizedSearchCV, ParameterSampler, cross_val_score
+)
+from sklearn.base import clone
 from sklearn.preprocessing import OneHotEncoder, StandardScaler, LabelEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline as SkPipeline
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import (
-    accuracy_score, f1_score, classification_report, confusion_matrix,
-    precision_recall_fscore_support, cohen_kappa_score
-)
-import joblib, os
+from sklearn.metrics import accuracy_score, f1_score, classification_report, confusion_matrix
+import copy, io, joblib, os, json, shutil, time
+
+from diet_ingest import load_dataset, iter_dataset, POSSIBLE_TARGETS
+from diet_eval import WekaAccumulator, aligned_proba, evaluate_chunks, label_index, write_report
 
-# ---------- 1) หาไฟล์ CSV อัตโนมัติ ----------
-ROOT_DIRS = [Path.cwd(), Path(r"C:\Users\ACER\OneDrive\Desktop\s3")]
+MODEL_FILE = "diet_recommendation_rf_model.joblib"
+LE_FILE    = "label_encoder.joblib"
+COMPACT_FILE = "diet_recommendation_rf_model.compact.joblib"   # DIET_MODEL_VARIANT=compact (diet_loader.py)
+
+# ---------- 1) หาไฟล์ CSV อัตโนมัติ (ใช้เมื่อไม่ได้ส่ง --data) ----------
+ROOT_DIRS = [Path.cwd(), Path(__file__).resolve().parent]
 PATTERNS = ["*data*set*is*.csv", "*dataset*is*.csv", "*.csv"]
 
 def find_csv(roots, patterns):
@@ -25,84 +40,72 @@ def find_csv(roots, patterns):
                 if p.is_file(): return p.resolve()
     return None
 
-csv_path = find_csv(ROOT_DIRS, PATTERNS)
-if not csv_path:
-    raise FileNotFoundError("ไม่พบไฟล์ CSV — วางไฟล์ไว้โฟลเดอร์เดียวกับสคริปต์หรือแก้ ROOT_DIRS")
-print(f"✅ ใช้ไฟล์: {csv_path}")
-
-# ---------- 2) อ่านข้อมูล (กันพังหลาย encoding/sep) ----------
-read_ok, last_err = False, None
-for sep in [None, ",", ";", "\t", "|"]:
-    for enc in ["utf-8-sig", "utf-8", "cp874", "latin-1"]:
-        try:
-            df = pd.read_csv(csv_path, sep=sep, encoding=enc, engine="python")
-            read_ok = True
-            print(f"   → อ่านสำเร็จด้วย sep={repr(sep)}, encoding='{enc}'")
-            break
-        except Exception as e:
-            last_err = e
-    if read_ok: break
-if not read_ok:
-    raise RuntimeError(f"อ่านไฟล์ไม่สำเร็จ: {last_err}")
+# ---------- 2) อ่านข้อมูล: CSV (sniff ครั้งเดียว) หรือ Parquet/Arrow ที่ผ่าน diet_ingest.py แล้ว ----------
+def load_data(data_path=None):
+    csv_path = Path(data_path).resolve() if data_path else find_csv(ROOT_DIRS, PATTERNS)
+    if not csv_path or not csv_path.exists():
+        raise FileNotFoundError("ไม่พบไฟล์ CSV — ส่ง --data หรือวางไฟล์ไว้โฟลเดอร์เดียวกับสคริปต์")
+    print(f"✅ ใช้ไฟล์: {csv_path}")
+    X, y_text = split_target(load_dataset(csv_path))
+    print("🎯 ตัวอย่าง Target:", y_text.unique()[:5])
+    print("📊 สัดส่วนคลาส:\n", y_text.value_counts(normalize=True).round(3))
+    return X, y_text
 
 # ---------- 3) Target / Features ----------
-POSSIBLE_TARGETS = ["Diet_Recommendation", "diet_recommendation", "Target"]
-target_col = next((c for c in POSSIBLE_TARGETS if c in df.columns), None)
-if not target_col:
-    raise KeyError(f"ไม่พบคอลัมน์ Target ใน {list(df.columns)}")
-
-y_text = df[target_col]
-X = df.drop(columns=[target_col])
-
-print("🎯 ตัวอย่าง Target:", y_text.unique()[:5])
-print("📊 สัดส่วนคลาส:\n", y_text.value_counts(normalize=True).round(3))
+def split_target(df: pd.DataFrame):
+    target_col = next((c for c in POSSIBLE_TARGETS if c in df.columns), None)
+    if not target_col:
+        raise KeyError(f"ไม่พบคอลัมน์ Target ใน {list(df.columns)}")
+    return df.drop(columns=[target_col]), df[target_col]
 
 # ---------- 4) เข้ารหัสเป้าหมาย + แยกชนิดคอลัมน์ ----------
-le = LabelEncoder()
-y = le.fit_transform(y_text)
-categorical_cols = X.select_dtypes(include=["object"]).columns.tolist()
-numeric_cols     = X.select_dtypes(include=[np.number]).columns.tolist()
-print("🔖 Target mapping:", {cls: int(i) for i, cls in enumerate(le.classes_)})
+def column_types(X: pd.DataFrame):
+    # ไฟล์ที่ ingest แล้วเก็บคอลัมน์ข้อความเป็น category
+    categorical_cols = X.select_dtypes(include=["object", "category"]).columns.tolist()
+    numeric_cols     = X.select_dtypes(include=[np.number]).columns.tolist()
+    return categorical_cols, numeric_cols
 
 # ---------- 5) Train/Test split ----------
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.30, random_state=42, stratify=y
-)
+def split(X, y, seed: int = 42, test_size: float = 0.30):
+    return train_test_split(X, y, test_size=test_size, random_state=seed, stratify=y)
 
 # ---------- 6) Preprocessor ----------
-try:
-    ohe = OneHotEncoder(handle_unknown="ignore", sparse_output=False)  # sklearn >=1.2
-except TypeError:
-    ohe = OneHotEncoder(handle_unknown="ignore", sparse=False)         # sklearn <1.2
-
-preprocessor = ColumnTransformer(
-    [("cat", ohe, categorical_cols),
-     ("num", StandardScaler(), numeric_cols)],
-    remainder="drop"
-)
+def make_preprocessor(categorical_cols, numeric_cols):
+    try:
+        ohe = OneHotEncoder(handle_unknown="ignore", sparse_output=False)  # sklearn >=1.2
+    except TypeError:
+        ohe = OneHotEncoder(handle_unknown="ignore", sparse=False)         # sklearn <1.2
+    return ColumnTransformer(
+        [("cat", ohe, categorical_cols),
+         ("num", StandardScaler(), numeric_cols)],
+        remainder="drop"
+    )
 
 # ---------- 7) Pipeline + (optional) SMOTE ----------
-use_smote = False
-try:
-    from imblearn.over_sampling import SMOTE
-    from imblearn.pipeline import Pipeline as ImbPipeline
-    smote = SMOTE(random_state=42)
-    use_smote = True
-    print("🔄 จะใช้ SMOTE ระหว่างฝึก (พบ imbalanced-learn)")
-except Exception:
-    smote = None
-    print("ℹ️ ไม่พบ imbalanced-learn → ข้าม SMOTE")
-
-rf = RandomForestClassifier(
-    random_state=42, class_weight="balanced", n_jobs=-1
-)
-
-if use_smote:
-    train_pipe = ImbPipeline([("prep", preprocessor), ("smote", smote), ("model", rf)])
-else:
-    train_pipe = SkPipeline([("prep", preprocessor), ("model", rf)])
+def make_train_pipe(preprocessor, seed: int = 42, legacy: bool = False, cache_dir=None):
+    use_smote = False
+    try:
+        from imblearn.over_sampling import SMOTE
+        from imblearn.pipeline import Pipeline as ImbPipeline
+        smote = SMOTE(random_state=seed)
+        use_smote = True
+        print("🔄 จะใช้ SMOTE ระหว่างฝึก (พบ imbalanced-learn)")
+    except Exception:
+        smote = None
+        print("ℹ️ ไม่พบ imbalanced-learn → ข้าม SMOTE")
+
+    # ขนานชั้นเดียว: ป่าข้างในใช้ n_jobs=1 ส่วนการค้นหาขนานตาม fold (legacy = n_jobs=-1 ซ้อนกันแบบเดิม)
+    rf = RandomForestClassifier(
+        random_state=seed, class_weight="balanced", n_jobs=-1 if legacy else 1
+    )
+    # memory= cache ของ prep ที่ fit แล้ว ใช้ซ้ำข้าม candidate ใน fold เดียวกัน
+    memory = None if legacy else cache_dir
+    if use_smote:
+        return ImbPipeline([("prep", preprocessor), ("smote", smote), ("model", rf)], memory=memory), use_smote
+    return SkPipeline([("prep", preprocessor), ("model", rf)], memory=memory), use_smote
 
 # ---------- 8) RandomizedSearch + CV ----------
+# search="random": ทีละ candidate + checkpoint (.jsonl) ต่อได้ | "halving": successive halving | "legacy": แบบเดิม
 param_dist = {
     "model__n_estimators": [150, 250, 400, 600],
     "model__max_depth": [None, 8, 12, 20],
@@ -110,161 +113,348 @@ param_dist = {
     "model__min_samples_leaf": [1, 2, 4],
     "model__max_features": ["sqrt", "log2", None],
 }
-cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
-search = RandomizedSearchCV(
-    estimator=train_pipe, param_distributions=param_dist,
-    n_iter=12, scoring="f1_macro", cv=cv, n_jobs=-1, random_state=42, verbose=1
-)
-search.fit(X_train, y_train)
-print(f"\n🏆 Best CV F1_macro: {search.best_score_:.4f}")
-print("🔧 Best params:", search.best_params_)
-
-best_model = search.best_estimator_
 
-# ---------- 9) Inference model (ตัด SMOTE ตอนทำนาย) ----------
-if "smote" in best_model.named_steps:
+def _param_key(params, X, use_smote):
+    # รวมขนาดข้อมูล/SMOTE ไว้ใน key → checkpoint ของข้อมูลชุดอื่นจะไม่ถูกนำมาใช้ผิด ๆ
+    return json.dumps({"params": params, "data": list(X.shape), "smote": use_smote}, sort_keys=True, default=str)
+
+def resumable_search(pipe, X, y, cv, n_iter, n_jobs, seed, checkpoint: Path, use_smote):
+    """RandomizedSearch ทีละ candidate: CV ของแต่ละตัวขนานตาม fold แล้ว append ผลลง checkpoint ทันที"""
+    done = {}
+    if checkpoint.exists():
+        for line in checkpoint.read_text(encoding="utf-8").splitlines():
+            if line.strip():
+                r = json.loads(line)
+                done[r["key"]] = r
+        print(f"↩️ โหลด checkpoint: {len(done)} candidate เสร็จแล้ว ({checkpoint})")
+    results = []
+    for i, params in enumerate(ParameterSampler(param_dist, n_iter=n_iter, random_state=seed), 1):
+        key = _param_key(params, X, use_smote)
+        if key in done:
+            results.append(done[key]); continue
+        t0 = time.perf_counter()
+        scores = cross_val_score(clone(pipe).set_params(**params), X, y, cv=cv, scoring="f1_macro", n_jobs=n_jobs)
+        r = {"key": key, "params": params, "mean": float(scores.mean()), "std": float(scores.std()),
+             "seconds": time.perf_counter() - t0}
+        checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        with checkpoint.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(r, default=str) + "\n")
+        print(f"   [{i}/{n_iter}] F1_macro={r['mean']:.4f}±{r['std']:.4f} ({r['seconds']:.1f}s) {params}")
+        results.append(r)
+    best = max(results, key=lambda r: r["mean"])
+    best_model = clone(pipe).set_params(**best["params"]).fit(X, y)
+    return best_model, best["params"], best["mean"]
+
+def search_best(train_pipe, X_train, y_train, use_smote, mode="random", n_iter=12, n_jobs=-1, seed=42,
+                checkpoint: Path = Path("search_checkpoint.jsonl")):
+    cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=seed)
+    t_search = time.perf_counter()
+    if mode == "random":
+        best_model, best_params, best_score = resumable_search(
+            train_pipe, X_train, y_train, cv, n_iter, n_jobs, seed, checkpoint, use_smote)
+    else:
+        if mode == "halving":
+            from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+            from sklearn.model_selection import HalvingRandomSearchCV
+            search = HalvingRandomSearchCV(
+                estimator=train_pipe, param_distributions=param_dist, n_candidates=n_iter, factor=3,
+                scoring="f1_macro", cv=cv, n_jobs=n_jobs, random_state=seed, verbose=1
+            )
+        elif mode == "legacy":
+            search = RandomizedSearchCV(
+                estimator=train_pipe, param_distributions=param_dist,
+                n_iter=n_iter, scoring="f1_macro", cv=cv, n_jobs=-1, random_state=seed, verbose=1
+            )
+        else:
+            raise ValueError(f"search ไม่รู้จัก: {mode!r} (ใช้ random / halving / legacy)")
+        search.fit(X_train, y_train)
+        best_model, best_params, best_score = search.best_estimator_, search.best_params_, search.best_score_
+    print(f"\n⏱️ Search wall-clock ({mode}): {time.perf_counter() - t_search:.1f}s")
+    print(f"🏆 Best CV F1_macro: {best_score:.4f}")
+    print("🔧 Best params:", best_params)
+    return best_model
+
+# ---------- 9) Inference model (ตัด SMOTE + memory cache ตอนทำนาย) ----------
+def to_inference_model(best_model):
     prep_fitted  = best_model.named_steps["prep"]
     model_fitted = best_model.named_steps["model"]
-    inference_model = SkPipeline([("prep", prep_fitted), ("model", model_fitted)])
-else:
-    inference_model = best_model
+    return SkPipeline([("prep", prep_fitted), ("model", model_fitted)])
 
-# ---------- 10) ทำนายพื้นฐาน ----------
-y_pred_num = inference_model.predict(X_test)
-y_pred_lbl = le.inverse_transform(y_pred_num)
-y_test_lbl = le.inverse_transform(y_test)
+# ---------- 10) ทำนายพื้นฐาน (predict_proba ครั้งเดียว ใช้ทั้งรายงานนี้และข้อ 11) ----------
+def basic_report(inference_model, le, X_test, y_test):
+    proba = aligned_proba(inference_model, X_test, len(le.classes_))
+    y_pred_lbl = le.classes_[proba.argmax(axis=1)]
+    y_test_lbl = le.inverse_transform(y_test)
 
-print("\n📈 Test Accuracy :", round(accuracy_score(y_test_lbl, y_pred_lbl), 4))
-print("🎯 Test F1_macro :", round(f1_score(y_test_lbl, y_pred_lbl, average='macro'), 4))
-print("\n📋 Classification report:\n", classification_report(y_test_lbl, y_pred_lbl, target_names=le.classes_))
-print("🧩 Confusion Matrix (เลขดิบ):\n", confusion_matrix(y_test_lbl, y_pred_lbl, labels=le.classes_))
+    print("\n📈 Test Accuracy :", round(accuracy_score(y_test_lbl, y_pred_lbl), 4))
+    print("🎯 Test F1_macro :", round(f1_score(y_test_lbl, y_pred_lbl, average='macro'), 4))
+    print("\n📋 Classification report:\n", classification_report(y_test_lbl, y_pred_lbl, target_names=le.classes_))
+    print("🧩 Confusion Matrix (เลขดิบ):\n", confusion_matrix(y_test_lbl, y_pred_lbl, labels=le.classes_))
+    return y_test_lbl, proba
 
 # ---------- 11) WEKA-style Summary (ครบทุกหัวข้อที่ขอ) ----------
-def weka_like_summary(y_test_lbl, y_pred_lbl, X_test, le, inference_model,
-                      title="WEKA-STYLE EVALUATION", save_dir="eval_output_rf"):
-    os.makedirs(save_dir, exist_ok=True)
-    txt_path = Path(save_dir, "summary.txt")
-    percls_csv = Path(save_dir, "detailed_accuracy_by_class.csv")
-    cm_csv = Path(save_dir, "confusion_matrix.csv")
-
-    # Align index + ignore class unknown instances
-    y_true_s = pd.Series(y_test_lbl, index=X_test.index)
-    y_pred_s = pd.Series(y_pred_lbl, index=X_test.index)
-    mask = y_true_s.notna() & y_true_s.isin(le.classes_)  # ignore unknown
-    y_true = y_true_s.loc[mask].values
-    y_pred = y_pred_s.loc[mask].values
-    X_eval = X_test.loc[mask]
-    if len(y_true) == 0:
-        raise ValueError("ไม่มี instance สำหรับประเมินหลัง ignore class unknown instances")
-
-    classes = list(le.classes_)
-    lines = []
-    add = lines.append
-    add(f"\n========== {title} ==========\n")
-    add(f"Total number of instances (after ignore): {len(y_true)}")
-
-    # 1) Detailed accuracy by class
-    prec, rec, f1, support = precision_recall_fscore_support(
-        y_true, y_pred, labels=classes, zero_division=0
-    )
-    per_class_df = pd.DataFrame({
-        "Class": classes, "Precision": prec, "Recall": rec, "F1-Score": f1, "Support": support.astype(int)
-    })
-    add("\n📊 Detailed Accuracy By Class")
-    add(per_class_df.to_string(index=False))
-
-    # 2) Confusion matrix
-    cm = confusion_matrix(y_true, y_pred, labels=classes)
-    cm_df = pd.DataFrame(cm, index=[f"true_{c}" for c in classes],
-                            columns=[f"pred_{c}" for c in classes])
-    add("\n🧩 Confusion Matrix (rows=true, cols=predicted)")
-    add(cm_df.to_string())
-
-    # 3) Correct/Incorrect/Total
-    correct = int((y_true == y_pred).sum())
-    total   = int(len(y_true))
-    incorrect = total - correct
-    acc_simple = correct / total if total > 0 else float("nan")
-    add(f"\n✅ Correctly classified instances:   {correct} / {total}  ({acc_simple*100:.2f}%)")
-    add(f"❌ Incorrectly classified instances: {incorrect} / {total}  ({(1-acc_simple)*100:.2f}%)")
-    add(f"📦 Total number of instances:        {total}")
-    add("🔎 (ignore class unknown instances เปิดใช้งานแล้ว)")
-
-    # 4) Kappa
-    y_true_num = le.transform(y_true)
-    y_pred_num = le.transform(y_pred)
-    kappa = cohen_kappa_score(y_true_num, y_pred_num)
-    add(f"\n🤝 Kappa statistic: {kappa:.6f}")
-
-    # 5) MAE/RMSE (probability-based)
-    proba = inference_model.predict_proba(X_eval)  # [N, n_classes]
-    cls_to_idx = {c:i for i,c in enumerate(classes)}
-    y_true_idx = np.array([cls_to_idx[c] for c in y_true])
-    y_onehot = np.eye(len(classes))[y_true_idx]
-    abs_err = np.abs(y_onehot - proba).sum(axis=1) / 2.0
-    mae = abs_err.mean()
-    sq_err = ((y_onehot - proba) ** 2).sum(axis=1) / 2.0
-    rmse = np.sqrt(sq_err.mean())
-    add(f"\n📐 Mean absolute error (MAE): {mae:.6f}")
-    add(f"📐 Root mean squared error (RMSE): {rmse:.6f}")
-
-    # 6) RAE/RRSE เทียบ baseline (prior distribution)
-    prior_counts = pd.Series(y_true).value_counts().reindex(classes, fill_value=0).values
-    prior_dist = prior_counts / prior_counts.sum()
-    abs_err_base = np.abs(y_onehot - prior_dist).sum(axis=1) / 2.0
-    mae_base = abs_err_base.mean()
-    sq_err_base = ((y_onehot - prior_dist) ** 2).sum(axis=1) / 2.0
-    rmse_base = np.sqrt(sq_err_base.mean())
-    rae  = (mae / mae_base) * 100.0 if mae_base > 0 else float("inf")
-    rrse = (rmse / rmse_base) * 100.0 if rmse_base > 0 else float("inf")
-    add(f"📏 Relative absolute error (RAE): {rae:.2f}%")
-    add(f"📏 Root relative squared error (RRSE): {rrse:.2f}%")
-
-    # print ครบ
-    print("\n".join(lines))
-    # save รายงาน/ตาราง
-    with open(txt_path, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
-    per_class_df.to_csv(percls_csv, index=False, encoding="utf-8-sig")
-    cm_df.to_csv(cm_csv, encoding="utf-8-sig")
-    print(f"\n💾 Saved report: {txt_path}")
-    print(f"💾 Saved per-class metrics: {percls_csv}")
-    print(f"💾 Saved confusion matrix: {cm_csv}")
-
-    return {
-        "per_class": per_class_df, "confusion_matrix": cm_df,
-        "correct": correct, "incorrect": incorrect, "total": total,
-        "kappa": kappa, "mae": mae, "rmse": rmse, "rae_pct": rae, "rrse_pct": rrse
-    }
-
-# เรียกสรุปผลแบบ WEKA‑style (ครบทั้งหมดที่ขอ)
-_ = weka_like_summary(
-    y_test_lbl=y_test_lbl,
-    y_pred_lbl=y_pred_lbl,
-    X_test=X_test,
-    le=le,
-    inference_model=inference_model,
-    title="WEKA-STYLE EVALUATION (Random Forest)"
-)
+# คำนวณจาก confusion matrix + ผลรวม error แบบสะสม (diet_eval.py) ไม่ต้องทำนายซ้ำหรือสร้าง one-hot
+def weka_like_summary(y_test_lbl, proba, le, title="WEKA-STYLE EVALUATION", save_dir="eval_output_rf"):
+    acc = WekaAccumulator(le.classes_).update(label_index(le.classes_, y_test_lbl), proba)
+    return write_report(acc, title, save_dir)
 
 # ---------- 12) เซฟโมเดล + LabelEncoder ----------
-joblib.dump(inference_model, "diet_recommendation_rf_model.joblib")
-joblib.dump(le, "label_encoder.joblib")
-print("\n💾 Saved: diet_recommendation_rf_model.joblib, label_encoder.joblib")
+def save_artifacts(inference_model, le, out_dir: Path):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    joblib.dump(inference_model, out_dir / MODEL_FILE)
+    joblib.dump(le, out_dir / LE_FILE)
+    print(f"\n💾 Saved: {out_dir / MODEL_FILE}, {out_dir / LE_FILE}")
+
+def load_artifacts(model_dir: Path):
+    model_dir = Path(model_dir)
+    return joblib.load(model_dir / MODEL_FILE), joblib.load(model_dir / LE_FILE)
 
 # ---------- 13) ฟังก์ชันทำนาย 1 รายการ ----------
-def predict_one(sample_dict: dict):
-    sample_df = pd.DataFrame([sample_dict]).reindex(columns=X.columns)
+def predict_one(inference_model, le, sample_dict: dict, columns, numeric_cols, categorical_cols):
+    sample_df = pd.DataFrame([sample_dict]).reindex(columns=columns)
     for col in numeric_cols:
         sample_df[col] = pd.to_numeric(sample_df[col], errors="coerce")
     for col in categorical_cols:
         sample_df[col] = sample_df[col].astype(str)
-    pred_num = inference_model.predict(sample_df)[0]
-    pred_lbl = le.inverse_transform([pred_num])[0]
     proba = inference_model.predict_proba(sample_df)[0]
+    pred_lbl = le.inverse_transform([inference_model.classes_[proba.argmax()]])[0]
     return pred_lbl, dict(zip(le.classes_, map(float, proba)))
 
-# ---- Demo ----
-ex = X.iloc[0].to_dict()
-lbl, pro = predict_one(ex)
-print("\n🧪 Example prediction:", lbl, pro)
+# ---------- 14) บีบโมเดลสำหรับ serving (ต้นไม้น้อยลง / จำกัดความลึก / distill) ----------
+# ความแม่นยำอิ่มตัวก่อน 600 ต้นไม้ลึกไม่จำกัดนานแล้ว แต่ขนาดไฟล์/latency โตตามจำนวน node
+# ทุก variant วัดด้วย weka_like_summary บนชุดทดสอบเดียวกัน แล้วเลือกตัวที่เล็กที่สุดที่ F1_macro/kappa ตกไม่เกิน --max-drop
+# (ไฟล์เล็กสุด → node น้อยสุด → p50 ต่ำสุด; latency ต่อแถววัดแล้วแกว่งเกินกว่าจะใช้ตัดสินเป็นอันดับแรก)
+# (refit/distill ใช้ prep ที่ fit แล้วของตัวเต็ม และไม่ผ่าน SMOTE — class_weight="balanced" ยังอยู่)
+def subset_forest(inference_model, n_trees: int):
+    """n_trees ต้นแรกของป่าเดิม (ต้นไม้ของ RF สุ่มอิสระต่อกัน → ชุดย่อยใดก็เทียบเท่ากัน) ไม่ต้องฝึกใหม่"""
+    rf = copy.copy(inference_model.named_steps["model"])
+    rf.estimators_ = rf.estimators_[:n_trees]
+    rf.n_estimators = len(rf.estimators_)
+    return SkPipeline([("prep", inference_model.named_steps["prep"]), ("model", rf)])
+
+def refit_forest(inference_model, X, y, seed: int = 42, **params):
+    """ฝึกป่าใหม่ด้วย hyperparameter ของตัวเต็ม (ทับด้วย params เช่น max_depth) บน feature จาก prep เดิม"""
+    prep = inference_model.named_steps["prep"]
+    rf = clone(inference_model.named_steps["model"]).set_params(random_state=seed, n_jobs=-1, **params)
+    rf.fit(prep.transform(X), y)
+    return SkPipeline([("prep", prep), ("model", rf.set_params(n_jobs=1))])
+
+def augment(X: pd.DataFrame, n: int, seed: int = 42) -> pd.DataFrame:
+    """แถวสังเคราะห์สำหรับ distill: สุ่มแถวจริงแล้วเขย่าตัวเลข ±10% ของ std (หมวดหมู่คงเดิม)"""
+    rng = np.random.default_rng(seed)
+    out = X.iloc[rng.integers(0, len(X), n)].reset_index(drop=True)
+    for c in out.select_dtypes(include=[np.number]).columns:
+        out[c] = out[c] + rng.normal(0.0, 0.1 * (X[c].std() or 0.0), n)
+    return out
+
+def distill_forest(inference_model, X, n_trees: int, max_depth: int, n_synth: int, seed: int = 42):
+    """ป่าเล็กที่ฝึกให้เลียนแบบคำตอบของตัวเต็ม (teacher) บนข้อมูลฝึก + แถวสังเคราะห์"""
+    X_aug = pd.concat([X, augment(X, n_synth, seed)], ignore_index=True)
+    teacher = inference_model.named_steps["model"]
+    y_aug = teacher.classes_[inference_model.predict_proba(X_aug).argmax(axis=1)]
+    return refit_forest(inference_model, X_aug, y_aug, seed, n_estimators=n_trees, max_depth=max_depth)
+
+def measure_variant(name, model, le, X_test, y_test, save_dir: Path, n_latency: int = 200):
+    """weka_like_summary + ขนาดไฟล์ + latency (แถวเดียว p50 และทั้งชุดทดสอบ) ของ variant หนึ่ง"""
+    t0 = time.perf_counter()
+    proba = aligned_proba(model, X_test, len(le.classes_))
+    batch_s = time.perf_counter() - t0
+    rep = weka_like_summary(le.inverse_transform(y_test), proba, le,
+                            title=f"WEKA-STYLE EVALUATION (Random Forest, {name})", save_dir=Path(save_dir) / name)
+    one = X_test.iloc[[0]]
+    lat = []
+    for _ in range(n_latency):
+        t0 = time.perf_counter(); model.predict_proba(one); lat.append(time.perf_counter() - t0)
+    buf = io.BytesIO()
+    joblib.dump(model, buf)
+    trees = model.named_steps["model"].estimators_
+    return {
+        "variant": name, "trees": len(trees), "max_depth": max(t.get_depth() for t in trees),
+        "nodes": int(sum(t.tree_.node_count for t in trees)), "size_mb": round(buf.tell() / 1e6, 3),
+        "p50_ms": round(float(np.median(lat)) * 1000, 3), "rows_per_s": round(len(X_test) / batch_s, 1),
+        "accuracy": round(rep["correct"] / rep["total"], 4), "f1_macro": round(float(rep["per_class"]["F1-Score"].mean()), 4),
+        "kappa": round(float(rep["kappa"]), 4),
+    }
+
+def pick_variant(table: pd.DataFrame, max_drop: float):
+    """แถวของ variant ที่เล็กที่สุดที่ F1_macro/kappa ตกจากตัวเต็ม (แถวแรก) ไม่เกิน max_drop หรือ None"""
+    full = table.iloc[0]
+    ok = table[(full["f1_macro"] - table["f1_macro"] <= max_drop) & (full["kappa"] - table["kappa"] <= max_drop)
+               & (table["variant"] != full["variant"])]
+    if ok.empty:
+        return None
+    return ok.sort_values(["size_mb", "nodes", "p50_ms"], kind="stable").iloc[0]
+
+def compress_model(inference_model, le, X_train, y_train, X_test, y_test, out_dir: Path, trees=(25, 50, 100),
+                   depths=(10, 14), distill=None, distill_rows: int = 0, max_drop: float = 0.01, seed: int = 42):
+    """วัด tradeoff ของทุก variant เทียบตัวเต็ม → compression_tradeoff.csv แล้วเซฟตัวที่เลือกเป็น COMPACT_FILE"""
+    out_dir = Path(out_dir)
+    save_dir = out_dir / "eval_output_rf" / "compress"
+    n_full = len(inference_model.named_steps["model"].estimators_)
+    candidates = [("full", lambda: inference_model)]
+    candidates += [(f"subset-{k}", lambda k=k: subset_forest(inference_model, k)) for k in trees if k < n_full]
+    cap_trees = min(n_full, max(trees)) if trees else n_full
+    candidates += [(f"depth-{d}x{cap_trees}", lambda d=d: refit_forest(inference_model, X_train, y_train, seed,
+                                                                      n_estimators=cap_trees, max_depth=d))
+                   for d in depths]
+    if distill:
+        k, d = distill
+        candidates.append((f"distill-{d}x{k}", lambda: distill_forest(inference_model, X_train, k, d,
+                                                                    distill_rows or len(X_train), seed)))
+    rows, models = [], {}
+    for name, build in candidates:
+        t0 = time.perf_counter()
+        models[name] = build()
+        rows.append({**measure_variant(name, models[name], le, X_test, y_test, save_dir),
+                     "build_s": round(time.perf_counter() - t0, 1)})
+
+    table = pd.DataFrame(rows)
+    full = rows[0]
+    print("\n⚖️ Compression tradeoff (ชุดทดสอบเดียวกัน):")
+    print(table.to_string(index=False))
+    save_dir.mkdir(parents=True, exist_ok=True)
+    table.to_csv(save_dir / "compression_tradeoff.csv", index=False, encoding="utf-8-sig")
+    print(f"💾 Saved tradeoff: {save_dir / 'compression_tradeoff.csv'}")
+    best = pick_variant(table, max_drop)
+    if best is None:
+        print(f"⚠️ ไม่มี variant ที่ F1_macro/kappa ตกไม่เกิน {max_drop} → ไม่เซฟ {COMPACT_FILE}")
+        return None
+    joblib.dump(models[best["variant"]], out_dir / COMPACT_FILE)
+    print(f"✅ เลือก {best['variant']}: {best['size_mb']} MB / {best['p50_ms']} ms "
+          f"(ตัวเต็ม {full['size_mb']} MB / {full['p50_ms']} ms), F1_macro {best['f1_macro']} vs {full['f1_macro']}")
+    print(f"💾 Saved: {out_dir / COMPACT_FILE}")
+    return best.to_dict()
+
+# ---------- CLI ----------
+def cmd_train(args):
+    X, y_text = load_data(args.data)
+    le = LabelEncoder()
+    y = le.fit_transform(y_text)
+    categorical_cols, numeric_cols = column_types(X)
+    print("🔖 Target mapping:", {cls: int(i) for i, cls in enumerate(le.classes_)})
+
+    X_train, X_test, y_train, y_test = split(X, y, args.seed, args.test_size)
+    train_pipe, use_smote = make_train_pipe(make_preprocessor(categorical_cols, numeric_cols), args.seed,
+                                            legacy=args.search == "legacy", cache_dir=args.cache_dir)
+    checkpoint = Path(args.checkpoint or Path(args.out_dir) / "search_checkpoint.jsonl")
+    if not args.resume and checkpoint.exists():
+        checkpoint.unlink()
+        print(f"🗑️ --no-resume: ลบ checkpoint เดิม ({checkpoint})")
+    best_model = search_best(train_pipe, X_train, y_train, use_smote, args.search, args.n_iter, args.n_jobs,
+                             args.seed, checkpoint)
+    inference_model = to_inference_model(best_model)
+
+    y_test_lbl, proba = basic_report(inference_model, le, X_test, y_test)
+    if not args.no_eval:
+        weka_like_summary(y_test_lbl, proba, le, title="WEKA-STYLE EVALUATION (Random Forest)",
+                          save_dir=Path(args.out_dir) / "eval_output_rf")
+    save_artifacts(inference_model, le, args.out_dir)
+    if args.compress:
+        compress_model(inference_model, le, X_train, y_train, X_test, y_test, args.out_dir, args.trees,
+                       args.depths, args.distill, args.distill_rows, args.max_drop, args.seed)
+
+    # ---- Demo ----
+    lbl, pro = predict_one(inference_model, le, X.iloc[0].to_dict(), X.columns, numeric_cols, categorical_cols)
+    print("\n🧪 Example prediction:", lbl, pro)
+
+def cmd_evaluate(args):
+    inference_model, le = load_artifacts(args.model_dir)
+    save_dir = Path(args.out_dir or Path(args.model_dir) / "eval_output_rf")
+    title = "WEKA-STYLE EVALUATION (Random Forest)"
+    if args.holdout:
+        if not args.data:
+            raise SystemExit("--holdout ต้องระบุ --data")
+        # ทั้งไฟล์คือชุดทดสอบ → อ่าน/ทำนาย/สะสมทีละ chunk, หน่วยความจำไม่โตตามจำนวนแถว
+        def chunks():
+            for df in iter_dataset(args.data, args.chunksize):
+                yield split_target(df)
+        write_report(evaluate_chunks(inference_model, le, chunks()), title, save_dir)
+        return
+    # ใช้ seed/test_size เดียวกับตอน train → ได้ test split ชุดเดิม
+    X, y_text = load_data(args.data)
+    _, X_test, _, y_test = split(X, le.transform(y_text), args.seed, args.test_size)
+    y_test_lbl, proba = basic_report(inference_model, le, X_test, y_test)
+    weka_like_summary(y_test_lbl, proba, le, title=title, save_dir=save_dir)
+
+def cmd_compress(args):
+    inference_model, le = load_artifacts(args.model_dir)
+    X, y_text = load_data(args.data)
+    X_train, X_test, y_train, y_test = split(X, le.transform(y_text), args.seed, args.test_size)
+    compress_model(inference_model, le, X_train, y_train, X_test, y_test, args.model_dir, args.trees,
+                   args.depths, args.distill, args.distill_rows, args.max_drop, args.seed)
+
+def cmd_export(args):
+    model_dir = Path(args.model_dir)
+    if args.flat:
+        from diet_forest import compile_pipeline
+        compile_pipeline(load_artifacts(model_dir)[0]).forest.save(model_dir / "forest")
+        print(f"💾 Saved: {model_dir / 'forest'}/ (.npy, ใช้กับ DIET_FLAT_FOREST + DIET_MODEL_MMAP=1)")
+    if args.registry:
+        from diet_registry import ModelRegistry
+        version = args.version or time.strftime("%Y%m%d-%H%M%S")
+        d = ModelRegistry(args.registry).publish(version, model_dir / MODEL_FILE, model_dir / LE_FILE, args.activate)
+        if (model_dir / COMPACT_FILE).exists():
+            shutil.copy2(model_dir / COMPACT_FILE, d / COMPACT_FILE)
+        print(f"💾 Published: {d}" + (" (active)" if args.activate else ""))
+
+def add_compress_args(p):
+    p.add_argument("--trees", type=int, nargs="*", default=[25, 50, 100], help="tree-subset sizes")
+    p.add_argument("--depths", type=int, nargs="*", default=[10, 14], help="depth caps (refit with max(--trees) trees)")
+    p.add_argument("--distill", type=lambda v: tuple(int(x) for x in v.split(":")), metavar="TREES:DEPTH",
+                   help="also distill the full model into a TREES x DEPTH forest")
+    p.add_argument("--distill-rows", type=int, default=0, help="synthetic rows for distillation (default: len(train))")
+    p.add_argument("--max-drop", type=float, default=0.01, help="max F1_macro/kappa drop allowed vs the full model")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Booming Diet random forest: train / evaluate / export")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    t = sub.add_parser("train", help="search hyperparameters, fit, evaluate and save artifacts")
+    t.add_argument("--data", type=Path, help="dataset .csv / .parquet / .arrow (default: auto-discover CSV)")
+    t.add_argument("--out-dir", type=Path, default=Path("."))
+    t.add_argument("--seed", type=int, default=42)
+    t.add_argument("--test-size", type=float, default=0.30)
+    t.add_argument("--n-iter", type=int, default=int(os.getenv("TRAIN_N_ITER", "12")), help="search budget (candidates)")
+    t.add_argument("--n-jobs", type=int, default=int(os.getenv("TRAIN_N_JOBS", "-1")))
+    t.add_argument("--search", choices=["random", "halving", "legacy"], default=os.getenv("TRAIN_SEARCH", "random"))
+    t.add_argument("--cache-dir", default=os.getenv("TRAIN_CACHE_DIR", "train_cache"))
+    t.add_argument("--checkpoint", type=Path, default=os.getenv("TRAIN_CHECKPOINT"))
+    t.add_argument("--resume", action=argparse.BooleanOptionalAction, default=True,
+                   help="reuse finished candidates from the checkpoint (--search random); --no-resume starts over")
+    t.add_argument("--no-eval", action="store_true", help="skip the WEKA-style summary")
+    t.add_argument("--compress", action="store_true", help="also build and pick a compact serving variant")
+    add_compress_args(t)
+    t.set_defaults(func=cmd_train)
+
+    e = sub.add_parser("evaluate", help="WEKA-style evaluation of saved artifacts on the held-out split")
+    e.add_argument("--data", type=Path)
+    e.add_argument("--model-dir", type=Path, default=Path("."))
+    e.add_argument("--out-dir", type=Path)
+    e.add_argument("--seed", type=int, default=42)
+    e.add_argument("--test-size", type=float, default=0.30)
+    e.add_argument("--holdout", action="store_true", help="--data is a held-out set: evaluate every row, streamed in chunks")
+    e.add_argument("--chunksize", type=int, default=100_000)
+    e.set_defaults(func=cmd_evaluate)
+
+    c = sub.add_parser("compress", help="size/latency vs accuracy tradeoff of smaller forests; saves the chosen one")
+    c.add_argument("--data", type=Path)
+    c.add_argument("--model-dir", type=Path, default=Path("."))
+    c.add_argument("--seed", type=int, default=42)
+    c.add_argument("--test-size", type=float, default=0.30)
+    add_compress_args(c)
+    c.set_defaults(func=cmd_compress)
+
+    x = sub.add_parser("export", help="publish artifacts to a model registry and/or serving formats")
+    x.add_argument("--model-dir", type=Path, default=Path("."))
+    x.add_argument("--registry", type=Path, help="registry root (see diet_registry.py)")
+    x.add_argument("--version", help="registry version name (default: timestamp)")
+    x.add_argument("--activate", action="store_true")
+    x.add_argument("--flat", action="store_true", help="also write forest/ (.npy arrays) for DIET_ENGINE=flat")
+    x.set_defaults(func=cmd_export)
+
+    args = ap.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# ==== diet_registry.py ====
+# ทะเบียนโมเดลแบบมีเวอร์ชัน: แต่ละเวอร์ชันคือโฟลเดอร์ที่มี model + label encoder + schema ของ feature
+#   <root>/<version>/diet_recommendation_rf_model.joblib
+#   <root>/<version>/label_encoder.joblib
+#   <root>/<version>/schema.json
+#   <root>/ACTIVE                      ชื่อเวอร์ชันที่ API ใช้อยู่ (เขียนทับแบบ atomic)
+#   python diet_registry.py publish --root models --version 2025-10-01 --model m.joblib --le le.joblib --activate
+#   python diet_registry.py activate --root models --version 2025-10-01
+import argparse, json, os, shutil, time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+MODEL_FILE = "diet_recommendation_rf_model.joblib"
+LE_FILE = "label_encoder.joblib"
+SCHEMA_FILE = "schema.json"
+
+class ModelRegistry:
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def versions(self) -> List[str]:
+        if not self.root.exists(): return []
+        return sorted(p.name for p in self.root.iterdir() if (p / MODEL_FILE).exists() and (p / LE_FILE).exists())
+
+    def active(self) -> Optional[str]:
+        try:
+            v = (self.root / "ACTIVE").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        return v or None
+
+    def paths(self, version: str) -> Tuple[Path, Path]:
+        d = self.root / version
+        if not (d / MODEL_FILE).exists() or not (d / LE_FILE).exists():
+            raise KeyError(f"ไม่พบโมเดลเวอร์ชัน {version!r} ใน {self.root}")
+        return d / MODEL_FILE, d / LE_FILE
+
+    def schema(self, version: str) -> Dict:
+        p = self.root / version / SCHEMA_FILE
+        return json.loads(p.read_text(encoding="utf-8")) if p.exists() else {}
+
+    def activate(self, version: str):
+        self.paths(version)   # ตรวจว่ามีอยู่จริงก่อน
+        tmp = self.root / "ACTIVE.tmp"
+        tmp.write_text(version + "\n", encoding="utf-8")
+        os.replace(tmp, self.root / "ACTIVE")
+
+    def publish(self, version: str, model_path: Path, le_path: Path, activate: bool = False) -> Path:
+        """คัดลอก artifact คู่ (model + encoder) เข้าทะเบียนพร้อม schema.json; โฟลเดอร์เวอร์ชันห้ามซ้ำ"""
+        import joblib
+        from diet_loader import model_schema
+        d = self.root / version
+        if d.exists():
+            raise FileExistsError(f"มีเวอร์ชัน {version!r} อยู่แล้ว")
+        staging = self.root / f".{version}.staging"
+        shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True)
+        shutil.copy2(model_path, staging / MODEL_FILE)
+        shutil.copy2(le_path, staging / LE_FILE)
+        expected_cols, cat_cols, num_cols = model_schema(joblib.load(model_path))
+        le = joblib.load(le_path)
+        (staging / SCHEMA_FILE).write_text(json.dumps({
+            "version": version, "created": int(time.time()),
+            "expected_columns": expected_cols, "cat_cols": cat_cols, "num_cols": num_cols,
+            "classes": [str(c) for c in le.classes_],
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        os.replace(staging, d)
+        if activate:
+            self.activate(version)
+        return d
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="versioned model registry")
+    ap.add_argument("--root", type=Path, default=Path("models"))
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("publish")
+    p.add_argument("--version", required=True)
+    p.add_argument("--model", type=Path, required=True)
+    p.add_argument("--le", type=Path, required=True)
+    p.add_argument("--activate", action="store_true")
+    a = sub.add_parser("activate")
+    a.add_argument("--version", required=True)
+    sub.add_parser("list")
+    args = ap.parse_args()
+
+    reg = ModelRegistry(args.root)
+    if args.cmd == "publish":
+        print(f"💾 Published: {reg.publish(args.version, args.model, args.le, args.activate)}")
+    elif args.cmd == "activate":
+        reg.activate(args.version)
+        print(f"✅ Active version: {args.version}")
+    else:
+        active = reg.active()
+        for v in reg.versions():
+            print(("* " if v == active else "  ") + v)
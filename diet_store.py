@@ -0,0 +1,446 @@
+# ==== diet_store.py ====
+# ที่เก็บ users / sessions แบบเปลี่ยน backend ได้ (CSV + index ในหน่วยความจำ หรือ SQLite)
+#   python diet_store.py migrate --users users.csv --sessions sessions.csv --db booming.db
+import csv, io, os, queue, sqlite3, threading, time, uuid, argparse
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+
+try:
+    import fcntl   # lock ข้าม process (POSIX); Windows ไม่มี → กันได้เฉพาะภายใน process เดียว
+except ImportError:
+    fcntl = None
+
+USER_FIELDS = [
+    "phone", "firstName", "lastName", "email", "address",
+    "dob_day", "dob_month", "dob_year", "agree", "marketingOptIn", "createdAt"
+]
+SESSION_FIELDS = ["token", "phone", "createdAt"]
+
+def ensure_csv(path: Path, headers: List[str]):
+    if not path.exists():
+        path.write_text(",".join(headers) + "\n", encoding="utf-8")
+
+def _iter_csv(path: Path):
+    if not path.exists(): return
+    with path.open("r", newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+# ------------------------------- CSV + hash index
+class _CsvFile:
+    """ไฟล์ CSV หนึ่งไฟล์ + index ตาม key + ตำแหน่งที่อ่านถึงแล้ว (offset)
+    process อื่น (uvicorn --workers N) append ต่อท้ายได้ → อ่านเฉพาะส่วนท้ายที่เพิ่มมาเมื่อจำเป็น
+    ทุกการเขียน/อ่านส่วนท้ายทำภายใต้ flock ของไฟล์ <ชื่อ>.lock (ข้าม process) + threading.Lock (ใน process)"""
+
+    def __init__(self, path: Path, fields: List[str], key: str, unique: bool):
+        self.path, self.fields, self.key, self.unique = Path(path), fields, key, unique
+        self.index: Dict[str, Dict[str, str]] = {}
+        self.offset = 0
+        self.inode = None
+        self.lock = threading.Lock()
+        self._lock_fd = None
+
+    @contextmanager
+    def locked(self, exclusive: bool = True):
+        with self.lock:
+            if fcntl is None:
+                yield; return
+            if self._lock_fd is None:
+                self._lock_fd = os.open(str(self.path) + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+
+    def changed(self) -> bool:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return self.offset != 0
+        return st.st_ino != self.inode or st.st_size != self.offset
+
+    def refresh(self):
+        """(ต้องถือ lock) อ่านแถวที่ต่อท้ายมาหลังครั้งก่อน; ไฟล์ถูกแทนที่ (compaction) หรือหดลง → อ่านใหม่ทั้งไฟล์"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.index, self.offset, self.inode = {}, 0, None
+            return
+        if st.st_ino != self.inode or st.st_size < self.offset or self.offset == 0:
+            index = {}
+            for row in _iter_csv(self.path):
+                index.setdefault(row.get(self.key), row)   # เหมือนเดิม: แถวแรกที่เจอชนะ
+            self.index, self.offset, self.inode = index, st.st_size, st.st_ino
+            return
+        if st.st_size == self.offset: return
+        with self.path.open("rb") as f:
+            f.seek(self.offset)
+            tail = f.read(st.st_size - self.offset)
+        for row in csv.DictReader(io.StringIO(tail.decode("utf-8"), newline=""), fieldnames=self.fields):
+            self.index.setdefault(row.get(self.key), row)
+        self.offset = st.st_size
+
+    def append(self, rows: List[Dict[str, Any]], fsync: bool):
+        """(ต้องถือ lock แบบ exclusive) เขียนทุกแถวของ batch ด้วย write ครั้งเดียว + fsync ครั้งเดียว"""
+        buf = io.StringIO()
+        if not self.path.exists() or os.path.getsize(self.path) == 0:
+            buf.write(",".join(self.fields) + "\n")
+        w = csv.DictWriter(buf, fieldnames=self.fields, extrasaction="ignore")
+        w.writerows(rows)
+        data = buf.getvalue().encode("utf-8")
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            if fsync: os.fsync(fd)
+            st = os.fstat(fd)
+        finally:
+            os.close(fd)
+        for row in rows:
+            self.index.setdefault(str(row[self.key]), {k: str(row.get(k, "")) for k in self.fields})
+        self.offset, self.inode = st.st_size, st.st_ino
+
+class GroupWriter:
+    """writer thread เดียวต่อ process: request ที่เข้ามาพร้อมกันรอคิวระหว่าง fsync รอบก่อน
+    แล้วถูกเขียนเป็น batch เดียว (group commit) — fsync หนึ่งครั้งต่อ batch แทนหนึ่งครั้งต่อแถว"""
+
+    def __init__(self, fsync: bool = True, max_batch: int = 256, max_wait_ms: float = 0.0):
+        self.fsync = fsync
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.counters = {"commits": 0, "rows": 0, "rejected": 0}
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, target: _CsvFile, row: Dict[str, Any]) -> bool:
+        """บล็อกจนแถวถูกเขียน (+fsync) แล้ว; False = key ซ้ำ (มีอยู่แล้วในไฟล์ หรือซ้ำใน batch เดียวกัน)
+        หลัง close() (เช่น register ที่เข้ามาระหว่าง shutdown) เขียนเองใน thread ที่เรียก ไม่รอ writer ที่หยุดไปแล้ว"""
+        fut: Future = Future()
+        with self._start_lock:
+            queued = not self._closed
+            if queued:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="csv-writer", daemon=True)
+                    self._thread.start()
+                self._queue.put((target, row, fut))
+        if not queued:
+            self._commit(target, [(target, row, fut)])
+        return fut.result()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None: return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._queue.get(timeout=max(0.0, deadline - time.monotonic())) if self.max_wait \
+                        else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._queue.put(None); break
+                batch.append(nxt)
+            by_target: Dict[int, list] = {}
+            for it in batch:
+                by_target.setdefault(id(it[0]), []).append(it)
+            for items in by_target.values():
+                self._commit(items[0][0], items)
+
+    def _commit(self, target: _CsvFile, items):
+        try:
+            accepted, results, seen = [], [], set()
+            with target.locked(exclusive=True):
+                target.refresh()   # เห็นแถวที่ process อื่นเขียนไว้ก่อนตัดสินเรื่องความซ้ำ
+                for _, row, _ in items:
+                    k = str(row[target.key])
+                    ok = not (target.unique and (k in target.index or k in seen))
+                    if ok:
+                        accepted.append(row); seen.add(k)
+                    results.append(ok)
+                if accepted:
+                    target.append(accepted, self.fsync)
+            self.counters["commits"] += 1
+            self.counters["rows"] += len(accepted)
+            self.counters["rejected"] += len(items) - len(accepted)
+            for (_, _, fut), ok in zip(items, results):
+                fut.set_result(ok)
+        except Exception as e:
+            for _, _, fut in items:
+                if not fut.done(): fut.set_exception(e)
+
+    def close(self):
+        # ปิดรับคิวภายใต้ lock เดียวกับ submit → ไม่มีแถวไหนเข้าคิวหลัง sentinel (แถวที่เข้าก่อนถูก commit ครบ)
+        with self._start_lock:
+            self._closed = True
+            if self._thread is not None:
+                self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+class CsvStore:
+    """อ่าน CSV ครั้งเดียวตอนเริ่ม แล้วเก็บ dict ตาม phone / token; การเขียนทั้งหมดผ่าน GroupWriter
+    หลาย worker ใช้ไฟล์ชุดเดียวกันได้: phone ถูกตรวจซ้ำภายใต้ lock ข้าม process และ lookup ที่ไม่เจอจะอ่านส่วนท้ายไฟล์ก่อนตอบว่าไม่มี"""
+
+    def __init__(self, users_csv: Path, sessions_csv: Path, fsync: bool = True, max_batch: int = 256,
+                 max_wait_ms: float = 0.0):
+        self.users = _CsvFile(users_csv, USER_FIELDS, "phone", unique=True)
+        self.sessions = _CsvFile(sessions_csv, SESSION_FIELDS, "token", unique=False)
+        self.users_csv, self.sessions_csv = self.users.path, self.sessions.path
+        self.writer = GroupWriter(fsync, max_batch, max_wait_ms)
+        self.load()
+
+    def load(self):
+        for f in (self.users, self.sessions):
+            with f.locked(exclusive=False):
+                f.offset = 0
+                f.refresh()
+
+    def _get(self, f: _CsvFile, key: str) -> Optional[Dict[str, str]]:
+        row = f.index.get(key)
+        if row is None and f.changed():
+            with f.locked(exclusive=False):
+                f.refresh()
+            row = f.index.get(key)
+        return row
+
+    def get_user(self, phone: str) -> Optional[Dict[str, str]]:
+        return self._get(self.users, phone)
+
+    def add_user(self, row: Dict[str, Any]) -> bool:
+        """False = phone นี้ลงทะเบียนไว้แล้ว (ตรวจภายใต้ lock เดียวกับการเขียน จึงไม่มี race ระหว่าง check กับ append)"""
+        return self.writer.submit(self.users, row)
+
+    def add_session(self, row: Dict[str, Any]):
+        self.writer.submit(self.sessions, row)
+
+    def get_session(self, token: str) -> Optional[Dict[str, str]]:
+        return self._get(self.sessions, token)
+
+    def compact_sessions(self, cutoff: int) -> int:
+        """เขียน sessions.csv ใหม่โดยตัดแถวที่ createdAt < cutoff (แทนที่ไฟล์แบบ atomic)"""
+        f = self.sessions
+        with f.locked(exclusive=True):
+            f.refresh()
+            keep = {t: r for t, r in f.index.items() if _ts(r) >= cutoff}
+            removed = len(f.index) - len(keep)
+            if removed:
+                tmp = f.path.with_suffix(".csv.tmp")
+                with tmp.open("w", newline="", encoding="utf-8") as out:
+                    w = csv.DictWriter(out, fieldnames=SESSION_FIELDS, extrasaction="ignore")
+                    w.writeheader(); w.writerows(keep.values())
+                    out.flush(); os.fsync(out.fileno())
+                os.replace(tmp, f.path)
+                st = os.stat(f.path)
+                f.index, f.offset, f.inode = keep, st.st_size, st.st_ino
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "csv", "users": len(self.users.index), "fsync": self.writer.fsync, **self.writer.counters}
+
+    def close(self):
+        self.writer.close()
+
+# ------------------------------- SQLite
+class SqliteStore:
+    """SQLite พร้อม PRIMARY KEY บน phone / token (lookup ผ่าน B-tree index)"""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+        with self._conn() as con:
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("CREATE TABLE IF NOT EXISTS users (%s, PRIMARY KEY (phone))"
+                        % ", ".join(f"{c} TEXT" for c in USER_FIELDS))
+            con.execute("CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, phone TEXT, createdAt TEXT)")
+            con.execute("CREATE INDEX IF NOT EXISTS idx_sessions_phone ON sessions(phone)")
+
+    def _conn(self) -> sqlite3.Connection:
+        # หนึ่ง connection ต่อ thread (threadpool ของ Starlette)
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.db_path, timeout=30)
+            con.row_factory = sqlite3.Row
+            self._local.con = con
+        return con
+
+    def get_user(self, phone: str) -> Optional[Dict[str, str]]:
+        r = self._conn().execute("SELECT * FROM users WHERE phone = ?", (phone,)).fetchone()
+        return dict(r) if r else None
+
+    def add_user(self, row: Dict[str, Any]) -> bool:
+        """False = phone ซ้ำ (PRIMARY KEY ตรวจใน transaction เดียวกับ insert)"""
+        with self._conn() as con:
+            return con.execute("INSERT OR IGNORE INTO users VALUES (%s)" % ",".join("?" * len(USER_FIELDS)),
+                               [str(row.get(k, "")) for k in USER_FIELDS]).rowcount == 1
+
+    def add_session(self, row: Dict[str, Any]):
+        with self._conn() as con:
+            con.execute("INSERT OR IGNORE INTO sessions VALUES (?, ?, ?)",
+                        [str(row.get(k, "")) for k in SESSION_FIELDS])
+
+    def get_session(self, token: str) -> Optional[Dict[str, str]]:
+        r = self._conn().execute("SELECT * FROM sessions WHERE token = ?", (token,)).fetchone()
+        return dict(r) if r else None
+
+    def compact_sessions(self, cutoff: int) -> int:
+        with self._conn() as con:
+            return con.execute("DELETE FROM sessions WHERE CAST(createdAt AS INTEGER) < ?", (cutoff,)).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "sqlite", "path": str(self.db_path)}
+
+    def close(self):
+        con = getattr(self._local, "con", None)
+        if con is not None:
+            con.close()
+            self._local.con = None
+
+    def import_csv(self, users_csv: Path, sessions_csv: Path) -> Dict[str, int]:
+        """ย้ายข้อมูลจาก users.csv / sessions.csv เดิม (รันซ้ำได้ แถวซ้ำถูกข้าม)"""
+        with self._conn() as con:
+            u = con.executemany("INSERT OR IGNORE INTO users VALUES (%s)" % ",".join("?" * len(USER_FIELDS)),
+                                ([r.get(k) or "" for k in USER_FIELDS] for r in _iter_csv(Path(users_csv)))).rowcount
+            s = con.executemany("INSERT OR IGNORE INTO sessions VALUES (?, ?, ?)",
+                                ([r.get(k) or "" for k in SESSION_FIELDS] for r in _iter_csv(Path(sessions_csv)))).rowcount
+        return {"users": u, "sessions": s}
+
+def _ts(row: Dict[str, Any]) -> int:
+    try:
+        return int(row.get("createdAt") or 0)
+    except ValueError:
+        return 0
+
+# ------------------------------- Sessions: TTL + cache + compaction
+class TTLCache:
+    """LRU ขนาดจำกัด; แต่ละ key มีเวลาหมดอายุของตัวเอง"""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, now: float):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None: return None
+            value, expires = item
+            if expires is not None and expires <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires: Optional[float]):
+        if self.maxsize <= 0: return
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+class SessionManager:
+    """token → phone พร้อมอายุ session (ttl วินาที, 0 = ไม่หมดอายุ), cache ของ token ที่ใช้บ่อย และงาน compaction เบื้องหลัง
+    clock: แหล่งเวลา (วินาที) — เทสต์ส่งนาฬิกาปลอมเข้ามาแทนการ sleep"""
+
+    def __init__(self, store, ttl: int = 0, cache_size: int = 10000, clock: Callable[[], float] = time.time):
+        self.store = store
+        self.ttl = ttl
+        self.clock = clock
+        self.cache = TTLCache(cache_size)
+        self.counters = {"cache_hits": 0, "cache_misses": 0, "sessions_expired": 0, "sessions_evicted": 0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _expires(self, created: int) -> Optional[float]:
+        return created + self.ttl if self.ttl > 0 else None
+
+    def _count(self, name: str, n: int = 1):
+        # request threads + compactor thread อัปเดตพร้อมกัน
+        with self._lock:
+            self.counters[name] += n
+
+    def create(self, phone: str) -> str:
+        token = uuid.uuid4().hex
+        now = int(self.clock())
+        self.store.add_session({"token": token, "phone": phone, "createdAt": now})
+        self.cache.set(token, phone, self._expires(now))
+        return token
+
+    def resolve(self, token: str) -> Optional[str]:
+        now = self.clock()
+        phone = self.cache.get(token, now)
+        if phone is not None:
+            self._count("cache_hits")
+            return phone
+        self._count("cache_misses")
+        row = self.store.get_session(token)
+        if not row: return None
+        expires = self._expires(_ts(row))
+        if expires is not None and expires <= now:
+            self._count("sessions_expired")
+            return None
+        self.cache.set(token, row.get("phone"), expires)
+        return row.get("phone")
+
+    def compact(self) -> int:
+        if self.ttl <= 0: return 0
+        n = self.store.compact_sessions(int(self.clock()) - self.ttl)
+        self._count("sessions_evicted", n)
+        return n
+
+    def start_compactor(self, interval: float):
+        if interval <= 0 or self.ttl <= 0 or self._thread: return
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.compact()
+                except Exception as e:
+                    print(f"[WARN] session compaction failed: {e}")
+        self._thread = threading.Thread(target=loop, name="session-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        # รอให้ compaction ที่กำลังเขียน sessions.csv อยู่จบก่อน store ถูกปิด
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+        return {"ttl_s": self.ttl, "cache_size": len(self.cache), **counters}
+
+def open_store(kind: str, base_dir: Path, db_path: Optional[Path] = None, **csv_opts):
+    """csv_opts (เฉพาะ csv): fsync / max_batch / max_wait_ms ของ GroupWriter"""
+    base_dir = Path(base_dir)
+    if kind == "sqlite":
+        return SqliteStore(db_path or base_dir / "booming.db")
+    if kind == "csv":
+        return CsvStore(base_dir / "users.csv", base_dir / "sessions.csv", **csv_opts)
+    raise ValueError(f"unknown store backend: {kind!r} (ใช้ 'csv' หรือ 'sqlite')")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Booming Diet user/session store tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("migrate", help="import users.csv / sessions.csv into SQLite")
+    m.add_argument("--users", type=Path, default=Path("users.csv"))
+    m.add_argument("--sessions", type=Path, default=Path("sessions.csv"))
+    m.add_argument("--db", type=Path, default=Path("booming.db"))
+    args = ap.parse_args()
+    n = SqliteStore(args.db).import_csv(args.users, args.sessions)
+    print(f"✅ migrated users={n['users']} sessions={n['sessions']} → {args.db}")
@@ -1,12 +1,24 @@
 # server/api.py
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
-import pandas as pd
-import joblib
+import os, random, sys
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import Optional
 
 BASE_DIR   = Path(__file__).resolve().parent
+sys.path.insert(0, str(BASE_DIR.parent))   # โมดูลกลาง diet_*.py อยู่ที่ root ของ repo
+import diet_inference as inference
+from diet_batcher import MicroBatcher
+from diet_executor import pool_from_env, workers_from_env
+from diet_cache import PredictionCache
+from diet_grid import PredictionGrid, model_fingerprint
+from diet_loader import runtime_from_env
+from diet_metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics_from_env
+
 MODEL_PATH = BASE_DIR / "diet_recommendation_rf_model.joblib"
 LE_PATH    = BASE_DIR / "label_encoder.joblib"
 
@@ -20,82 +32,194 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# โหลดโมเดล/encoder
-try:
-    print(f"[INFO] Loading model from: {MODEL_PATH}")
-    print(f"[INFO] Loading label encoder from: {LE_PATH}")
-    inference_model = joblib.load(MODEL_PATH)
-    le = joblib.load(LE_PATH)
-except Exception as e:
-    raise RuntimeError(f"โหลดโมเดลไม่สำเร็จ: {e}")
-
-# พยายามดึงคอลัมน์ input ที่พรีโพรเซสเซอร์คาดหวัง (คือ X.columns ตอนฝึก)
-prep = getattr(inference_model, "named_steps", {}).get("prep", None)
-expected_cols = list(getattr(prep, "feature_names_in_", [])) if prep is not None else []
-
-# แยกคอลัมน์ตามชนิดจาก ColumnTransformer (cat/num)
-cat_cols, num_cols = [], []
-if prep is not None and getattr(prep, "transformers", None):
-    # transformers = [("cat", ohe/pipe, [cat_cols]), ("num", scaler/pipe, [num_cols])]
-    for name, trans, cols in prep.transformers:
-        if name == "cat":
-            cat_cols = list(cols)
-        elif name == "num":
-            num_cols = list(cols)
+# Prometheus metrics (diet_metrics.py): latency ต่อ route + เวลาแต่ละขั้นของการทำนาย → GET /metrics
+metrics = metrics_from_env()
+app.middleware("http")(metrics.middleware)
+
+# โหลดโมเดล/encoder ผ่าน ModelRuntime (diet_loader.py: DIET_MODEL_MMAP / DIET_LAZY_LOAD / DIET_WARMUP_ROWS)
+# งานทำนายวิ่งใน pool เฉพาะ (DIET_INFER_EXECUTOR / DIET_INFER_WORKERS / DIET_INFER_N_JOBS)
+print(f"[INFO] Loading model from: {MODEL_PATH}")
+print(f"[INFO] Loading label encoder from: {LE_PATH}")
+rt = runtime_from_env(MODEL_PATH, LE_PATH, pool_from_env)
+
+async def _loaded():
+    # ตอน lazy-load ห้ามบล็อก event loop ระหว่างรอโหลด
+    return rt.current or await run_in_threadpool(rt.ensure)
+
+@asynccontextmanager
+async def _lease():
+    # ถือเวอร์ชันไว้ระหว่างใช้ pool → reload จะปิด pool เก่าหลัง request นี้ปล่อยแล้วเท่านั้น
+    await _loaded()
+    with rt.lease() as m:
+        yield m
+
+# DIET_PREDICT_CACHE=N (>0): LRU ของผลทำนาย N รายการ key = feature หลัง normalize, ล้างเองเมื่อไฟล์โมเดลเปลี่ยน
+# (cat/num cols มาจาก prep ของโมเดลที่โหลดแล้ว จึงสร้าง cache ตอนใช้ครั้งแรก)
+CACHE_SIZE = int(os.getenv("DIET_PREDICT_CACHE", "0"))
+cache = None
+
+def _cache(m):
+    global cache
+    if cache is None and CACHE_SIZE > 0:
+        cache = PredictionCache(m.cat_cols, m.num_cols, CACHE_SIZE, rt.model_path)
+    return cache
+
+# DIET_GRID=path.npy: ตอบ /predict-one จากตารางที่คำนวณไว้ล่วงหน้า (diet_grid.py build) ถ้า input ตกบนจุดของ grid
+# นอก grid / ตารางสร้างจากโมเดลตัวอื่น (fingerprint ไม่ตรง) → ทำนายด้วยโมเดลตามปกติ
+# DIET_GRID_VERIFY=p: สุ่มสัดส่วน p ของ hit ไปทำนายจริงด้วย เพื่อวัด max drift ของตาราง (โชว์ใน /schema, /metrics)
+GRID_PATH   = os.getenv("DIET_GRID")
+GRID_VERIFY = float(os.getenv("DIET_GRID_VERIFY", "0"))
+grid, grid_version = None, None
+
+def _grid(m):
+    global grid, grid_version
+    if not GRID_PATH or grid_version == m.version:
+        return grid
+    grid_version = m.version
+    try:
+        g = PredictionGrid.load(Path(GRID_PATH))
+        if g.fingerprint != model_fingerprint(m.model):
+            print(f"[WARN] DIET_GRID {GRID_PATH} was built from another model — serving from the model only")
+            g = None
+    except Exception as e:
+        print(f"[WARN] DIET_GRID load failed: {e}")
+        g = None
+    grid = g
+    return grid
+
+def _on_swap(m):
+    # เวอร์ชันใหม่อาจมี schema ต่างไป → สร้าง cache ใหม่ตอนใช้ครั้งถัดไป / เช็ค fingerprint ของ grid ใหม่
+    global cache, grid_version
+    if cache is not None:
+        cache.clear()
+        cache = None
+    grid_version = None
+
+rt.listeners.append(_on_swap)
+
+metrics.gauge("diet_model_ready", "1 when the model is loaded and warmed up.", lambda: rt.ready)
+metrics.gauge("diet_model_reloads", "Model swaps since start.", lambda: rt.reloads)
+metrics.gauge("diet_predict_cache_hits", "Prediction cache hits.", lambda: cache.hits if cache else 0)
+metrics.gauge("diet_predict_cache_misses", "Prediction cache misses.", lambda: cache.misses if cache else 0)
+metrics.gauge("diet_grid_hits", "Requests answered from the precomputed grid.", lambda: grid.hits if grid else 0)
+metrics.gauge("diet_grid_misses", "Requests outside the grid (served by the model).", lambda: grid.misses if grid else 0)
+metrics.gauge("diet_grid_max_drift", "Max |grid - model| probability seen in sampled checks.",
+              lambda: grid.max_drift if grid else 0)
 
 class PredictOneIn(BaseModel):
     data: dict
 
 @app.get("/schema")
-def schema():
+async def schema():
     """เช็คคอลัมน์ที่ API/โมเดลคาดหวัง และ class labels"""
-    return {"expected_columns": expected_cols, "cat_cols": cat_cols, "num_cols": num_cols, "classes": list(le.classes_)}
+    m = await _loaded()
+    g = grid if grid_version == m.version else await run_in_threadpool(_grid, m)
+    return {"expected_columns": m.expected_cols, "cat_cols": m.cat_cols, "num_cols": m.num_cols,
+            "classes": list(m.label_encoder.classes_),
+            "microbatch": batcher.stats() if batcher else None, "cache": cache.stats() if cache else None,
+            "grid": g.stats() if g else None}
+
+@app.get("/health")
+def health():
+    """liveness: ตอบทันทีแม้โมเดลยังโหลดไม่เสร็จ"""
+    return {"status": "ok", "model": rt.stats(), "cache": cache.stats() if cache else None}
+
+@app.get("/ready")
+def ready():
+    """readiness: 503 จนกว่าโมเดลจะโหลด + warm-up เสร็จ"""
+    if not rt.ready:
+        return JSONResponse({"ready": False, **rt.stats()}, status_code=503)
+    return {"ready": True, **rt.stats()}
+
+# ตรวจฟิลด์บังคับ / เติม BMI / reindex + แปลงชนิด อยู่ใน diet_inference (ใช้ร่วมกับ diet_api.py)
+# DIET_MICROBATCH=1: รวม /predict-one ที่เข้ามาพร้อมกันเป็น batch เดียว (รอไม่เกิน MAX_WAIT_MS หรือครบ MAX_BATCH)
+def _stage(name: str):
+    return metrics.stage("/predict-one", name)
+
+def _predict_rows(rows: list):
+    with rt.lease() as m:
+        metrics.rows("/predict-one", len(rows))
+        idx, proba = inference.predict(m, rows, stage=_stage)
+    with _stage("postprocess"):
+        return inference.result_rows(idx, proba, m.classes, m.version)
+
+batcher = MicroBatcher(_predict_rows,
+                       max_batch=int(os.getenv("DIET_MICROBATCH_MAX_BATCH", "32")),
+                       max_wait_ms=float(os.getenv("DIET_MICROBATCH_MAX_WAIT_MS", "5")),
+                       concurrency=workers_from_env()) \
+    if os.getenv("DIET_MICROBATCH", "0") == "1" else None
 
 @app.post("/predict-one")
-def predict_one(payload: PredictOneIn):
+async def predict_one(payload: PredictOneIn):
     try:
-        d = payload.data or {}
-
-        # ---- ตรวจสอบฟิลด์บังคับ ----
-        required = ["gender", "age", "height_cm", "weight_kg"]
-        missing = [k for k in required if not d.get(k)]
-        if missing:
-            raise HTTPException(status_code=422, detail=f"missing required fields: {', '.join(missing)}")
-
-        # คำนวณ BMI ถ้าไม่ส่งมา
-        if (d.get("bmi") is None) and d.get("height_cm") and d.get("weight_kg"):
-            h = float(d["height_cm"]) / 100.0
-            w = float(d["weight_kg"])
-            d["bmi"] = round(w / (h*h), 2)
-
-        # --- สร้าง DataFrame ตามคอลัมน์คาดหวังเหมือนเดิม ---
-        if expected_cols:
-            df = pd.DataFrame([d]).reindex(columns=expected_cols)
-        else:
-            df = pd.DataFrame([d])
-
-        # (จะยังคง fill ค่าว่างเฉพาะฟิลด์ "ไม่บังคับ")
-        for c in num_cols:
-            if c in df.columns:
-                df[c] = pd.to_numeric(df[c], errors="coerce")
-        if num_cols:
-            df[num_cols] = df[num_cols].fillna(0)
-
-        for c in cat_cols:
-            if c in df.columns:
-                df[c] = df[c].astype(str)
-        if cat_cols:
-            df[cat_cols] = df[cat_cols].fillna("")
-
-        # ---- ทำนาย ----
-        pred_num = inference_model.predict(df)[0]
-        label = le.inverse_transform([pred_num])[0]
-        proba = inference_model.predict_proba(df)[0]
-        probs = {cls: float(p) for cls, p in zip(le.classes_, proba)}
-        return {"prediction": label, "probabilities": probs}
-
+        async with _lease() as m:
+            with _stage("validate"):
+                d = inference.prepare_records([payload.data or {}], m)[0]
+
+            # โหลดตาราง + hash โมเดลครั้งแรกของแต่ละเวอร์ชันใน threadpool (ไม่บล็อก event loop)
+            g = grid if grid_version == m.version else await run_in_threadpool(_grid, m)
+            if g is not None:
+                with _stage("grid"):
+                    hit = g.lookup(d)
+                if hit is not None:
+                    idx, proba = hit
+                    if GRID_VERIFY > 0 and random.random() < GRID_VERIFY:
+                        _, live = await inference.apredict(m, [d], stage=_stage)
+                        g.record_drift(proba, live)
+                    return inference.result_rows(idx, proba, m.classes, m.version)[0]
+
+            c = _cache(m)
+            if c is not None:
+                with _stage("cache"):
+                    key = c.key(d)
+                    hit = c.get(key) if key is not None else None
+                if hit is not None:
+                    return hit
+            else:
+                key = None
+
+            # ---- ทำนาย ----
+            if batcher is not None:
+                result = await batcher.submit(d)
+            else:
+                metrics.rows("/predict-one", 1)
+                idx, proba = await inference.apredict(m, [d], stage=_stage)
+                with _stage("postprocess"):
+                    result = inference.result_rows(idx, proba, m.classes, m.version)[0]
+            if key is not None:
+                c.put(key, result)
+            return result
+
+    except inference.InputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+# สลับโมเดลโดยไม่ restart: POST /admin/reload?version=<ชื่อในทะเบียน> พร้อม header X-Admin-Token
+# (ปิดไว้ถ้าไม่ได้ตั้ง DIET_ADMIN_TOKEN)
+@app.post("/admin/reload")
+def admin_reload(version: Optional[str] = None, force: bool = False, x_admin_token: Optional[str] = Header(None)):
+    expected = os.getenv("DIET_ADMIN_TOKEN")
+    if not expected or x_admin_token != expected:
+        raise HTTPException(status_code=403, detail="Forbidden.")
+    try:
+        m = rt.reload(version, force)
+    except (KeyError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "model_version": m.version, **rt.stats()}
+
+@app.on_event("startup")
+def _startup():
+    if rt.lazy:
+        rt.start_background_load()
+    rt.start_watcher(float(os.getenv("DIET_MODEL_WATCH", "0")))
+
+@app.on_event("shutdown")
+def _shutdown():
+    rt.shutdown()
@@ -0,0 +1,47 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# โมดูล diet_*.py อยู่ที่ root ของ repo
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# ชื่อคอลัมน์ตามโมเดลที่ ship (ขึ้นต้นตัวใหญ่) — ต่างจากชื่อฟิลด์ที่หน้าเว็บส่งมา
+CAT_COLS = ["Gender", "Activity_level"]
+NUM_COLS = ["Age", "Height_cm", "Weight_kg", "BMI", "Exercise_hours"]
+
+def toy_frame(n: int, seed: int = 0):
+    np = pytest.importorskip("numpy")
+    pd = pytest.importorskip("pandas")
+    rng = np.random.default_rng(seed)
+    h = rng.normal(165, 10, n).round()
+    w = rng.normal(65, 12, n).round()
+    return pd.DataFrame({
+        "Gender": rng.choice(["Male", "Female"], n),
+        "Activity_level": rng.choice(["Low", "Moderate", "High"], n),
+        "Age": rng.integers(15, 80, n).astype(float), "Height_cm": h, "Weight_kg": w,
+        "BMI": (w / (h / 100) ** 2).round(2), "Exercise_hours": rng.choice([0.0, 1.0, 2.5, 5.0], n),
+    })
+
+def toy_dataset(n: int, seed: int = 0):
+    """toy_frame + คอลัมน์เป้าหมายแบบไฟล์ฝึกจริง (Diet_Recommendation เป็นข้อความ)"""
+    df = toy_frame(n, seed)
+    labels = (df["BMI"] > 24).astype(int) + (df["Activity_level"] == "High").astype(int)
+    return df.assign(Diet_Recommendation=labels.map({0: "Balanced", 1: "Low_Carb", 2: "Low_Sodium"}))
+
+@pytest.fixture(scope="session")
+def toy_model():
+    """Pipeline(prep → RandomForest) รูปเดียวกับที่สคริปต์ฝึกสร้าง แต่เล็กพอจะ fit ในเทสต์"""
+    pytest.importorskip("sklearn")
+    from sklearn.compose import ColumnTransformer
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+    X = toy_frame(400)
+    y = ((X["BMI"] > 24).astype(int) + (X["Activity_level"] == "High").astype(int)).to_numpy()
+    prep = ColumnTransformer([
+        ("cat", OneHotEncoder(handle_unknown="ignore"), CAT_COLS),
+        ("num", StandardScaler(), NUM_COLS),
+    ])
+    model = Pipeline([("prep", prep), ("model", RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0))])
+    return model.fit(X, y)
@@ -0,0 +1,80 @@
+import importlib, os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sklearn")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parent.parent
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    # ที่เก็บ user แยกไว้ใน tmp; โมเดล + encoder ที่ ship อยู่ใน server/ — โหลดแบบ lazy ตอน request แรก
+    env = {"DIET_STORE": "sqlite", "DIET_DB": str(tmp_path_factory.mktemp("store") / "test.db"),
+           "DIET_LAZY_LOAD": "1", "DIET_MODEL_PATH": str(ROOT / "server" / "diet_recommendation_rf_model.joblib")}
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        mod = importlib.import_module("diet_api")
+        with TestClient(mod.app) as client:
+            yield mod, client
+    finally:
+        for k, v in saved.items():
+            if v is None: os.environ.pop(k, None)
+            else: os.environ[k] = v
+
+@pytest.mark.parametrize("fmt, expected", [("records", {"count": 0, "results": []}),
+                                           ("compact", {"count": 0, "labels": [], "proba": []})])
+def test_predict_many_empty_records(api, fmt, expected):
+    _, client = api
+    r = client.post(f"/api/predict?format={fmt}", json={"records": []})
+    assert r.status_code == 200, r.text
+    assert expected.items() <= r.json().items()
+
+FRONTEND_ROW = {"gender": "Male", "age": 30, "height_cm": 170, "weight_kg": 65}
+CSV = "gender,age,height_cm,weight_kg\nMale,30,170,65\nFemale,41,160,58\n"
+
+@pytest.mark.parametrize("body", [b"", b"\n"])
+def test_predict_csv_empty_upload_is_400(api, body):
+    _, client = api
+    r = client.post("/api/predict-csv", files={"file": ("x.csv", body, "text/csv")})
+    assert r.status_code == 400, r.text
+
+def test_predict_csv_header_only_is_empty_result(api):
+    _, client = api
+    r = client.post("/api/predict-csv", files={"file": ("x.csv", b"gender,age,height_cm,weight_kg\n", "text/csv")})
+    assert r.status_code == 200, r.text
+    assert r.json()["count"] == 0
+
+def test_predict_csv_stream_releases_lease(api):
+    mod, client = api
+    r = client.post("/api/predict-csv?stream=ndjson", files={"file": ("x.csv", CSV.encode(), "text/csv")})
+    assert r.status_code == 200
+    assert len(r.text.splitlines()) == 2
+    assert mod.rt.current.in_flight == 0
+
+def test_unread_stream_holds_no_lease(api):
+    # response ที่ไม่เคยถูกอ่าน (เช่น client ตัดก่อน chunk แรก) ต้องไม่ถือเวอร์ชันไว้
+    import asyncio, io
+    from fastapi import UploadFile
+    mod, _ = api
+    upload = UploadFile(file=io.BytesIO(CSV.encode()), filename="x.csv")
+    resp = asyncio.run(mod.predict_csv(upload, format="records", stream="csv", chunksize=10, n_jobs=None))
+    assert resp.headers["X-Model-Version"] == mod.rt.current.version
+    assert mod.rt.current.in_flight == 0
+
+def test_metrics_endpoint(api):
+    from test_metrics import parse
+    _, client = api
+    assert client.post("/api/predict", json={"records": [FRONTEND_ROW]}).status_code == 200
+    r = client.get("/metrics")
+    assert r.headers["content-type"] == "text/plain; version=0.0.4; charset=utf-8"
+    fams = parse(r.text)
+    routes = {s[1]["route"] for s in fams["diet_http_requests_total"]["samples"]}
+    assert "/api/predict" in routes
+    stages = {s[1]["stage"] for s in fams["diet_predict_stage_seconds"]["samples"] if s[1]["route"] == "/api/predict"}
+    assert {"parse", "preprocess", "model", "postprocess"} <= stages
+    assert fams["diet_model_ready"]["type"] == "gauge" and fams["diet_model_ready"]["samples"][0][2] == 1.0
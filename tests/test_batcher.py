@@ -0,0 +1,36 @@
+import asyncio, threading, time
+
+from diet_batcher import MicroBatcher
+
+def test_batches_run_concurrently_up_to_limit():
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fn(items):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.05)
+        with lock:
+            active[0] -= 1
+        return [i * 2 for i in items]
+
+    async def main():
+        b = MicroBatcher(fn, max_batch=2, max_wait_ms=1, concurrency=3)
+        return await asyncio.gather(*(b.submit(i) for i in range(12))), b
+
+    results, b = asyncio.run(main())
+    assert results == [i * 2 for i in range(12)]
+    assert 1 < peak[0] <= 3
+    assert b.items == 12
+
+def test_error_only_fails_its_own_request():
+    def fn(items):
+        if any(i < 0 for i in items): raise ValueError("bad")
+        return items
+
+    async def main():
+        b = MicroBatcher(fn, max_batch=8, max_wait_ms=5, concurrency=2)
+        return await asyncio.gather(b.submit(1), b.submit(-1), b.submit(2), return_exceptions=True)
+
+    ok1, bad, ok2 = asyncio.run(main())
+    assert (ok1, ok2) == (1, 2) and isinstance(bad, ValueError)
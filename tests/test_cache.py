@@ -0,0 +1,50 @@
+import os
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from diet_cache import PredictionCache
+
+CAT, NUM = ["Gender"], ["Age", "BMI"]
+
+def _bump(path):
+    # เปลี่ยน mtime ของไฟล์โมเดลแบบที่การ copy/export ทับไฟล์เดิมทำ (ไม่ต้อง sleep)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+
+def test_key_uses_serving_coercion():
+    c = PredictionCache(CAT, NUM)
+    assert c.key({"Gender": "Male", "Age": "30", "BMI": None}) == ("Male", 30.0, 0.0)
+    assert c.key({"Age": 30}) == c.key({"Gender": None, "Age": 30.0, "BMI": "x"})
+
+def test_model_file_change_invalidates(tmp_path):
+    model = tmp_path / "model.joblib"
+    model.write_bytes(b"v1")
+    c = PredictionCache(CAT, NUM, model_path=model, check_interval=0)
+    k = c.key({"Gender": "Male", "Age": 30, "BMI": 22.5})
+    c.put(k, {"prediction": "Balanced"})
+    assert c.get(k) == {"prediction": "Balanced"}
+    _bump(model)
+    assert c.get(k) is None
+    st = c.stats()
+    assert (st["invalidations"], st["entries"], st["hits"], st["misses"]) == (1, 0, 1, 1)
+
+def test_model_file_check_is_rate_limited(tmp_path):
+    model = tmp_path / "model.joblib"
+    model.write_bytes(b"v1")
+    c = PredictionCache(CAT, NUM, model_path=model, check_interval=3600)
+    c.put(("Male", 30.0, 22.5), "x")
+    _bump(model)
+    assert c.get(("Male", 30.0, 22.5)) == "x"             # ยังไม่ถึงรอบ stat ถัดไป
+    c._checked -= 3600
+    assert c.get(("Male", 30.0, 22.5)) is None
+
+def test_lru_eviction_keeps_byte_count():
+    c = PredictionCache(CAT, NUM, maxsize=2)
+    for i in range(3):
+        c.put(("Male", float(i), 0.0), {"i": i})
+    assert c.get(("Male", 0.0, 0.0)) is None
+    assert c.stats()["entries"] == 2
+    c.clear()
+    assert c.stats()["approx_bytes"] == 0
@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sklearn")
+
+from conftest import CAT_COLS, NUM_COLS, toy_frame
+from diet_features import FeatureEncoder, fast_pipeline, to_float, to_str
+from diet_forest import compile_pipeline
+
+def _records():
+    rows = toy_frame(150, seed=2).to_dict(orient="records")
+    rows[0] = {}                                                   # ค่าว่างทั้งแถว
+    rows[1] = {**rows[1], "Gender": "__unknown__", "Activity_level": None}
+    rows[2] = {**rows[2], "Exercise_hours": float("nan"), "Age": None}
+    rows[3] = {**rows[3], "Weight_kg": "not a number", "Height_cm": "170"}
+    return rows
+
+def _reference_frame(rows):
+    # สิ่งที่ sklearn Pipeline เห็นหลัง inference.prepare_frame
+    df = pd.DataFrame(rows).reindex(columns=CAT_COLS + NUM_COLS)
+    df[NUM_COLS] = df[NUM_COLS].apply(pd.to_numeric, errors="coerce").fillna(0)
+    df[CAT_COLS] = df[CAT_COLS].astype(str)
+    return df
+
+def test_scalar_coercion_matches_pandas():
+    for v in (None, "", "x", float("nan"), "3.5", 2, True):
+        ref = pd.to_numeric(pd.Series([v], dtype=object), errors="coerce").fillna(0).iloc[0]
+        assert to_float(v) == pytest.approx(float(ref))
+    assert to_str(None) == "nan" and to_str(math.nan) == "nan" and to_str("Male") == "Male"
+
+def test_encoder_matches_column_transformer(toy_model):
+    rows = _records()
+    prep = toy_model.named_steps["prep"]
+    ref = np.asarray(prep.transform(_reference_frame(rows)), dtype=np.float64)
+    enc = FeatureEncoder.from_prep(prep)
+    np.testing.assert_allclose(enc.encode(rows), ref, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(enc.encode(_reference_frame(rows)), ref, rtol=0, atol=1e-9)
+
+@pytest.mark.parametrize("engine", ["sklearn", "flat"])
+def test_fast_pipeline_matches_sklearn(toy_model, engine):
+    rows = _records()
+    model = toy_model if engine == "sklearn" else compile_pipeline(toy_model)
+    fast = fast_pipeline(model)
+    assert fast is not None and fast.accepts_records
+    ref = toy_model.predict_proba(_reference_frame(rows))
+    np.testing.assert_allclose(fast.predict_proba(rows), ref, rtol=0, atol=1e-9)
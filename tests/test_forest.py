@@ -0,0 +1,39 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("sklearn")
+
+from conftest import CAT_COLS, NUM_COLS, toy_frame
+from diet_forest import FlatForest, compile_pipeline
+
+def _inputs():
+    X = toy_frame(200, seed=1)
+    X.loc[:9, "Gender"] = "__unknown__"            # หมวดที่ encoder ไม่เคยเห็น
+    X.loc[10:19, "Activity_level"] = "nan"         # ค่าว่างหลัง astype(str)
+    X.loc[20:29, "Exercise_hours"] = np.nan
+    # ขั้นเดียวกับ inference.prepare_frame: ตัวเลขว่าง → 0, หมวดหมู่ → str
+    X[NUM_COLS] = X[NUM_COLS].fillna(0)
+    X[CAT_COLS] = X[CAT_COLS].astype(str)
+    return X
+
+def test_flat_pipeline_matches_sklearn(toy_model):
+    X = _inputs()
+    np.testing.assert_allclose(compile_pipeline(toy_model).predict_proba(X), toy_model.predict_proba(X), rtol=0, atol=1e-9)
+
+def test_flat_forest_blocks_match_sklearn(toy_model):
+    Xt = toy_model.named_steps["prep"].transform(_inputs())
+    flat = FlatForest.from_estimator(toy_model.named_steps["model"])
+    ref = toy_model.named_steps["model"].predict_proba(Xt)
+    np.testing.assert_allclose(flat.predict_proba(Xt, block_size=7), ref, rtol=0, atol=1e-9)
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_flat_forest_save_load_roundtrip(toy_model, tmp_path, mmap):
+    flat = FlatForest.from_estimator(toy_model.named_steps["model"])
+    flat.save(tmp_path / "forest")
+    loaded = FlatForest.load(tmp_path / "forest", mmap=mmap)
+    Xt = toy_model.named_steps["prep"].transform(_inputs())
+    np.testing.assert_allclose(loaded.predict_proba(Xt), flat.predict_proba(Xt), rtol=0, atol=1e-9)
+    assert list(loaded.classes_) == list(flat.classes_)
+    for name in FlatForest.ARRAYS:
+        # dtype ตรงกับที่ __init__ ต้องการ → ไม่ถูก copy ออกจาก memmap
+        assert isinstance(getattr(loaded, name).base, np.memmap) == mmap
@@ -0,0 +1,74 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+import diet_formats as formats
+
+CLASSES = ["Balanced", "Low_Carb", "Low_Fat"]
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, formats.JSON), ("", formats.JSON), ("*/*", formats.JSON), ("application/*", formats.JSON),
+    ("application/json", formats.JSON), ("application/problem+json", formats.JSON),
+    ("application/xml, */*;q=0.1", formats.JSON),
+    ("application/x-parquet", formats.PARQUET),
+    (f"{formats.JSON};q=0.5, {formats.ARROW_STREAM}", formats.ARROW_STREAM),
+    (f"{formats.PARQUET};q=0, {formats.ARROW_FILE}", formats.ARROW_FILE),
+])
+def test_negotiate(accept, expected):
+    assert formats.negotiate(accept) == expected
+
+@pytest.mark.parametrize("accept", ["application/xml", "text/html, text/csv", f"{formats.JSON};q=0"])
+def test_negotiate_not_acceptable(accept):
+    with pytest.raises(formats.NotAcceptable):
+        formats.negotiate(accept)
+
+def _frame():
+    return pd.DataFrame({"Gender": ["Male", "Female", "Male"], "Age": [30, 41, 25],
+                         "Height_cm": [170.0, 160.5, 181.0]})
+
+def _results():
+    proba = np.array([[0.7, 0.2, 0.1], [0.1, 0.3, 0.6], [0.2, 0.5, 0.3]])
+    return proba.argmax(axis=1), proba
+
+def test_json_request_roundtrip():
+    df = _frame()
+    records = formats.decode_body(formats.dumps({"records": df.to_dict(orient="records")}), formats.JSON)
+    assert records == df.to_dict(orient="records")
+    cols = formats.decode_body(formats.dumps({"columns": df.to_dict(orient="list")}), "application/json; charset=utf-8")
+    pd.testing.assert_frame_equal(cols, df)
+
+def test_json_response_roundtrip():
+    idx, proba = _results()
+    body, media_type = formats.encode_results(idx, proba, CLASSES, formats.JSON, "compact", "v1")
+    assert media_type == formats.JSON
+    out = formats.loads(body)
+    assert out["labels"] == [CLASSES[i] for i in idx]
+    assert np.allclose(out["proba"], proba)
+
+@pytest.mark.parametrize("media_type", formats.BINARY_TYPES)
+def test_binary_roundtrip(media_type):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    df = _frame()
+    # request: frame → body → decode_body
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    if media_type == formats.PARQUET:
+        pq.write_table(table, sink)
+    else:
+        writer = pa.ipc.new_stream if media_type == formats.ARROW_STREAM else pa.ipc.new_file
+        with writer(sink, table.schema) as w:
+            w.write_table(table)
+    pd.testing.assert_frame_equal(formats.decode_body(sink.getvalue().to_pybytes(), media_type), df)
+
+    # response: encode_results → อ่านกลับด้วย pyarrow
+    idx, proba = _results()
+    body, got_type = formats.encode_results(idx, proba, CLASSES, media_type, version="v1")
+    assert got_type == media_type
+    buf = pa.BufferReader(body)
+    out = pq.read_table(buf) if media_type == formats.PARQUET else \
+        (pa.ipc.open_stream if media_type == formats.ARROW_STREAM else pa.ipc.open_file)(buf).read_all()
+    assert out.column("prediction").to_pylist() == [CLASSES[i] for i in idx]
+    assert np.allclose(np.column_stack([out.column(c).to_numpy() for c in CLASSES]), proba)
+    assert out.schema.metadata[b"model_version"] == b"v1"
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+import diet_inference as inference
+from diet_grid import UNKNOWN, PredictionGrid
+
+# แกนเล็ก ๆ ตั้งชื่อแบบหน้าเว็บ (ตัวเล็ก) — build ต้อง map เข้า Age/Height_cm/Weight_kg ของโมเดลเอง
+NUM = {"age": (20, 40, 5), "height_cm": (160, 180, 5), "weight_kg": (60, 80, 5)}
+CONST = {"activity_level": "Low"}
+
+@pytest.fixture(scope="module")
+def schema(toy_model):
+    from diet_loader import model_schema
+    expected, cat_cols, num_cols = model_schema(toy_model)
+    return SimpleNamespace(expected_cols=expected, cat_cols=cat_cols, num_cols=num_cols, pool=None)
+
+@pytest.fixture(scope="module")
+def grid(toy_model):
+    return PredictionGrid.build(toy_model, NUM, const_spec=CONST)
+
+def test_refuses_numeric_columns_without_range_or_constant(toy_model):
+    with pytest.raises(ValueError, match="Exercise_hours"):
+        PredictionGrid.build(toy_model, NUM, const_spec=CONST, const_rest=None)
+
+def test_refuses_unknown_and_oversized_specs(toy_model):
+    with pytest.raises(ValueError, match="nope"):
+        PredictionGrid.build(toy_model, {**NUM, "nope": (0, 1, 1)})
+    with pytest.raises(ValueError, match="grid"):
+        PredictionGrid.build(toy_model, NUM, max_cells=100)
+    with pytest.raises(ValueError, match="Age"):
+        PredictionGrid.build(toy_model, NUM, cat_axes=["gender", "age"])
+
+def test_axes_follow_model_schema(grid):
+    st = grid.stats()
+    assert st["axes"] == {"Gender": 3, "Age": 5, "Height_cm": 5, "Weight_kg": 5}   # Female/Male + unknown
+    assert st["constants"] == {"Activity_level": "Low", "Exercise_hours": 0.0}
+    assert st["derive_bmi"] == "BMI"
+
+def test_frontend_request_hits_and_matches_model(grid, schema, toy_model):
+    # เหมือนที่หน้าเว็บส่ง: ชื่อตัวเล็ก, ไม่มี Exercise_hours (→ 0 = ค่าคงที่ของตาราง)
+    d = inference.prepare_records([{"gender": "Female", "age": 25, "height_cm": 170, "weight_kg": 65,
+                                    "activity_level": "Low"}], schema)[0]
+    hit = grid.lookup(d)
+    assert hit is not None
+    live = toy_model.predict_proba(inference.prepare_frame([d], schema))
+    assert np.abs(hit[1] - live).max() <= 1 / 65535
+    assert grid.lookup({**d, "Exercise_hours": 2.5}) is None     # ค่าไม่ตรงค่าคงที่ → miss
+    assert grid.lookup({**d, "Age": 26}) is None                  # นอกจุดของ grid
+
+def test_unknown_categories_share_one_slot(grid, schema, toy_model):
+    # encoder ignore ค่าที่ไม่รู้จัก → "Other"/"x" เข้ารหัสเหมือนกัน = ช่องเดียวกันของตาราง
+    rows = inference.prepare_records([{"gender": g, "age": 30, "height_cm": 175, "weight_kg": 70, "activity_level": "Low"}
+                                      for g in ("Other", "x", UNKNOWN)], schema)
+    assert len({grid.index(d) for d in rows}) == 1
+    live = toy_model.predict_proba(inference.prepare_frame(rows, schema))
+    assert np.abs(grid.lookup(rows[0])[1] - live[0]).max() <= 1 / 65535
+
+def test_unsent_categoricals_are_pinned_to_missing(toy_model, schema):
+    # ไม่มี CONST → Activity_level ที่ request ไม่ส่งถูกตรึงที่ "nan" (ไม่อยู่ใน categories → ช่อง unknown)
+    g = PredictionGrid.build(toy_model, NUM)
+    assert g.stats()["constants"] == {"Activity_level": "nan", "Exercise_hours": 0.0}
+    d = inference.prepare_records([{"gender": "Male", "age": 30, "height_cm": 175, "weight_kg": 70}], schema)[0]
+    assert g.lookup(d) is not None
+    assert g.lookup({**d, "Activity_level": "High"}) is None      # ค่าที่รู้จักและไม่ใช่ค่าที่ตรึง → miss
+    assert g.lookup({**d, "Activity_level": "Other"}) is not None   # ไม่รู้จัก = เข้ารหัสเหมือน "nan"
+
+def test_shipped_model_answers_frontend_payloads(tmp_path):
+    # body แบบ bloomdiet.js: allergies "None" (ไม่ใช่หมวดหมู่) + disease/exercise_hours ที่ไม่ตรงชื่อคอลัมน์
+    import sys
+    from pathlib import Path
+    root = Path(__file__).resolve().parent.parent
+    sys.path.insert(0, str(root / "benchmarks"))
+    from common import frontend_records, load_model
+    from diet_loader import model_schema
+    model, _ = load_model()
+    m = SimpleNamespace(**dict(zip(("expected_cols", "cat_cols", "num_cols"), model_schema(model))), pool=None)
+    g = PredictionGrid.build(model, {"age": (20, 60, 1), "height_cm": (150, 180, 1), "weight_kg": (50, 80, 1)})
+    rows = inference.prepare_records([r for r in frontend_records(400, seed=1)
+                                      if 20 <= r["age"] <= 60 and 150 <= r["height_cm"] <= 180
+                                      and 50 <= r["weight_kg"] <= 80], m)
+    assert {r["Allergies"] for r in rows} >= {"None", "Gluten", "Dairy"}
+    hits = [(d, g.lookup(d)) for d in rows]
+    assert all(h is not None for _, h in hits)
+    live = model.predict_proba(inference.prepare_frame([d for d, _ in hits], m))
+    assert np.abs(np.vstack([h[1] for _, h in hits]) - live).max() <= 1 / 65535
+
+def test_save_load_roundtrip(grid, tmp_path):
+    path = tmp_path / "grid.npy"
+    grid.save(path)
+    g = PredictionGrid.load(path)
+    assert g.derive_bmi == ["BMI", "Height_cm", "Weight_kg"]
+    assert g.stats()["constants"] == grid.stats()["constants"]
+    assert g.index({"Gender": "Other", "Age": 20, "Height_cm": 160, "Weight_kg": 60, "BMI": 23.44,
+                    "Activity_level": "Low", "Exercise_hours": 0}) >= 0
+    assert np.array_equal(np.asarray(g.table), grid.table)
@@ -0,0 +1,89 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("numpy")
+pd = pytest.importorskip("pandas")
+
+import diet_inference as inference
+
+ROOT = Path(__file__).resolve().parent.parent
+SHIPPED_MODEL = ROOT / "server" / "diet_recommendation_rf_model.joblib"
+
+# ฟิลด์ที่หน้าเว็บ (client/pages/bloomdiet.js) ส่งมา — ตัวเล็กทั้งหมด
+FRONTEND = {"gender": "Male", "age": 30, "height_cm": 170, "weight_kg": 65}
+
+@pytest.fixture(scope="module")
+def shipped():
+    pytest.importorskip("sklearn")
+    joblib = pytest.importorskip("joblib")
+    from diet_loader import model_schema
+    expected, cat_cols, num_cols = model_schema(joblib.load(SHIPPED_MODEL))
+    return SimpleNamespace(expected_cols=expected, cat_cols=cat_cols, num_cols=num_cols, pool=None)
+
+def test_required_fields_map_onto_shipped_schema(shipped):
+    req = dict(inference.required_fields(shipped))
+    assert set(req) == set(inference.REQUIRED_FIELDS)
+    assert all(c in shipped.expected_cols for c in req.values())
+
+@pytest.mark.parametrize("field", inference.REQUIRED_FIELDS)
+def test_missing_required_field_is_rejected_with_shipped_schema(shipped, field):
+    with pytest.raises(inference.InputError, match=field):
+        inference.prepare_records([{**FRONTEND, field: None}], shipped)
+    with pytest.raises(inference.InputError, match=field):
+        inference.prepare_frame(pd.DataFrame([{**FRONTEND, field: ""}]), shipped)
+
+def test_lowercase_fields_reach_the_model_columns(shipped):
+    names = inference.schema_names(shipped)
+    d = inference.prepare_records([dict(FRONTEND)], shipped)[0]
+    df = inference.prepare_frame([dict(FRONTEND)], shipped)
+    assert list(df.columns) == shipped.expected_cols
+    for f in ("age", "height_cm", "weight_kg"):
+        assert d[names[f]] == FRONTEND[f] and df[names[f]].iloc[0] == FRONTEND[f]
+    if "bmi" in names:
+        assert d[names["bmi"]] == df[names["bmi"]].iloc[0] == round(65 / 1.7 ** 2, 2)
+
+def _toy_schema():
+    cols = ["Gender", "Age", "Height_cm", "Weight_kg", "BMI", "Exercise_hours"]
+    return SimpleNamespace(expected_cols=cols, cat_cols=["Gender"], num_cols=cols[1:], pool=None)
+
+@pytest.mark.parametrize("value", [None, "", 0, 0.0, False, float("nan")])
+def test_blank_values_are_missing(value):
+    # กติกาเดิมของ server/api.py: `not d.get(k)` → 0 ก็ถือว่าขาด
+    m = _toy_schema()
+    with pytest.raises(inference.InputError, match="age"):
+        inference.prepare_records([{**FRONTEND, "age": value}], m)
+    with pytest.raises(inference.InputError, match="age"):
+        inference.prepare_frame([{**FRONTEND, "age": value}], m)
+
+def test_all_zero_body_is_rejected():
+    m = _toy_schema()
+    row = {**FRONTEND, "age": 0, "height_cm": 0, "weight_kg": 0}
+    for prepare in (inference.prepare_records, inference.prepare_frame):
+        with pytest.raises(inference.InputError) as e:
+            prepare([row], m)
+        assert e.value.errors == [{"row": 0, "missing": ["age", "height_cm", "weight_kg"]}]
+
+@pytest.mark.parametrize("field", inference.POSITIVE_FIELDS)
+@pytest.mark.parametrize("value", ["0", -170, "-1", "abc"])
+def test_non_positive_height_weight_are_rejected(field, value):
+    # หาร BMI ไม่ได้ → 422 แทนการเติม 0 แล้วทำนายต่อ
+    m = _toy_schema()
+    with pytest.raises(inference.InputError, match=field):
+        inference.prepare_records([{**FRONTEND, field: value}], m)
+    with pytest.raises(inference.InputError, match=field):
+        inference.prepare_frame([{**FRONTEND, field: value}], m)
+
+@pytest.mark.parametrize("value", ["0", " "])
+def test_truthy_strings_are_not_missing(value):
+    # `not "0"` / `not " "` เป็น False ในกติกาเดิม → ผ่าน (แปลงเป็นตัวเลขตอน reindex)
+    m = _toy_schema()
+    assert len(inference.prepare_records([{**FRONTEND, "age": value}], m)) == 1
+    assert len(inference.prepare_frame([{**FRONTEND, "age": value}], m)) == 1
+
+@pytest.mark.parametrize("value", [0, 0.0, None])
+def test_optional_fields_may_be_zero(value):
+    m = _toy_schema()
+    assert len(inference.prepare_records([{**FRONTEND, "exercise_hours": value}], m)) == 1
+    assert len(inference.prepare_frame([{**FRONTEND, "exercise_hours": value}], m)) == 1
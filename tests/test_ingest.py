@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("pyarrow")
+
+import diet_ingest as ingest
+from conftest import toy_dataset
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "dataset.csv"
+    toy_dataset(120, seed=4).to_csv(path, index=False, sep=";")   # sep ไม่ใช่ค่าเริ่มต้น: ต้อง sniff ได้
+    return path
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_roundtrip_keeps_values_and_types(csv_path, tmp_path, suffix):
+    dst = tmp_path / f"dataset{suffix}"
+    schema = ingest.ingest(csv_path, dst)
+    assert schema["target"] == "Diet_Recommendation" and schema["rows"] == 120
+    df = ingest.load_dataset(dst)
+    raw = ingest.read_dataset(csv_path)
+    assert list(df.columns) == list(raw.columns)
+    assert isinstance(df["Gender"].dtype, pd.CategoricalDtype)
+    assert df["Age"].dtype == raw["Age"].dtype                     # float คงเป็น float64
+    pd.testing.assert_frame_equal(df.astype({c: object for c in df.select_dtypes("category")}),
+                                  raw, check_dtype=False)
+    chunks = list(ingest.iter_dataset(dst, chunksize=50))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), df)
+
+def test_integers_downcast_losslessly():
+    df = ingest.typed_frame(pd.DataFrame({"n": [1, 2, 300], "big": [0, 1, 2**40], "s": ["a", "b", "a"]}))
+    assert str(df["n"].dtype) == "int16" and str(df["big"].dtype) == "int64"
+    assert df["big"].tolist() == [0, 1, 2**40]
+
+def _edit_schema(dst, fn):
+    sp = ingest.schema_path(dst)
+    schema = json.loads(sp.read_text(encoding="utf-8"))
+    fn(schema)
+    sp.write_text(json.dumps(schema), encoding="utf-8")
+
+@pytest.mark.parametrize("edit, match", [
+    (lambda s: s["columns"].pop(), "schema"),
+    (lambda s: s["columns"][0].update(name="Sex"), "schema"),
+    (lambda s: next(c for c in s["columns"] if c["name"] == "Gender").update(categories=["Female"]), "Gender"),
+    (lambda s: next(c for c in s["columns"] if c["name"] == "Gender").update(kind="numeric", dtype="float64"),
+     "Gender"),
+])
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_schema_mismatch_is_rejected(csv_path, tmp_path, suffix, edit, match):
+    dst = tmp_path / f"dataset{suffix}"
+    ingest.ingest(csv_path, dst)
+    _edit_schema(dst, edit)
+    with pytest.raises(ValueError, match=match):
+        ingest.load_dataset(dst)
+    with pytest.raises(ValueError, match=match):
+        next(ingest.iter_dataset(dst))
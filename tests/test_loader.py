@@ -0,0 +1,83 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("joblib")
+pytest.importorskip("pandas")
+
+import diet_loader
+from diet_loader import ModelRuntime
+from diet_registry import ModelRegistry
+
+class FakePool:
+    def __init__(self):
+        self.closed = False
+
+    def run(self, X, n_jobs=None):
+        if self.closed: raise RuntimeError("cannot schedule new futures after shutdown")
+        return [], []
+
+    def shutdown(self, wait=False):
+        self.closed = True
+
+class FakeEncoder:
+    classes_ = ["a", "b"]
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    reg = ModelRegistry(tmp_path / "models")
+    for v in ("v1", "v2", "broken"):
+        d = reg.root / v
+        d.mkdir(parents=True)
+        (d / "diet_recommendation_rf_model.joblib").write_text(v)
+        (d / "label_encoder.joblib").write_text("le")
+    reg.activate("v1")
+
+    def load_artifact(path):
+        if path.parent.name == "broken": raise ValueError("corrupt artifact")
+        return object()
+    monkeypatch.setattr(diet_loader, "load_artifact", load_artifact)
+    monkeypatch.setattr(diet_loader.joblib, "load", lambda path: FakeEncoder())
+    return reg
+
+def _runtime(reg):
+    return ModelRuntime(reg.root / "unused.joblib", reg.root / "unused_le.joblib",
+                        lambda model, path, mmap: FakePool(), registry=reg)
+
+def test_old_pool_stays_open_until_last_lease_released(registry):
+    rt = _runtime(registry)
+    old = rt.acquire()                     # เช่น stream ที่กำลังส่งอยู่
+    new = rt.reload("v2")
+    assert rt.current is new and not old.pool.closed
+    old.pool.run([])                       # ยังใช้ pool เดิมต่อได้
+    old.release()
+    assert old.pool.closed and not new.pool.closed
+
+def test_idle_pool_closes_on_reload(registry):
+    rt = _runtime(registry)
+    old = rt.current
+    rt.reload("v2")
+    assert old.pool.closed
+
+def test_failed_reload_keeps_active_pointer(registry):
+    rt = _runtime(registry)
+    with pytest.raises(RuntimeError):
+        rt.reload("broken")
+    assert registry.active() == "v1"
+    assert rt.current.version == "v1" and not rt.current.pool.closed
+    rt.reload("v2")
+    assert registry.active() == "v2"
+
+@pytest.mark.parametrize("env, expected", [
+    ({}, "app/label_encoder.joblib"),
+    ({"DIET_MODEL_PATH": "other/model.joblib"}, "other/label_encoder.joblib"),
+    ({"DIET_MODEL_PATH": "other/model.joblib", "DIET_LE_PATH": "le/custom.joblib"}, "le/custom.joblib"),
+])
+def test_label_encoder_follows_model_path(monkeypatch, env, expected):
+    for k in ("DIET_MODEL_PATH", "DIET_LE_PATH", "DIET_MODEL_REGISTRY"):
+        monkeypatch.delenv(k, raising=False)
+    for k, v in env.items():
+        monkeypatch.setenv(k, v)
+    monkeypatch.setenv("DIET_LAZY_LOAD", "1")
+    rt = diet_loader.runtime_from_env(Path("app/model.joblib"), Path("app/label_encoder.joblib"), lambda m: FakePool())
+    assert rt.le_path == Path(expected)
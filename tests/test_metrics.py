@@ -0,0 +1,105 @@
+import re
+
+import pytest
+
+from diet_metrics import CONTENT_TYPE, LATENCY_BUCKETS, Metrics
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{(.*)\})? (\S+)$')
+LABEL = re.compile(r'([a-zA-Z_][a-zA-Z0-9_]*)="((?:[^"\\]|\\.)*)"(,|$)')
+
+def parse(text: str):
+    """ตัวอ่าน text format 0.0.4 แบบเคร่ง: ทุก sample ต้องอยู่ใต้ HELP + TYPE ของ family ตัวเอง"""
+    assert text.endswith("\n")
+    families, current = {}, None
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            name, help = line[7:].split(" ", 1)
+            assert name not in families, f"duplicate family {name}"
+            current = families[name] = {"help": help, "type": None, "samples": []}
+        elif line.startswith("# TYPE "):
+            name, kind = line[7:].split(" ")
+            assert current is families.get(name) and kind in ("counter", "gauge", "histogram")
+            current["type"] = kind
+        else:
+            m = SAMPLE.match(line)
+            assert m, f"bad sample line: {line!r}"
+            name, _, labels, value = m.groups()
+            base = re.sub(r"_(bucket|sum|count)$", "", name) if current["type"] == "histogram" else name
+            assert current is families.get(base), f"{name} outside its family"
+            pairs = LABEL.findall(labels or "")
+            assert "".join(f'{k}="{v}"{sep}' for k, v, sep in pairs) == (labels or "")
+            current["samples"].append((name, {k: v for k, v, _ in pairs}, float(value)))
+    return families
+
+def test_exposition_format():
+    m = Metrics()
+    m.requests.inc(("GET", "/api/predict", "200"))
+    m.requests.inc(("GET", "/api/predict", "200"))
+    m.requests.inc(("POST", '/weird"path\\x', "500"))
+    for v in (0.0005, 0.005, 0.3, 20.0):
+        m.latency.observe(("POST", "/api/predict"), v)
+    with m.stage("/api/predict", "model"):
+        pass
+    m.rows("/api/predict", 3)
+    m.gauge("diet_model_ready", "1 when the model is loaded.", lambda: True)
+    m.gauge("diet_broken", "raises → skipped", lambda: 1 / 0)
+    fams = parse(m.render())
+
+    assert fams["diet_http_requests_total"]["type"] == "counter"
+    reqs = {(s[1]["method"], s[1]["route"]): s[2] for s in fams["diet_http_requests_total"]["samples"]}
+    assert reqs[("GET", "/api/predict")] == 2.0
+    assert reqs[("POST", '/weird\\"path\\\\x')] == 1.0         # escape ตาม spec
+
+    h = fams["diet_http_request_duration_seconds"]
+    assert h["type"] == "histogram"
+    buckets = [(s[1]["le"], s[2]) for s in h["samples"] if s[0].endswith("_bucket")]
+    assert [le for le, _ in buckets] == [repr(float(b)) for b in LATENCY_BUCKETS] + ["+Inf"]
+    counts = [c for _, c in buckets]
+    assert counts == sorted(counts)                             # สะสม (cumulative)
+    assert dict(buckets)["0.001"] == 1 and dict(buckets)["0.005"] == 2   # le รวมค่าที่เท่าขอบ
+    assert dict(buckets)["10.0"] == 3 and dict(buckets)["+Inf"] == 4
+    total = {s[0]: s[2] for s in h["samples"] if not s[0].endswith("_bucket")}
+    assert total["diet_http_request_duration_seconds_count"] == 4
+    assert abs(total["diet_http_request_duration_seconds_sum"] - 20.3055) < 1e-9
+
+    assert fams["diet_predict_stage_seconds"]["samples"][-1][2] == 1       # _count
+    assert fams["diet_model_ready"] == {"help": "1 when the model is loaded.", "type": "gauge",
+                                        "samples": [("diet_model_ready", {}, 1.0)]}
+    assert "diet_broken" not in fams
+
+def test_disabled_metrics_record_nothing():
+    m = Metrics(enabled=False)
+    with m.stage("/x", "model"):
+        pass
+    m.rows("/x", 5)
+    fams = parse(m.render())
+    assert all(not f["samples"] for f in fams.values())
+
+def test_middleware_labels_route_templates():
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    m = Metrics()
+    app = FastAPI()
+    app.middleware("http")(m.middleware)
+
+    @app.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    @app.get("/metrics")
+    def metrics():
+        from fastapi.responses import Response
+        return Response(m.render(), media_type=CONTENT_TYPE)
+
+    client = TestClient(app)
+    for i in range(3):
+        client.get(f"/items/{i}")
+    client.get("/nope")
+    r = client.get("/metrics")
+    assert r.headers["content-type"] == CONTENT_TYPE
+    fams = parse(r.text)
+    routes = {s[1]["route"]: s[2] for s in fams["diet_http_requests_total"]["samples"] if s[1]["status"] != "404"}
+    assert routes == {"/items/{item_id}": 3.0}                  # path template ไม่ใช่ URL จริง
+    assert any(s[1]["route"] == "unmatched" for s in fams["diet_http_requests_total"]["samples"])
@@ -0,0 +1,93 @@
+import importlib.util, os, shutil, sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sklearn")
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parent.parent
+SERVER = ROOT / "server"
+FRONTEND = {"gender": "Male", "age": 30, "height_cm": 170, "weight_kg": 65}
+
+def _load_server(name: str, env: dict):
+    # server/api.py ถูกรันจากโฟลเดอร์ server/ → โหลดจาก path ตรง ๆ (ชื่อโมดูลแยกต่อ fixture)
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        spec = importlib.util.spec_from_file_location(name, SERVER / "api.py")
+        mod = importlib.util.module_from_spec(spec)
+        sys.modules[name] = mod
+        spec.loader.exec_module(mod)
+        return mod
+    finally:
+        for k, v in saved.items():
+            if v is None: os.environ.pop(k, None)
+            else: os.environ[k] = v
+
+@pytest.fixture(scope="module")
+def cached(tmp_path_factory):
+    # สำเนาโมเดลใน tmp: เทสต์แก้ mtime ของไฟล์ได้โดยไม่แตะไฟล์ที่ ship
+    model = tmp_path_factory.mktemp("model") / "model.joblib"
+    shutil.copy(SERVER / "diet_recommendation_rf_model.joblib", model)
+    shutil.copy(SERVER / "label_encoder.joblib", model.parent)
+    mod = _load_server("server_api_cached", {"DIET_PREDICT_CACHE": "16", "DIET_LAZY_LOAD": "1",
+                                             "DIET_MODEL_PATH": str(model)})
+    with TestClient(mod.app) as client:
+        yield mod, client, model
+
+def test_cache_invalidated_when_model_file_changes(cached):
+    mod, client, model = cached
+    assert client.post("/predict-one", json={"data": FRONTEND}).status_code == 200
+    assert client.post("/predict-one", json={"data": FRONTEND}).status_code == 200
+    c = mod.cache
+    assert c.hits >= 1
+    hits, misses = c.hits, c.misses
+    st = os.stat(model)
+    os.utime(model, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    c._checked -= c.check_interval
+    assert client.post("/predict-one", json={"data": FRONTEND}).status_code == 200
+    assert (c.hits, c.misses, c.invalidations) == (hits, misses + 1, 1)
+
+def test_swap_clears_cache(cached):
+    mod, client, _ = cached
+    assert client.post("/predict-one", json={"data": FRONTEND}).status_code == 200
+    old = mod.cache
+    assert old is not None and old.stats()["entries"] > 0
+    mod.rt.reload(force=True)                 # listeners → _on_swap
+    assert mod.cache is None and old.stats()["entries"] == 0
+    assert client.post("/predict-one", json={"data": FRONTEND}).status_code == 200
+    assert mod.cache is not old and (mod.cache.hits, mod.cache.misses) == (0, 1)
+
+@pytest.fixture(scope="module")
+def grid_path(tmp_path_factory):
+    import joblib
+    from diet_grid import PredictionGrid
+    model = joblib.load(SERVER / "diet_recommendation_rf_model.joblib")
+    path = tmp_path_factory.mktemp("grid") / "grid.npy"
+    PredictionGrid.build(model, {"age": (25, 35, 5), "height_cm": (165, 175, 5), "weight_kg": (60, 70, 5)}).save(path)
+    return path
+
+def test_schema_reports_grid_and_frontend_body_hits(grid_path):
+    mod = _load_server("server_api_grid", {"DIET_LAZY_LOAD": "1", "DIET_GRID": str(grid_path)})
+    with TestClient(mod.app) as client:
+        body = {**FRONTEND, "allergies": "None", "disease": "None", "exercise_hours": 3}
+        assert client.post("/predict-one", json={"data": body}).status_code == 200
+        g = client.get("/schema").json()["grid"]
+        assert (g["hits"], g["misses"]) == (1, 0)
+        assert g["axes"] == {"Gender": 3, "Allergies": 4, "Age": 3, "Weight_kg": 3, "Height_cm": 3}
+
+def test_schema_checks_grid_once(grid_path, tmp_path, capsys):
+    # ตารางของโมเดลตัวอื่น: /schema ไม่บล็อกรอโหลด (lazy) และเตือนครั้งเดียวต่อเวอร์ชันของโมเดล
+    import json
+    other = tmp_path / "grid.npy"
+    shutil.copy(grid_path, other)
+    meta = json.loads(grid_path.with_suffix(".json").read_text(encoding="utf-8"))
+    other.with_suffix(".json").write_text(json.dumps({**meta, "fingerprint": "0" * 40}), encoding="utf-8")
+    mod = _load_server("server_api_grid_other", {"DIET_LAZY_LOAD": "1", "DIET_GRID": str(other)})
+    with TestClient(mod.app) as client:
+        assert client.get("/schema").json()["grid"] is None
+        assert client.get("/schema").json()["grid"] is None
+    assert capsys.readouterr().out.count("built from another model") == 1
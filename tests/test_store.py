@@ -0,0 +1,121 @@
+import csv, threading
+
+import pytest
+
+from diet_store import USER_FIELDS, SESSION_FIELDS, CsvStore, SessionManager, SqliteStore, open_store
+
+def _user(phone):
+    # แถวตาม USER_FIELDS จริง (แบบที่ /register เขียน)
+    return {"phone": phone, "firstName": "Somchai", "lastName": "Jaidee", "email": f"{phone}@example.com",
+            "address": "Bangkok", "dob_day": "1", "dob_month": "2", "dob_year": "1990", "agree": "true",
+            "marketingOptIn": "false", "createdAt": "1700000000"}
+
+@pytest.fixture(params=["csv", "sqlite"])
+def store(request, tmp_path):
+    s = open_store(request.param, tmp_path, **({"fsync": False} if request.param == "csv" else {}))
+    yield s
+    s.close()
+
+def test_user_unique_and_lookup(store):
+    assert store.add_user(_user("0800000001"))
+    assert not store.add_user({**_user("0800000001"), "firstName": "Other"})
+    assert store.add_user(_user("0800000002"))
+    got = store.get_user("0800000001")
+    assert {k: got[k] for k in USER_FIELDS} == _user("0800000001")
+    assert store.get_user("0899999999") is None
+
+def test_session_lookup_and_compaction(store):
+    store.add_session({"token": "old", "phone": "0800000001", "createdAt": 100})
+    store.add_session({"token": "new", "phone": "0800000001", "createdAt": 300})
+    assert store.get_session("old")["phone"] == "0800000001"
+    assert store.compact_sessions(200) == 1
+    assert store.get_session("old") is None
+    assert store.get_session("new")["createdAt"] == "300"
+
+def test_import_csv_migrates_and_is_idempotent(tmp_path):
+    users, sessions = tmp_path / "users.csv", tmp_path / "sessions.csv"
+    for path, fields, rows in ((users, USER_FIELDS, [_user("0800000001"), _user("0800000002")]),
+                               (sessions, SESSION_FIELDS, [{"token": "t1", "phone": "0800000001", "createdAt": "5"}])):
+        with path.open("w", newline="", encoding="utf-8") as f:
+            w = csv.DictWriter(f, fieldnames=fields)
+            w.writeheader(); w.writerows(rows)
+    db = SqliteStore(tmp_path / "booming.db")
+    assert db.import_csv(users, sessions) == {"users": 2, "sessions": 1}
+    assert db.import_csv(users, sessions) == {"users": 0, "sessions": 0}     # รันซ้ำ: แถวซ้ำถูกข้าม
+    assert {k: db.get_user("0800000002")[k] for k in USER_FIELDS} == _user("0800000002")
+    assert db.get_session("t1")["phone"] == "0800000001"
+    assert not db.add_user(_user("0800000001"))
+    db.close()
+
+def test_submit_after_close_writes_synchronously(tmp_path):
+    store = CsvStore(tmp_path / "users.csv", tmp_path / "sessions.csv", fsync=False)
+    assert store.add_user(_user("0800000001"))
+    store.close()
+    result = []
+    t = threading.Thread(target=lambda: result.append(store.add_user(_user("0800000002"))), daemon=True)
+    t.start(); t.join(timeout=5)
+    assert result == [True], "register after close() must not hang"
+    assert not store.add_user(_user("0800000002"))          # ยังตรวจซ้ำได้
+    reopened = CsvStore(tmp_path / "users.csv", tmp_path / "sessions.csv", fsync=False)
+    assert reopened.get_user("0800000002") is not None
+
+def test_unique_under_concurrent_register(tmp_path):
+    store = CsvStore(tmp_path / "users.csv", tmp_path / "sessions.csv", fsync=False)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.add_user(_user("0811111111")))) for _ in range(16)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    assert results.count(True) == 1
+    store.close()
+
+def test_session_counters_are_consistent(tmp_path):
+    store = CsvStore(tmp_path / "users.csv", tmp_path / "sessions.csv", fsync=False)
+    sessions = SessionManager(store, ttl=0, cache_size=4)
+    tokens = [sessions.create("080") for _ in range(8)]
+    def hammer():
+        for _ in range(200):
+            for t in tokens: sessions.resolve(t)
+    threads = [threading.Thread(target=hammer) for _ in range(4)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    st = sessions.stats()
+    assert st["cache_hits"] + st["cache_misses"] == 4 * 200 * len(tokens)
+    store.close()
+
+class FakeClock:
+    def __init__(self, t: float = 1_000_000.0):
+        self.t = t
+    def __call__(self) -> float:
+        return self.t
+
+def test_session_ttl_expiry(store):
+    clock = FakeClock()
+    sessions = SessionManager(store, ttl=60, clock=clock)
+    token = sessions.create("0800000001")
+    clock.t += 59
+    assert sessions.resolve(token) == "0800000001"
+    clock.t += 1
+    assert sessions.resolve(token) is None                  # หมดอายุทั้งใน cache และใน store
+    # manager ใหม่ (cache ว่าง) ก็ต้องตัดสินจาก createdAt ในที่เก็บเหมือนกัน
+    fresh = SessionManager(store, ttl=60, clock=clock)
+    assert fresh.resolve(token) is None
+    assert fresh.stats()["sessions_expired"] == 1
+
+def test_compaction_drops_only_expired_rows(store):
+    clock = FakeClock()
+    sessions = SessionManager(store, ttl=60, clock=clock)
+    old = sessions.create("0800000001")
+    clock.t += 30
+    new = sessions.create("0800000002")
+    clock.t += 40                                           # old อายุ 70 วินาที, new อายุ 40 วินาที
+    assert sessions.compact() == 1
+    assert store.get_session(old) is None
+    assert store.get_session(new)["phone"] == "0800000002"
+    assert sessions.stats()["sessions_evicted"] == 1
+
+def test_stop_joins_compactor(store):
+    sessions = SessionManager(store, ttl=60)
+    sessions.start_compactor(0.01)
+    thread = sessions._thread
+    sessions.stop(timeout=5)
+    assert not thread.is_alive()
@@ -0,0 +1,159 @@
+import json
+
+import pytest
+
+pytest.importorskip("sklearn")
+pd = pytest.importorskip("pandas")
+
+import diet_model_rf_weka_summary_full as train
+from conftest import toy_dataset
+
+# search space เล็ก ๆ ให้เทสต์จบในไม่กี่วินาที
+TINY_SPACE = {"model__n_estimators": [5, 10], "model__max_depth": [3, 6], "model__min_samples_leaf": [1, 2]}
+
+@pytest.fixture
+def tiny_space(monkeypatch):
+    monkeypatch.setattr(train, "param_dist", TINY_SPACE)
+
+@pytest.fixture
+def data():
+    X, y_text = train.split_target(toy_dataset(150, seed=3))
+    y = train.LabelEncoder().fit_transform(y_text)
+    return X, y
+
+def _pipe(X, tmp_path, legacy=False):
+    cat, num = train.column_types(X)
+    return train.make_train_pipe(train.make_preprocessor(cat, num), seed=0, legacy=legacy,
+                                 cache_dir=str(tmp_path / "cache"))
+
+def test_resumable_search_skips_finished_candidates(tiny_space, data, tmp_path, monkeypatch):
+    X, y = data
+    pipe, smote = _pipe(X, tmp_path)
+    checkpoint = tmp_path / "ckpt.jsonl"
+    first = train.search_best(pipe, X, y, smote, "random", n_iter=3, n_jobs=1, seed=0, checkpoint=checkpoint)
+    lines = checkpoint.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3
+
+    calls = []
+    real_cv = train.cross_val_score
+    monkeypatch.setattr(train, "cross_val_score", lambda *a, **kw: calls.append(1) or real_cv(*a, **kw))
+    again = train.search_best(pipe, X, y, smote, "random", n_iter=4, n_jobs=1, seed=0, checkpoint=checkpoint)
+    assert len(calls) == 1                                 # 3 ตัวแรกมาจาก checkpoint, รันเฉพาะตัวที่ 4
+    assert len(checkpoint.read_text(encoding="utf-8").splitlines()) == 4
+    done = [json.loads(l)["params"] for l in lines]
+    assert done == [json.loads(l)["params"] for l in checkpoint.read_text(encoding="utf-8").splitlines()[:3]]
+    assert type(first) is type(again)
+
+def test_checkpoint_from_other_data_is_not_reused(tiny_space, data, tmp_path, monkeypatch):
+    X, y = data
+    pipe, smote = _pipe(X, tmp_path)
+    checkpoint = tmp_path / "ckpt.jsonl"
+    train.search_best(pipe, X, y, smote, "random", n_iter=2, n_jobs=1, seed=0, checkpoint=checkpoint)
+    calls = []
+    real_cv = train.cross_val_score
+    monkeypatch.setattr(train, "cross_val_score", lambda *a, **kw: calls.append(1) or real_cv(*a, **kw))
+    train.search_best(pipe, X.iloc[:120], y[:120], smote, "random", n_iter=2, n_jobs=1, seed=0, checkpoint=checkpoint)
+    assert len(calls) == 2
+
+def test_single_level_parallelism(data, tmp_path):
+    X, _ = data
+    pipe, _ = _pipe(X, tmp_path)
+    legacy, _ = _pipe(X, tmp_path, legacy=True)
+    assert pipe.named_steps["model"].n_jobs == 1 and pipe.memory is not None
+    assert legacy.named_steps["model"].n_jobs == -1 and legacy.memory is None
+
+def test_halving_search_is_deterministic(tiny_space, data, tmp_path):
+    X, y = data
+    pipe, smote = _pipe(X, tmp_path)
+    a = train.search_best(pipe, X, y, smote, "halving", n_iter=4, n_jobs=1, seed=0)
+    b = train.search_best(pipe, X, y, smote, "halving", n_iter=4, n_jobs=1, seed=0)
+    params = lambda m: {k: m.get_params()[k] for k in TINY_SPACE}
+    assert params(a) == params(b)
+    assert a.predict(X.iloc[:5]).shape == (5,)
+
+# ---------- CLI: train / evaluate / compress / export บนข้อมูลเล็ก ๆ ----------
+@pytest.fixture
+def artifacts(tiny_space, tmp_path):
+    data = tmp_path / "dataset.csv"
+    toy_dataset(150, seed=3).to_csv(data, index=False)
+    out = tmp_path / "artifacts"
+    train.main(["train", "--data", str(data), "--out-dir", str(out), "--n-iter", "2", "--n-jobs", "1",
+                "--cache-dir", str(tmp_path / "cache"), "--seed", "0"])
+    return data, out
+
+def _train_again(data, out, tmp_path, monkeypatch, *extra):
+    calls = []
+    real_cv = train.cross_val_score
+    monkeypatch.setattr(train, "cross_val_score", lambda *a, **kw: calls.append(1) or real_cv(*a, **kw))
+    train.main(["train", "--data", str(data), "--out-dir", str(out), "--n-iter", "2", "--n-jobs", "1",
+                "--cache-dir", str(tmp_path / "cache"), "--seed", "0", "--no-eval", *extra])
+    return len(calls)
+
+def test_cli_train_writes_artifacts(artifacts):
+    _, out = artifacts
+    model, le = train.load_artifacts(out)
+    assert list(le.classes_) == ["Balanced", "Low_Carb", "Low_Sodium"]
+    assert "smote" not in model.named_steps
+    assert (out / "eval_output_rf").is_dir()
+    assert len((out / "search_checkpoint.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+
+def test_cli_train_resume_skips_finished_configs(artifacts, tmp_path, monkeypatch):
+    data, out = artifacts
+    assert _train_again(data, out, tmp_path, monkeypatch) == 0
+    assert _train_again(data, out, tmp_path, monkeypatch, "--no-resume") == 2
+    assert len((out / "search_checkpoint.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+
+def test_cli_evaluate(artifacts, tmp_path):
+    data, out = artifacts
+    train.main(["evaluate", "--data", str(data), "--model-dir", str(out), "--out-dir", str(tmp_path / "eval"),
+                "--seed", "0"])
+    assert any((tmp_path / "eval").iterdir())
+    train.main(["evaluate", "--data", str(data), "--model-dir", str(out), "--out-dir", str(tmp_path / "holdout"),
+                "--holdout", "--chunksize", "40"])
+    assert any((tmp_path / "holdout").iterdir())
+
+def test_cli_compress(artifacts):
+    data, out = artifacts
+    train.main(["compress", "--data", str(data), "--model-dir", str(out), "--seed", "0",
+                "--trees", "3", "--depths", "3", "--max-drop", "1.0"])
+    table = pd.read_csv(out / "eval_output_rf" / "compress" / "compression_tradeoff.csv")
+    assert table["variant"].iloc[0] == "full" and len(table) >= 2
+    assert (out / train.COMPACT_FILE).exists()
+    # --max-drop 1.0 → ทุก variant ผ่าน: ตัวที่เซฟต้องเป็นตัวที่ไฟล์เล็กที่สุด (ไม่นับตัวเต็ม)
+    import joblib
+    compact = joblib.load(out / train.COMPACT_FILE).named_steps["model"]
+    smallest = table[table["variant"] != "full"].sort_values(["size_mb", "nodes", "p50_ms"]).iloc[0]
+    assert sum(t.tree_.node_count for t in compact.estimators_) == smallest["nodes"]
+
+# ---------- เลือก variant: เล็กที่สุดที่ยังอยู่ในเกณฑ์ (ตาราง tradeoff สังเคราะห์ → ไม่ขึ้นกับเวลาที่วัดได้) ----------
+def _tradeoff(*rows):
+    cols = ["variant", "size_mb", "nodes", "p50_ms", "f1_macro", "kappa"]
+    return pd.DataFrame([dict(zip(cols, r)) for r in rows])
+
+TRADEOFF = _tradeoff(("full",      40.0, 90000, 9.0, 0.90, 0.85),
+                     ("subset-50",  4.0,  9000, 1.2, 0.896, 0.847),
+                     ("depth-10",   1.5,  3000, 1.5, 0.893, 0.842),   # เล็กสุดในเกณฑ์ แม้จะช้ากว่า subset-50
+                     ("distill",    0.5,  1000, 0.8, 0.80, 0.70))     # เล็กสุดแต่ตกเกินเกณฑ์
+
+def test_pick_variant_smallest_within_tolerance():
+    assert train.pick_variant(TRADEOFF, 0.01)["variant"] == "depth-10"
+    assert train.pick_variant(TRADEOFF, 0.005)["variant"] == "subset-50"
+    assert train.pick_variant(TRADEOFF, 0.2)["variant"] == "distill"
+    assert train.pick_variant(TRADEOFF, 0.001) is None              # ตัวเต็มไม่ถูกเลือกเอง
+
+def test_pick_variant_checks_both_metrics_and_breaks_ties():
+    # kappa ตกเกินแม้ F1 ผ่าน → ไม่ผ่าน; ขนาดเท่ากัน → node น้อยกว่า → p50 ต่ำกว่า
+    t = _tradeoff(("full", 10.0, 900, 2.0, 0.90, 0.85),
+                  ("a", 1.0, 100, 1.0, 0.90, 0.80),
+                  ("b", 2.0, 200, 1.0, 0.90, 0.85),
+                  ("c", 2.0, 150, 1.5, 0.90, 0.85),
+                  ("d", 2.0, 150, 1.1, 0.90, 0.85))
+    assert train.pick_variant(t, 0.01)["variant"] == "d"
+
+def test_cli_export(artifacts, tmp_path):
+    _, out = artifacts
+    reg = tmp_path / "models"
+    train.main(["export", "--model-dir", str(out), "--registry", str(reg), "--version", "v1", "--activate", "--flat"])
+    from diet_registry import ModelRegistry
+    assert ModelRegistry(reg).active() == "v1"
+    assert (reg / "v1" / train.MODEL_FILE).exists() and (out / "forest").is_dir()